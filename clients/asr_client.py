@@ -10,6 +10,7 @@ import uuid
 from typing import Optional
 import requests
 from utils.config import get_config
+from clients.http_session import get_session
 
 
 class ASRClient:
@@ -22,6 +23,7 @@ class ASRClient:
         self.access_key_secret = config.get_aliyun_access_key_secret()
         self.endpoint = config.get_aliyun_asr_endpoint()
         self.app_key = config.get_aliyun_asr_app_key()
+        self.session = get_session()
 
     def transcribe_file(
         self,
@@ -91,7 +93,7 @@ class ASRClient:
         }
 
         try:
-            response = requests.post(
+            response = self.session.post(
                 url,
                 params=params,
                 headers=headers,
@@ -8,7 +8,7 @@
 import uuid
 from datetime import datetime
 from utils.auth import hash_password, verify_password
-from clients.feishu_client import FeishuClient
+from clients.storage import get_storage
 
 
 class AuthClient:
@@ -16,7 +16,7 @@ class AuthClient:
 
     def __init__(self):
         """初始化认证客户端"""
-        self.feishu = FeishuClient()
+        self.storage = get_storage()
 
     def register(self, username: str, password: str) -> tuple[bool, str]:
         """
@@ -41,13 +41,13 @@ class AuthClient:
             return False, "密码至少需要6个字符"
 
         # 检查用户是否已存在
-        existing_user = self.feishu.get_user(username)
+        existing_user = self.storage.get_user(username)
         if existing_user:
             return False, "用户名已被注册"
 
         # 创建用户 - 直接存储明文密码，状态为 pending 等待管理员激活
         try:
-            self.feishu.create_user(username, password, status="pending")
+            self.storage.create_user(username, password, status="pending")
             return True, "注册成功，请等待管理员激活账号"
         except Exception as e:
             return False, f"注册失败: {str(e)}"
@@ -67,7 +67,7 @@ class AuthClient:
         print(f"[DEBUG] 尝试登录 - 用户名: {username}")
 
         # 检查用户是否存在
-        user = self.feishu.get_user(username)
+        user = self.storage.get_user(username)
         print(f"[DEBUG] 获取用户结果: {user}")
 
         if not user:
@@ -107,7 +107,7 @@ class AuthClient:
         Returns:
             用户信息
         """
-        user = self.feishu.get_user(username)
+        user = self.storage.get_user(username)
         if user:
             fields = user.get("fields", {})
             return {
@@ -145,11 +145,11 @@ class AuthClient:
 
         # 更新密码
         try:
-            user = self.feishu.get_user(username)
+            user = self.storage.get_user(username)
             record_id = user.get("record_id", "")
 
             # 使用专门的密码更新方法
-            self.feishu.update_user_password(record_id, new_password)
+            self.storage.update_user_password(record_id, new_password)
             return True, "密码修改成功"
         except Exception as e:
             return False, f"修改密码失败: {str(e)}"
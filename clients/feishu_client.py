@@ -5,16 +5,127 @@
 使用飞书 API 操作多维表格
 """
 
+import email.utils
+import hashlib
 import json
-import time
-from datetime import datetime
-from typing import Optional, Dict, Any, List
+import uuid
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Iterator, Tuple, Union
 import requests
 from utils.config import get_config
+from clients.http_session import get_session
+from clients.token_cache import get_token_cache
+from clients.rate_limiter import RetryableError, get_scheduler
+from clients.field_codec import get_field_codec
+from clients.storage import StorageBackend, date_to_timestamp
 
 
-class FeishuClient:
-    """飞书多维表格客户端"""
+# 多维表格列表/查询接口单页最大记录数
+MAX_PAGE_SIZE = 500
+
+# 批量接口单次请求最多处理的记录数
+BATCH_LIMIT = 500
+
+# 批量获取接口单次请求最多获取的记录数
+BATCH_GET_LIMIT = 100
+
+# 访问令牌无效或过期的错误码
+TOKEN_INVALID_CODES = {99991661, 99991663, 99991668}
+
+# 请求频率超限的错误码（应用级限流、多维表格限流）
+THROTTLED_CODES = {99991400, 1254290}
+
+# 可重试的临时错误码（写冲突、数据未就绪、服务端超时）
+TRANSIENT_CODES = {1254291, 1254607, 1255040}
+
+
+def make_client_token(*keys: str) -> str:
+    """
+    根据记录的唯一键生成创建接口的 client_token
+
+    同一记录的每次重试（包括写入队列在其他进程中的重试）使用相同的 token，
+    飞书据此去重，不会重复创建。飞书要求 client_token 为 uuidv4 格式，
+    因此取键的 SHA-256 前 16 字节并标记为版本 4
+
+    Args:
+        keys: 记录的唯一键（如游记 ID）
+
+    Returns:
+        uuidv4 格式的 token
+    """
+    digest = hashlib.sha256("\n".join(keys).encode("utf-8")).digest()
+    return str(uuid.UUID(bytes=digest[:16], version=4))
+
+
+def build_condition(field_name: str, operator: str, value: Any = None) -> dict:
+    """
+    构建多维表格查询的筛选条件
+
+    Args:
+        field_name: 字段名
+        operator: 运算符 (is/isGreaterEqual/isLessEqual/...)
+        value: 比较值，日期字段传毫秒时间戳
+
+    Returns:
+        筛选条件
+    """
+    condition = {"field_name": field_name, "operator": operator}
+    if value is None:
+        condition["value"] = []
+    elif operator.startswith(("isGreater", "isLess")) and isinstance(value, int):
+        # 日期字段的范围比较需要 ExactDate 格式
+        condition["value"] = ["ExactDate", str(value)]
+    else:
+        condition["value"] = [value]
+    return condition
+
+
+def _flatten_value(value: Any) -> Any:
+    """
+    将查询接口返回的富文本片段列表还原为字符串
+
+    Args:
+        value: 字段值
+
+    Returns:
+        普通字段值
+    """
+    if isinstance(value, list) and value and all(
+        isinstance(seg, dict) and "text" in seg for seg in value
+    ):
+        return "".join(seg.get("text", "") for seg in value)
+    return value
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    解析建议的重试等待时间
+
+    Retry-After 可以是秒数，也可以是 HTTP 日期
+
+    Args:
+        value: 响应头的值
+
+    Returns:
+        等待时间（秒），没有或无法解析时返回 None
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class FeishuClient(StorageBackend):
+    """飞书多维表格客户端（存储后端的飞书实现）"""
 
     def __init__(self):
         """初始化飞书客户端"""
@@ -25,41 +136,112 @@ class FeishuClient:
         self.table_id_user = config.get_feishu_table_id_user()
         self.app_token_note = config.get_feishu_app_token_note()
         self.table_id_note = config.get_feishu_table_id_note()
+        self.api_base = config.get_feishu_api_base()
+        self.session = get_session()
+        self.scheduler = get_scheduler(self.app_id)
+        self.codec = get_field_codec()
 
-        self.access_token = None
-        self.token_expire_time = 0
+        self.token_cache = get_token_cache(
+            (self.api_base, self.app_id),
+            self._fetch_access_token
+        )
 
-    def _get_access_token(self) -> str:
+    def _fetch_access_token(self) -> Tuple[str, int]:
         """
-        获取访问令牌
+        向飞书请求新的访问令牌
 
         Returns:
-            访问令牌
+            (访问令牌, 有效期秒数)
         """
-        # 检查是否需要刷新令牌
-        if self.access_token and time.time() < self.token_expire_time:
-            return self.access_token
-
-        url = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
+        url = f"{self.api_base}/auth/v3/tenant_access_token/internal"
         payload = {
             "app_id": self.app_id,
             "app_secret": self.app_secret
         }
 
         try:
-            response = requests.post(url, json=payload)
+            response = self.session.post(url, json=payload)
             data = response.json()
 
             if data.get("code") == 0:
-                self.access_token = data.get("tenant_access_token")
-                # 设置过期时间（提前5分钟刷新）
-                self.token_expire_time = time.time() + data.get("expire", 7200) - 300
-                return self.access_token
+                return data.get("tenant_access_token"), data.get("expire", 7200)
             else:
                 raise Exception(f"获取访问令牌失败: {data.get('msg')}")
         except Exception as e:
             raise Exception(f"飞书认证失败: {str(e)}")
 
+    def _get_access_token(self) -> str:
+        """
+        获取访问令牌
+
+        令牌由进程内所有 FeishuClient 共享，过期前自动在后台刷新
+
+        Returns:
+            访问令牌
+        """
+        return self.token_cache.get()
+
+    def _auth_headers(self) -> dict:
+        """构建带访问令牌的请求头"""
+        return {
+            "Authorization": f"Bearer {self._get_access_token()}",
+            "Content-Type": "application/json"
+        }
+
+    def _check_status(self, status_code: int, headers) -> None:
+        """
+        检查 HTTP 状态码，限流和服务端错误抛出可重试错误
+
+        Args:
+            status_code: HTTP 状态码
+            headers: 响应头
+        """
+        if status_code == 429 or status_code >= 500:
+            retry_after = headers.get("x-ogw-ratelimit-reset") or headers.get("Retry-After")
+            raise RetryableError(
+                f"HTTP {status_code}",
+                throttled=status_code == 429,
+                retry_after=_parse_retry_after(retry_after)
+            )
+
+    def _check_result(self, result: dict) -> dict:
+        """
+        检查响应错误码，令牌失效、限流和临时错误抛出可重试错误
+
+        Args:
+            result: 响应 JSON
+
+        Returns:
+            响应 JSON
+        """
+        code = result.get("code")
+        if code in TOKEN_INVALID_CODES:
+            self.token_cache.invalidate()
+            raise RetryableError(f"访问令牌失效: {result.get('msg')}")
+        if code in THROTTLED_CODES or code in TRANSIENT_CODES:
+            raise RetryableError(
+                f"飞书 API 暂时不可用: {result.get('msg')}",
+                throttled=code in THROTTLED_CODES
+            )
+        return result
+
+    def _raise_for_error(self, result: dict, data: dict = None) -> None:
+        """
+        响应错误码非 0 时输出调试信息并抛出异常
+
+        Args:
+            result: 响应 JSON
+            data: 请求体
+        """
+        if result.get("code") != 0:
+            error_msg = result.get('msg', '未知错误')
+            print(f"[DEBUG] 飞书 API 错误详情:")
+            print(f"  代码: {result.get('code')}")
+            print(f"  消息: {error_msg}")
+            if data:
+                print(f"  请求数据: {json.dumps(data, ensure_ascii=False, indent=2)[:500]}")
+            raise Exception(f"飞书 API 请求失败: {error_msg}")
+
     def _request(
         self,
         method: str,
@@ -70,6 +252,8 @@ class FeishuClient:
         """
         发送 HTTP 请求
 
+        请求经应用共享的调度器限速，限流和临时错误自动退避重试
+
         Args:
             method: 请求方法
             url: 请求 URL
@@ -79,35 +263,105 @@ class FeishuClient:
         Returns:
             响应数据
         """
-        headers = {
-            "Authorization": f"Bearer {self._get_access_token()}",
-            "Content-Type": "application/json"
-        }
-
-        if method == "GET":
-            response = requests.get(url, headers=headers, params=params)
-        elif method == "POST":
-            response = requests.post(url, headers=headers, json=data)
-        elif method == "PATCH":
-            response = requests.patch(url, headers=headers, json=data)
-        elif method == "DELETE":
-            response = requests.delete(url, headers=headers, json=data)
-        else:
+        if method not in ("GET", "POST", "PATCH", "DELETE"):
             raise ValueError(f"不支持的请求方法: {method}")
 
-        result = response.json()
+        def send() -> dict:
+            try:
+                response = self.session.request(
+                    method, url, headers=self._auth_headers(), params=params, json=data
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                raise RetryableError(f"网络错误: {str(e)}")
 
-        if result.get("code") != 0:
-            error_msg = result.get('msg', '未知错误')
-            print(f"[DEBUG] 飞书 API 错误详情:")
-            print(f"  代码: {result.get('code')}")
-            print(f"  消息: {error_msg}")
-            if data:
-                print(f"  请求数据: {json.dumps(data, ensure_ascii=False, indent=2)[:500]}")
-            raise Exception(f"飞书 API 请求失败: {error_msg}")
+            self._check_status(response.status_code, response.headers)
+            return self._check_result(response.json())
+
+        result = self.scheduler.call(send)
+        self._raise_for_error(result, data)
 
         return result.get("data", {})
 
+    def _records_url(self, app_token: str, table_id: str) -> str:
+        """
+        构建多维表格记录接口 URL
+
+        Args:
+            app_token: 多维表格 App Token
+            table_id: 数据表 ID
+
+        Returns:
+            记录接口 URL
+        """
+        return f"{self.api_base}/bitable/v1/apps/{app_token}/tables/{table_id}/records"
+
+    def _iter_records(self, url: str, body: dict, page_size: int = MAX_PAGE_SIZE) -> Iterator[dict]:
+        """
+        分页请求 records/search 接口
+
+        按 page_token/has_more 逐页请求，惰性产出记录；
+        调用方找到目标后停止迭代即可，不会再请求后续页面。
+
+        Args:
+            url: records/search 接口 URL
+            body: 请求体（筛选、排序和字段裁剪）
+            page_size: 每页记录数（不超过 MAX_PAGE_SIZE）
+
+        Yields:
+            记录（包含 record_id 和 fields）
+        """
+        params = {"page_size": min(page_size, MAX_PAGE_SIZE)}
+
+        while True:
+            result = self._request("POST", url, data=body, params=params)
+            for item in result.get("items") or []:
+                yield item
+
+            page_token = result.get("page_token")
+            if not result.get("has_more") or not page_token:
+                break
+            params["page_token"] = page_token
+
+    def _search_records(
+        self,
+        app_token: str,
+        table_id: str,
+        conditions: List[dict] = None,
+        sort: List[dict] = None,
+        field_names: List[str] = None,
+        page_size: int = MAX_PAGE_SIZE
+    ) -> Iterator[dict]:
+        """
+        使用服务端筛选查询记录
+
+        筛选、排序和字段裁剪都交给 records/search 接口处理，
+        只返回匹配的记录；分页见 _iter_records。
+
+        Args:
+            app_token: 多维表格 App Token
+            table_id: 数据表 ID
+            conditions: 筛选条件列表（AND 关系），见 build_condition
+            sort: 排序规则列表，如 [{"field_name": "travel_date", "desc": True}]
+            field_names: 需要返回的字段，None 表示全部字段
+            page_size: 每页记录数（不超过 MAX_PAGE_SIZE）
+
+        Yields:
+            记录（包含 record_id 和 fields）
+        """
+        body = {}
+        if field_names:
+            body["field_names"] = list(field_names)
+        if sort:
+            body["sort"] = sort
+        if conditions:
+            body["filter"] = {"conjunction": "and", "conditions": conditions}
+
+        url = f"{self._records_url(app_token, table_id)}/search"
+        for item in self._iter_records(url, body, page_size):
+            fields = item.get("fields") or {}
+            item["fields"] = {k: _flatten_value(v) for k, v in fields.items()}
+            yield item
+
     # ===== 用户数据操作 =====
 
     def create_user(self, username: str, password: str, status: str = "pending", role: str = "user") -> dict:
@@ -123,7 +377,7 @@ class FeishuClient:
         Returns:
             创建的用户记录
         """
-        url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{self.app_token_user}/tables/{self.table_id_user}/records"
+        url = self._records_url(self.app_token_user, self.table_id_user)
 
         data = {
             "fields": {
@@ -134,7 +388,10 @@ class FeishuClient:
             }
         }
 
-        return self._request("POST", url, data=data)
+        # client_token 保证本次注册的重试不会重复创建；每次注册各自生成，
+        # 用户被删除后重新注册不会被当作重复请求
+        params = {"client_token": str(uuid.uuid4())}
+        return self._request("POST", url, data=data, params=params)
 
     def get_user(self, username: str) -> Optional[dict]:
         """
@@ -146,24 +403,17 @@ class FeishuClient:
         Returns:
             用户记录，不存在返回 None
         """
-        url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{self.app_token_user}/tables/{self.table_id_user}/records"
-
         print(f"[DEBUG] 飞书查询 - AppToken: {self.app_token_user}, TableID: {self.table_id_user}")
 
-        # 获取所有记录，然后在代码中过滤
-        result = self._request("GET", url, params={"page_size": 100})
-        items = result.get("items", [])
-
-        print(f"[DEBUG] 飞书返回记录数: {len(items)}")
-
-        # 在代码中查找匹配的用户名
-        for item in items:
-            fields = item.get("fields", {})
-            item_username = fields.get("username", "")
-            print(f"[DEBUG] 检查记录 - username字段: '{item_username}', 查找: '{username}'")
-            if item_username == username:
-                print(f"[DEBUG] 找到匹配用户: {fields}")
-                return item
+        records = self._search_records(
+            self.app_token_user,
+            self.table_id_user,
+            conditions=[build_condition("username", "is", username)],
+            page_size=1
+        )
+        for item in records:
+            print(f"[DEBUG] 找到匹配用户: {username}")
+            return item
 
         print(f"[DEBUG] 未找到用户: {username}")
         return None
@@ -179,7 +429,7 @@ class FeishuClient:
         Returns:
             更新后的记录
         """
-        url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{self.app_token_user}/tables/{self.table_id_user}/records/{record_id}"
+        url = f"{self._records_url(self.app_token_user, self.table_id_user)}/{record_id}"
 
         data = {"fields": {"status": status}}
 
@@ -196,7 +446,7 @@ class FeishuClient:
         Returns:
             更新后的记录
         """
-        url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{self.app_token_user}/tables/{self.table_id_user}/records/{record_id}"
+        url = f"{self._records_url(self.app_token_user, self.table_id_user)}/{record_id}"
 
         data = {"fields": {"password": password}}
 
@@ -214,34 +464,9 @@ class FeishuClient:
         Returns:
             创建的游记记录
         """
-        url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{self.app_token_note}/tables/{self.table_id_note}/records"
+        url = self._records_url(self.app_token_note, self.table_id_note)
 
-        # 转换数据格式
-        # 注意：travel_date 需要转换为飞书支持的日期格式（整数时间戳毫秒）
-        travel_date = note_data.get("travel_date", "")
-        # 将日期字符串转换为时间戳（毫秒）
-        if isinstance(travel_date, str) and travel_date:
-            from datetime import datetime
-            try:
-                dt = datetime.strptime(travel_date, "%Y-%m-%d")
-                travel_date = int(dt.timestamp() * 1000)
-            except:
-                travel_date = int(time.time() * 1000)
-        elif not travel_date:
-            travel_date = int(time.time() * 1000)
-
-        fields = {
-            "note_id": note_data.get("note_id"),
-            "username": note_data.get("username"),
-            "title": note_data.get("title", ""),
-            "location": note_data.get("location", ""),
-            "travel_date": travel_date,
-            "images": json.dumps(note_data.get("images", []), ensure_ascii=False),
-            "ocr_results": json.dumps(note_data.get("ocr_results", {}), ensure_ascii=False),
-            "user_notes": note_data.get("user_notes", ""),
-            "ai_content": note_data.get("ai_content", "")
-            # 注意：created_at 和 updated_at 是飞书自动管理的字段，不能手动设置
-        }
+        fields = self._build_note_fields(note_data)
 
         # 调试日志
         print(f"[DEBUG] 准备创建游记，字段数据:")
@@ -253,59 +478,165 @@ class FeishuClient:
 
         data = {"fields": fields}
 
-        return self._request("POST", url, data=data)
+        # client_token 由游记 ID 生成，保证重试时不会重复创建
+        note_id = note_data.get("note_id") or str(uuid.uuid4())
+        params = {"client_token": make_client_token("note", note_id)}
+        return self._request("POST", url, data=data, params=params)
 
-    def get_trip_note(self, note_id: str) -> Optional[dict]:
+    def get_trip_note(self, note_id: str, field_names: List[str] = None) -> Optional[dict]:
         """
         获取游记
 
         Args:
             note_id: 游记 ID
+            field_names: 需要返回的字段，None 表示全部字段
 
         Returns:
             游记记录，不存在返回 None
         """
-        url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{self.app_token_note}/tables/{self.table_id_note}/records"
+        records = self._search_records(
+            self.app_token_note,
+            self.table_id_note,
+            conditions=[build_condition("note_id", "is", note_id)],
+            field_names=field_names,
+            page_size=1
+        )
+        for item in records:
+            return item
 
-        # 获取所有记录，然后在代码中过滤
-        result = self._request("GET", url, params={"page_size": 100})
-        items = result.get("items", [])
+        return None
 
-        # 在代码中查找匹配的 note_id
-        for item in items:
-            fields = item.get("fields", {})
-            if fields.get("note_id") == note_id:
-                return item
+    def _note_conditions(
+        self,
+        username: str,
+        date_from: Union[str, int] = None,
+        date_to: Union[str, int] = None
+    ) -> List[dict]:
+        """
+        构建按用户和旅行日期范围筛选游记的条件
 
-        return None
+        Args:
+            username: 用户名
+            date_from: 旅行日期下限（含）
+            date_to: 旅行日期上限（含）
 
-    def list_trip_notes(self, username: str, limit: int = 20) -> List[dict]:
+        Returns:
+            筛选条件列表
+        """
+        conditions = [build_condition("username", "is", username)]
+        start = date_to_timestamp(date_from)
+        if start is not None:
+            conditions.append(build_condition("travel_date", "isGreaterEqual", start))
+        end = date_to_timestamp(date_to)
+        if end is not None:
+            conditions.append(build_condition("travel_date", "isLessEqual", end))
+        return conditions
+
+    def list_trip_notes(
+        self,
+        username: str,
+        limit: int = 20,
+        date_from: Union[str, int] = None,
+        date_to: Union[str, int] = None,
+        sort_by: str = None,
+        descending: bool = True,
+        field_names: List[str] = None
+    ) -> List[dict]:
         """
         列出用户的游记
 
         Args:
             username: 用户名
-            limit: 返回数量限制
+            limit: 返回数量限制，不大于 0 时返回空列表
+            date_from: 旅行日期下限（含），YYYY-MM-DD 或毫秒时间戳
+            date_to: 旅行日期上限（含），YYYY-MM-DD 或毫秒时间戳
+            sort_by: 排序字段，如 travel_date、created_at
+            descending: 是否降序
+            field_names: 需要返回的字段，None 表示全部字段
 
         Returns:
             游记记录列表
         """
-        url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{self.app_token_note}/tables/{self.table_id_note}/records"
+        # page_size 须为 1-500，超过 500 时由 _iter_records 分页
+        if limit <= 0:
+            return []
+
+        conditions = self._note_conditions(username, date_from, date_to)
+        sort = [{"field_name": sort_by, "desc": descending}] if sort_by else None
+
+        items = []
+        records = self._search_records(
+            self.app_token_note,
+            self.table_id_note,
+            conditions=conditions,
+            sort=sort,
+            field_names=field_names,
+            page_size=limit
+        )
+        for item in records:
+            items.append(item)
+            if len(items) >= limit:
+                break
+
+        return items
+
+    def iter_trip_notes(self, username: str, field_names: List[str] = None) -> Iterator[dict]:
+        """
+        流式遍历用户的全部游记
+
+        Args:
+            username: 用户名
+            field_names: 需要返回的字段，None 表示全部字段
+
+        Yields:
+            游记记录
+        """
+        return self._search_records(
+            self.app_token_note,
+            self.table_id_note,
+            conditions=[build_condition("username", "is", username)],
+            field_names=field_names
+        )
+
+    def list_trip_note_versions(self, username: str) -> List[dict]:
+        """
+        列出用户全部游记的版本信息（仅 note_id 和 updated_at），用于增量同步
 
-        # 获取所有记录，然后在代码中过滤
-        result = self._request("GET", url, params={"page_size": 100})
-        all_items = result.get("items", [])
+        Args:
+            username: 用户名
+
+        Returns:
+            游记记录列表，fields 只包含 note_id 和 updated_at
+        """
+        return list(self._search_records(
+            self.app_token_note,
+            self.table_id_note,
+            conditions=[build_condition("username", "is", username)],
+            field_names=["note_id", "updated_at"]
+        ))
+
+    def batch_get_trip_notes(self, record_ids: List[str]) -> List[dict]:
+        """
+        按记录 ID 批量获取游记
+
+        Args:
+            record_ids: 记录 ID 列表
+
+        Returns:
+            游记记录列表
+        """
+        url = f"{self._records_url(self.app_token_note, self.table_id_note)}/batch_get"
+        items = []
 
-        # 在代码中过滤属于该用户的游记
-        filtered_items = []
-        for item in all_items:
-            fields = item.get("fields", {})
-            if fields.get("username") == username:
-                filtered_items.append(item)
-                if len(filtered_items) >= limit:
-                    break
+        for start in range(0, len(record_ids), BATCH_GET_LIMIT):
+            chunk = record_ids[start:start + BATCH_GET_LIMIT]
+            result = self._request("POST", url, data={"record_ids": chunk})
+            for item in result.get("records") or []:
+                fields = item.get("fields") or {}
+                item["fields"] = {k: _flatten_value(v) for k, v in fields.items()}
+                items.append(item)
 
-        return filtered_items
+        return items
 
     def update_trip_note(self, record_id: str, note_data: dict) -> dict:
         """
@@ -318,19 +649,9 @@ class FeishuClient:
         Returns:
             更新后的记录
         """
-        url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{self.app_token_note}/tables/{self.table_id_note}/records/{record_id}"
-
-        fields = {"updated_at": int(time.time() * 1000)}
-
-        # 只更新提供的字段
-        for key in ["title", "location", "travel_date", "images", "ocr_results", "user_notes", "ai_content"]:
-            if key in note_data:
-                if key in ["images", "ocr_results"]:
-                    fields[key] = json.dumps(note_data[key], ensure_ascii=False)
-                else:
-                    fields[key] = note_data[key]
+        url = f"{self._records_url(self.app_token_note, self.table_id_note)}/{record_id}"
 
-        data = {"fields": fields}
+        data = {"fields": self._build_note_update_fields(note_data)}
 
         return self._request("PATCH", url, data=data)
 
@@ -345,9 +666,127 @@ class FeishuClient:
             是否删除成功
         """
         try:
-            url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{self.app_token_note}/tables/{self.table_id_note}/records/{record_id}"
+            url = f"{self._records_url(self.app_token_note, self.table_id_note)}/{record_id}"
             self._request("DELETE", url)
             return True
         except Exception as e:
             print(f"删除游记失败: {str(e)}")
             return False
+
+    # ===== 游记批量操作 =====
+
+    @staticmethod
+    def _chunk_results(chunk: list, data: dict) -> List[dict]:
+        """
+        将批量接口的返回转换为与分块一一对应的结果
+
+        Args:
+            chunk: 本批请求内容
+            data: 接口返回数据
+
+        Returns:
+            每项包含 success、record_id、error
+        """
+        records = data.get("records") or []
+        results = []
+        for i in range(len(chunk)):
+            record = records[i] if i < len(records) else {}
+            success = bool(record) and record.get("deleted", True)
+            results.append({
+                "success": success,
+                "record_id": record.get("record_id", ""),
+                "error": "" if success else "飞书未返回该记录的结果"
+            })
+        return results
+
+    @staticmethod
+    def _batch_token(chunk: list) -> str:
+        """
+        由分块中各游记的 ID 生成批量创建的 client_token
+
+        Args:
+            chunk: 本批请求内容
+
+        Returns:
+            client_token
+        """
+        note_ids = [item["fields"].get("note_id") or str(uuid.uuid4()) for item in chunk]
+        return make_client_token("notes", *note_ids)
+
+    def _batch_request(self, action: str, payloads: list, wrap) -> List[dict]:
+        """
+        分块调用批量接口
+
+        Args:
+            action: 接口名 (batch_create/batch_update/batch_delete)
+            payloads: 每条记录的请求内容
+            wrap: 将一个分块包装为请求体的函数
+
+        Returns:
+            与 payloads 一一对应的结果，
+            每项包含 success、record_id、error
+        """
+        url = f"{self._records_url(self.app_token_note, self.table_id_note)}/{action}"
+        results = []
+
+        for start in range(0, len(payloads), BATCH_LIMIT):
+            chunk = payloads[start:start + BATCH_LIMIT]
+            try:
+                params = {"client_token": self._batch_token(chunk)} if action == "batch_create" else None
+                data = self._request("POST", url, data=wrap(chunk), params=params)
+                results.extend(self._chunk_results(chunk, data))
+            except Exception as e:
+                print(f"[DEBUG] {action} 第 {start // BATCH_LIMIT + 1} 批失败: {str(e)}")
+                results.extend(
+                    {"success": False, "record_id": "", "error": str(e)}
+                    for _ in chunk
+                )
+
+        return results
+
+    def batch_create_trip_notes(self, notes: List[dict]) -> List[dict]:
+        """
+        批量创建游记
+
+        Args:
+            notes: 游记数据列表
+
+        Returns:
+            与输入顺序一致的结果列表，每项包含 success、record_id、error
+        """
+        payloads = [{"fields": self._build_note_fields(note)} for note in notes]
+        return self._batch_request("batch_create", payloads, lambda chunk: {"records": chunk})
+
+    def batch_update_trip_notes(self, updates: List[Tuple[str, dict]]) -> List[dict]:
+        """
+        批量更新游记
+
+        Args:
+            updates: (记录 ID, 更新数据) 列表
+
+        Returns:
+            与输入顺序一致的结果列表，每项包含 success、record_id、error
+        """
+        payloads = [
+            {"record_id": record_id, "fields": self._build_note_update_fields(note_data)}
+            for record_id, note_data in updates
+        ]
+        results = self._batch_request("batch_update", payloads, lambda chunk: {"records": chunk})
+        for result, (record_id, _) in zip(results, updates):
+            result["record_id"] = result["record_id"] or record_id
+        return results
+
+    def batch_delete_trip_notes(self, record_ids: List[str]) -> List[dict]:
+        """
+        批量删除游记
+
+        Args:
+            record_ids: 记录 ID 列表
+
+        Returns:
+            与输入顺序一致的结果列表，每项包含 success、record_id、error
+        """
+        results = self._batch_request("batch_delete", list(record_ids), lambda chunk: {"records": chunk})
+        for result, record_id in zip(results, record_ids):
+            result["record_id"] = result["record_id"] or record_id
+        return results
@@ -0,0 +1,286 @@
+# field_codec.py
+# -*- coding: utf-8 -*-
+"""
+字段编码模块
+对游记的大字段（images、ocr_results、ai_content、user_notes）进行编码：
+JSON 字段使用紧凑格式，超过阈值的内容可压缩为 zlib+base64 并加版本前缀。
+解码时按前缀识别，没有前缀的旧记录按原样读取。
+"""
+
+import base64
+import copy
+import json
+import zlib
+from typing import Any, Callable, Dict, Optional
+from utils.config import get_config
+
+# 压缩内容的版本前缀
+ZLIB_PREFIX = "z1:"
+
+# 需要编码的 JSON 字段和文本字段
+JSON_FIELDS = ("images", "ocr_results")
+TEXT_FIELDS = ("ai_content", "user_notes")
+
+
+def decode_field(raw: Optional[str]) -> Optional[str]:
+    """
+    解码字段，返回原始文本（JSON 字段为 JSON 字符串）
+
+    Args:
+        raw: 飞书中保存的值
+
+    Returns:
+        解码后的文本；未编码的旧值原样返回
+    """
+    if isinstance(raw, str) and raw.startswith(ZLIB_PREFIX):
+        try:
+            return zlib.decompress(base64.b64decode(raw[len(ZLIB_PREFIX):], validate=True)).decode("utf-8")
+        except (ValueError, zlib.error):
+            # 恰好以前缀开头的普通文本（如未压缩保存的旧记录）
+            return raw
+    return raw
+
+
+def decode_json_field(raw: Optional[str], default: Any) -> Any:
+    """
+    解码 JSON 字段
+
+    Args:
+        raw: 飞书中保存的值（本地数据中也可能已经是列表或字典）
+        default: 为空时的默认值
+
+    Returns:
+        解析后的对象
+    """
+    if isinstance(raw, (list, dict)):
+        return raw
+    text = decode_field(raw)
+    return json.loads(text) if text else default
+
+
+class FieldCodec:
+    """字段编码器：与旧版本一致，JSON 使用默认格式，文本不做处理"""
+
+    name = "plain"
+
+    def encode_json(self, value: Any) -> str:
+        """
+        编码 JSON 字段
+
+        Args:
+            value: 列表或字典
+
+        Returns:
+            保存到飞书的字符串
+        """
+        return json.dumps(value, ensure_ascii=False)
+
+    def encode_text(self, text: str) -> str:
+        """
+        编码文本字段
+
+        Args:
+            text: 文本
+
+        Returns:
+            保存到飞书的字符串
+        """
+        return text
+
+    def encode_fields(self, fields: dict) -> dict:
+        """
+        编码记录中的大字段（原地修改）
+
+        Args:
+            fields: 记录字段，JSON 字段为对象，文本字段为字符串
+
+        Returns:
+            编码后的字段
+        """
+        for key in JSON_FIELDS:
+            if key in fields:
+                fields[key] = self.encode_json(fields[key])
+        for key in TEXT_FIELDS:
+            if fields.get(key):
+                fields[key] = self.encode_text(fields[key])
+        return fields
+
+
+class CompactJsonCodec(FieldCodec):
+    """JSON 字段去掉分隔符后的空格"""
+
+    name = "compact"
+
+    def encode_json(self, value: Any) -> str:
+        """编码 JSON 字段（紧凑格式）"""
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+class ZlibCodec(CompactJsonCodec):
+    """在紧凑 JSON 的基础上，压缩超过阈值的字段"""
+
+    name = "zlib"
+
+    def __init__(self, threshold: int = 2048):
+        """
+        初始化编码器
+
+        Args:
+            threshold: 超过该字节数的内容才压缩
+        """
+        self.threshold = threshold
+
+    def _compress(self, text: str) -> str:
+        """
+        超过阈值且压缩后更短时返回带前缀的压缩内容
+
+        本身以前缀开头的文本总是压缩，避免读取时被误认为压缩内容
+        """
+        data = text.encode("utf-8")
+        escape = text.startswith(ZLIB_PREFIX)
+        if len(data) <= self.threshold and not escape:
+            return text
+        encoded = ZLIB_PREFIX + base64.b64encode(zlib.compress(data, 9)).decode("ascii")
+        return encoded if len(encoded) < len(data) or escape else text
+
+    def encode_json(self, value: Any) -> str:
+        """编码 JSON 字段（紧凑格式，超过阈值时压缩）"""
+        return self._compress(super().encode_json(value))
+
+    def encode_text(self, text: str) -> str:
+        """编码文本字段（超过阈值时压缩）"""
+        return self._compress(text)
+
+
+_CODECS = {
+    FieldCodec.name: FieldCodec,
+    CompactJsonCodec.name: CompactJsonCodec,
+    ZlibCodec.name: ZlibCodec
+}
+
+
+def get_field_codec() -> FieldCodec:
+    """
+    按配置创建字段编码器
+
+    Returns:
+        字段编码器
+    """
+    config = get_config()
+    name = config.get_field_codec()
+    if name not in _CODECS:
+        raise ValueError(f"不支持的字段编码: {name}")
+    if name == ZlibCodec.name:
+        return ZlibCodec(config.get_field_compress_threshold())
+    return _CODECS[name]()
+
+
+class LazyNote(dict):
+    """
+    延迟解码的游记数据
+
+    大字段在第一次访问时才解码，列表页等只读取标题、摘要的场景不必解压正文
+    """
+
+    def __init__(self, data: dict, decoders: Dict[str, Callable[[Any], Any]]):
+        """
+        初始化游记数据
+
+        Args:
+            data: 游记数据，需要延迟解码的字段保存原始值
+            decoders: {字段名: 解码函数}
+        """
+        super().__init__(data)
+        self._decoders = {key: decoder for key, decoder in decoders.items() if key in data}
+
+    def _load(self, key: Any) -> None:
+        """解码字段并缓存结果"""
+        decoder = self._decoders.pop(key, None)
+        if decoder is not None:
+            super().__setitem__(key, decoder(super().__getitem__(key)))
+
+    def _load_all(self) -> None:
+        """解码全部字段"""
+        for key in list(self._decoders):
+            self._load(key)
+
+    def __getitem__(self, key: Any) -> Any:
+        self._load(key)
+        return super().__getitem__(key)
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        self._load(key)
+        return super().get(key, default)
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        self._decoders.pop(key, None)
+        super().__setitem__(key, value)
+
+    def pop(self, key: Any, *args) -> Any:
+        self._load(key)
+        return super().pop(key, *args)
+
+    def setdefault(self, key: Any, default: Any = None) -> Any:
+        self._load(key)
+        return super().setdefault(key, default)
+
+    def update(self, *args, **kwargs) -> None:
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def __iter__(self):
+        return iter(list(super().keys()))
+
+    def items(self):
+        self._load_all()
+        return super().items()
+
+    def values(self):
+        self._load_all()
+        return super().values()
+
+    def copy(self) -> dict:
+        return dict(self.items())
+
+    def __eq__(self, other: Any) -> bool:
+        self._load_all()
+        if isinstance(other, LazyNote):
+            other._load_all()
+        return super().__eq__(other)
+
+    def __ne__(self, other: Any) -> bool:
+        # dict.__ne__ 比较的是尚未解码的原值，不能与 __eq__ 矛盾
+        self._load_all()
+        if isinstance(other, LazyNote):
+            other._load_all()
+        return super().__ne__(other)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        self._load_all()
+        return super().__repr__()
+
+    def __reduce__(self):
+        return (dict, (dict(self.items()),))
+
+    def project(self, keys: list) -> "LazyNote":
+        """
+        复制指定字段，尚未解码的字段保持延迟解码
+
+        Args:
+            keys: 字段名列表
+
+        Returns:
+            新的游记数据
+        """
+        data = {key: dict.get(self, key) for key in keys}
+        return LazyNote(data, {key: self._decoders[key] for key in keys if key in self._decoders})
+
+    def __deepcopy__(self, memo: dict) -> "LazyNote":
+        # 未解码的字段是字符串，无需复制也不必解码
+        data = {
+            key: value if key in self._decoders else copy.deepcopy(value, memo)
+            for key, value in dict.items(self)
+        }
+        return LazyNote(data, self._decoders)
@@ -0,0 +1,80 @@
+# http_session.py
+# -*- coding: utf-8 -*-
+"""
+HTTP 会话模块
+提供进程内共享的 requests 会话，复用 TCP/TLS 连接并设置默认超时
+"""
+
+import threading
+from typing import Optional
+import requests
+from requests.adapters import HTTPAdapter
+from utils.config import get_config
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """未显式指定超时时使用默认超时的连接池适配器"""
+
+    def __init__(self, timeout: float, *args, **kwargs):
+        """
+        初始化适配器
+
+        Args:
+            timeout: 默认超时（秒）
+        """
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        """发送请求，补充默认超时"""
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def create_session(pool_size: int, timeout: float) -> requests.Session:
+    """
+    创建带连接池的会话
+
+    Args:
+        pool_size: 每个主机的最大连接数
+        timeout: 默认超时（秒）
+
+    Returns:
+        requests 会话
+    """
+    session = requests.Session()
+    adapter = TimeoutHTTPAdapter(
+        timeout,
+        pool_connections=pool_size,
+        pool_maxsize=pool_size
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """
+    获取进程内共享的会话
+
+    Streamlit 每次重跑页面都会重新创建客户端，
+    共享会话使这些客户端复用同一个连接池。
+
+    Returns:
+        requests 会话
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                config = get_config()
+                _session = create_session(
+                    config.get_http_pool_size(),
+                    config.get_http_timeout()
+                )
+    return _session
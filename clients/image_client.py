@@ -2,13 +2,34 @@
 # -*- coding: utf-8 -*-
 """
 图片存储客户端模块
-使用阿里云 OSS 进行图片存储
+使用阿里云 OSS 进行图片存储。图片按内容的 SHA-256 寻址，相同的图片只上传一次；
+大图片使用分片上传，已完成的分片记录在本地检查点中，失败后重试只上传剩余分片
 """
 
+import hashlib
+import io
+import json
+import math
+import os
+import re
+import threading
+import time
 import oss2
-from typing import Optional, List
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Optional, Dict, List, Tuple, Callable, Union, BinaryIO
 from datetime import datetime
+from clients.upload_cache import get_upload_cache
 from utils.config import get_config
+from utils.image_utils import IMAGE_VARIANTS, image_url
+
+# 图片数据：字节或可读取的文件对象（如 open() 的结果、Streamlit 的 UploadedFile）
+ImageSource = Union[bytes, BinaryIO]
+
+# Markdown 图片引用：![说明](URL "标题")
+MARKDOWN_IMAGE_PATTERN = re.compile(r'(!\[[^\]]*\]\()(\S+?)(\s+"[^"]*")?\)')
+
+# 缩小版本的对象键以版本名结尾，如 .../sha256/ab/<摘要>_thumb.jpg
+VARIANT_KEY_PATTERN = re.compile(r"_(%s)\.\w+$" % "|".join(IMAGE_VARIANTS))
 
 
 class ImageClient:
@@ -21,6 +42,16 @@ class ImageClient:
         self.access_key_secret = config.get_aliyun_access_key_secret()
         self.bucket_name = config.get_aliyun_oss_bucket_name()
         self.endpoint = config.get_aliyun_oss_endpoint()
+        self.upload_workers = config.get_image_upload_workers()
+        self.upload_timeout = config.get_image_upload_timeout()
+        self.multipart_threshold = config.get_image_multipart_threshold()
+        self.multipart_part_size = config.get_image_multipart_part_size()
+        self.multipart_threads = config.get_image_multipart_threads()
+        self.multipart_max_attempts = config.get_image_multipart_max_attempts()
+        self.checkpoint_dir = os.path.join(config.get_local_data_dir(), "upload_checkpoints")
+        self.checkpoint_max_age = config.get_image_checkpoint_max_age_days() * 86400
+        self.upload_cache = get_upload_cache()
+        self.process_enabled = config.get_image_process_enabled()
 
         # 调试日志
         print(f"[DEBUG OSS] Bucket: {self.bucket_name}, Endpoint: {self.endpoint}")
@@ -46,38 +77,203 @@ class ImageClient:
         timestamp = datetime.now().strftime("%Y%m%d")
         return f"trip_note/{username}/{note_id}/{timestamp}/{filename}"
 
+    def content_key(self, username: str, digest: str, filename: str, variant: str = None) -> str:
+        """
+        生成内容寻址的 OSS 对象键
+
+        同一用户的相同图片得到相同的键，可以被多篇游记共用
+
+        Args:
+            username: 用户名
+            digest: 图片内容的 SHA-256 十六进制摘要
+            filename: 文件名（只取扩展名）
+            variant: 缩小版本名（IMAGE_VARIANTS），记入对象键
+
+        Returns:
+            OSS 对象键
+        """
+        extension = os.path.splitext(filename)[1].lower() or ".jpg"
+        suffix = f"_{variant}" if variant else ""
+        return f"trip_note/{username}/sha256/{digest[:2]}/{digest}{suffix}{extension}"
+
+    def _url(self, key: str) -> str:
+        """生成对象的公开访问 URL"""
+        return f"https://{self.bucket_name}.{self.endpoint}/{key}"
+
+    def processed_url(
+        self,
+        url: str,
+        width: int = None,
+        height: int = None,
+        format: str = None,
+        quality: int = None
+    ) -> str:
+        """
+        生成 OSS 图片处理 URL，由 OSS 按需缩放、转码，无需额外存储
+
+        只处理本 Bucket 的图片；其他 URL、已带处理参数的 URL、上传时生成的缩小版本
+        或未启用图片处理时原样返回。缩放按等比限制在 width x height 内，不会放大小图
+
+        Args:
+            url: 图片 URL
+            width: 最大宽度（像素）
+            height: 最大高度（像素）
+            format: 输出格式，如 webp、jpg
+            quality: 输出质量 (1-100)
+
+        Returns:
+            图片处理 URL
+        """
+        if not url or not self.process_enabled:
+            return url
+        if not url.startswith(f"https://{self.bucket_name}.{self.endpoint}/") or "x-oss-process=" in url:
+            return url
+        if VARIANT_KEY_PATTERN.search(url.split("?")[0]):
+            # 缩小版本已是合适的尺寸，再处理只会增加一次回源
+            return url
+
+        actions = []
+        if width or height:
+            resize = "resize,m_lfit"
+            if width:
+                resize += f",w_{int(width)}"
+            if height:
+                resize += f",h_{int(height)}"
+            actions.append(resize)
+        if format:
+            actions.append(f"format,{format}")
+        if quality:
+            actions.append(f"quality,q_{int(quality)}")
+        if not actions:
+            return url
+
+        separator = "&" if "?" in url else "?"
+        return f"{url}{separator}x-oss-process=image/" + "/".join(actions)
+
+    @staticmethod
+    def _digest(image: ImageSource) -> Tuple[str, ImageSource]:
+        """
+        计算图片内容的 SHA-256
+
+        文件对象按块读取后回到原位置；不可定位的流读入内存后以字节返回
+
+        Args:
+            image: 图片字节或文件对象
+
+        Returns:
+            (十六进制摘要, 之后用于上传的图片数据)
+        """
+        if isinstance(image, (bytes, bytearray)):
+            return hashlib.sha256(image).hexdigest(), image
+        if not (hasattr(image, "seekable") and image.seekable()):
+            image = image.read()
+            return hashlib.sha256(image).hexdigest(), image
+
+        position = image.tell()
+        sha256 = hashlib.sha256()
+        for chunk in iter(lambda: image.read(1024 * 1024), b""):
+            sha256.update(chunk)
+        image.seek(position)
+        return sha256.hexdigest(), image
+
+    def object_exists(self, key: str) -> bool:
+        """
+        检查对象是否已存在于 OSS（HEAD 请求）
+
+        Args:
+            key: OSS 对象键
+
+        Returns:
+            是否存在
+        """
+        return self.bucket.object_exists(key)
+
     def upload_image(
         self,
-        image_bytes: bytes,
+        image_bytes: ImageSource,
         username: str,
         note_id: str,
-        filename: str
+        filename: str,
+        variant: str = None
     ) -> str:
         """
         上传图片到 OSS
 
+        对象键由图片内容决定：本进程上传过的图片直接返回 URL，
+        其次用 HEAD 请求检查 OSS 上是否已有，都没有时才上传。
+        超过分片阈值的图片使用分片上传；传入文件对象时按分片读取，不会整体读入内存
+
         Args:
-            image_bytes: 图片字节
+            image_bytes: 图片字节或文件对象（从当前位置读到末尾）
             username: 用户名
-            note_id: 游记ID
-            filename: 文件名
+            note_id: 游记ID（内容寻址后不参与对象键，保留以兼容调用方）
+            filename: 文件名（决定扩展名）
+            variant: 缩小版本名，显示时不再对其使用 OSS 图片处理
 
         Returns:
             图片的公开访问 URL
         """
-        key = self.generate_key(username, note_id, filename)
-
         try:
-            # 上传图片
-            result = self.bucket.put_object(key, image_bytes)
-
-            # 生成公开访问 URL
-            url = f"https://{self.bucket_name}.{self.endpoint}/{key}"
-
+            digest, image_bytes = self._digest(image_bytes)
+            key = self.content_key(username, digest, filename, variant)
+            url = self._url(key)
+
+            if self.upload_cache.get(key) is not None:
+                return url
+            if self.object_exists(key):
+                print(f"[DEBUG OSS] 图片已存在，跳过上传: {key}")
+                self.upload_cache.put(key, url)
+                return url
+
+            size = self._source_size(image_bytes)
+            if size is not None and size > self.multipart_threshold:
+                if isinstance(image_bytes, (bytes, bytearray)):
+                    image_bytes = io.BytesIO(image_bytes)
+                self._multipart_upload(key, image_bytes, size)
+            else:
+                # 小图片直接上传（文件对象由 SDK 流式读取）
+                self.bucket.put_object(key, image_bytes)
+
+            self.upload_cache.put(key, url)
             return url
         except Exception as e:
             raise Exception(f"图片上传失败: {str(e)}")
 
+    def upload_image_variants(
+        self,
+        image_bytes: ImageSource,
+        username: str,
+        note_id: str,
+        filename: str,
+        variants: Dict[str, bytes]
+    ) -> dict:
+        """
+        上传原图及其缩小版本（缩略图、展示图）
+
+        缩小版本由图片处理进程生成（process_image 的 variants），这里只负责上传
+
+        Args:
+            image_bytes: 原图字节或文件对象
+            username: 用户名
+            note_id: 游记ID
+            filename: 文件名
+            variants: {版本名: JPEG 字节}
+
+        Returns:
+            游记 images 字段的元素：{"original": URL, "display": URL, "thumb": URL}，
+            没有某个版本（原图不大于该尺寸）时使用原图 URL
+        """
+        entry = {"original": self.upload_image(image_bytes, username, note_id, filename)}
+        stem = os.path.splitext(filename)[0]
+        for name in ("display", "thumb"):
+            if name in variants:
+                entry[name] = self.upload_image(
+                    variants[name], username, note_id, f"{stem}_{name}.jpg", variant=name
+                )
+            else:
+                entry[name] = entry["original"]
+        return entry
+
     def upload_image_from_file(
         self,
         file_path: str,
@@ -97,24 +293,247 @@ class ImageClient:
         """
         filename = file_path.split("/")[-1]
         with open(file_path, "rb") as f:
-            image_bytes = f.read()
+            return self.upload_image(f, username, note_id, filename)
 
-        return self.upload_image(image_bytes, username, note_id, filename)
+    @staticmethod
+    def _source_size(image: ImageSource) -> Optional[int]:
+        """
+        获取待上传的字节数
+
+        Args:
+            image: 图片字节或文件对象
 
-    def delete_image(self, url: str) -> bool:
+        Returns:
+            字节数，不可定位的流返回 None
+        """
+        if isinstance(image, (bytes, bytearray)):
+            return len(image)
+        if not (hasattr(image, "seekable") and image.seekable()):
+            return None
+        position = image.tell()
+        size = image.seek(0, os.SEEK_END) - position
+        image.seek(position)
+        return size
+
+    def _checkpoint_path(self, key: str) -> str:
+        """获取对象键对应的检查点文件路径"""
+        return os.path.join(self.checkpoint_dir, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+    def _load_checkpoint(self, key: str) -> Optional[dict]:
+        """读取分片上传检查点，不存在或已损坏返回 None"""
+        try:
+            with open(self._checkpoint_path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_checkpoint(self, key: str, checkpoint: dict) -> None:
+        """保存分片上传检查点"""
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        path = self._checkpoint_path(key)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f)
+        os.replace(path + ".tmp", path)
+
+    def _remove_checkpoint(self, key: str) -> None:
+        """删除分片上传检查点"""
+        try:
+            os.remove(self._checkpoint_path(key))
+        except OSError:
+            pass
+
+    def _abort_multipart(self, key: str, upload_id: str) -> None:
+        """放弃未完成的分片上传（释放 OSS 上已上传的分片）并删除检查点"""
+        try:
+            self.bucket.abort_multipart_upload(key, upload_id)
+        except oss2.exceptions.NoSuchUpload:
+            pass
+        except Exception as e:
+            print(f"[DEBUG OSS] 放弃分片上传失败 {key}: {str(e)}")
+        self._remove_checkpoint(key)
+
+    def prune_checkpoints(self) -> int:
+        """
+        放弃超过保留天数仍未完成的分片上传，删除其检查点
+
+        Returns:
+            清理的检查点数
+        """
+        try:
+            names = os.listdir(self.checkpoint_dir)
+        except OSError:
+            return 0
+
+        cutoff = time.time() - self.checkpoint_max_age
+        pruned = 0
+        for name in names:
+            path = os.path.join(self.checkpoint_dir, name)
+            try:
+                if not name.endswith(".json") or os.path.getmtime(path) >= cutoff:
+                    continue
+                with open(path, "r", encoding="utf-8") as f:
+                    checkpoint = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if checkpoint.get("key") and checkpoint.get("upload_id"):
+                self._abort_multipart(checkpoint["key"], checkpoint["upload_id"])
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            pruned += 1
+        return pruned
+
+    def _record_multipart_failure(self, key: str, upload_id: str) -> None:
+        """记录一次分片上传失败，达到最大尝试次数时放弃该上传"""
+        checkpoint = self._load_checkpoint(key)
+        if checkpoint is None:
+            return
+        checkpoint["attempts"] = checkpoint.get("attempts", 0) + 1
+        if checkpoint["attempts"] >= self.multipart_max_attempts:
+            print(f"[DEBUG OSS] 分片上传 {key} 失败 {checkpoint['attempts']} 次，放弃已上传的分片")
+            self._abort_multipart(key, upload_id)
+        else:
+            self._save_checkpoint(key, checkpoint)
+
+    def _uploaded_parts(self, key: str, size: int) -> Tuple[Optional[str], dict]:
+        """
+        根据检查点找到可以继续的分片上传
+
+        Args:
+            key: OSS 对象键
+            size: 待上传的字节数
+
+        Returns:
+            (upload_id, {分片号: PartInfo})，没有可继续的上传时 upload_id 为 None
+        """
+        checkpoint = self._load_checkpoint(key)
+        if not checkpoint:
+            return None, {}
+        if checkpoint.get("size") != size or checkpoint.get("part_size") != self.multipart_part_size:
+            # 内容或分片方式已变化，旧的分片不能复用
+            self._remove_checkpoint(key)
+            return None, {}
+
+        upload_id = checkpoint["upload_id"]
+        try:
+            # 以 OSS 上实际存在的分片为准
+            parts = {part.part_number: part for part in oss2.PartIterator(self.bucket, key, upload_id)}
+        except oss2.exceptions.NoSuchUpload:
+            self._remove_checkpoint(key)
+            return None, {}
+        print(f"[DEBUG OSS] 继续分片上传 {key}，已完成 {len(parts)} 个分片")
+        return upload_id, parts
+
+    def _multipart_upload(self, key: str, stream: BinaryIO, size: int) -> None:
+        """
+        分片并发上传，失败时保留检查点，下次上传同一对象时从已完成的分片继续；
+        连续失败达到最大尝试次数时放弃该上传，过期的检查点在下次分片上传前清理
+
+        同时在内存中的分片数不超过并发数
+
+        Args:
+            key: OSS 对象键
+            stream: 可定位的文件对象，从当前位置开始读取
+            size: 待上传的字节数
+        """
+        self.prune_checkpoints()
+        part_size = self.multipart_part_size
+        upload_id, parts = self._uploaded_parts(key, size)
+        if upload_id is None:
+            upload_id = self.bucket.init_multipart_upload(key).upload_id
+            self._save_checkpoint(key, {
+                "key": key, "upload_id": upload_id, "size": size, "part_size": part_size, "attempts": 0
+            })
+
+        try:
+            self._upload_parts(key, upload_id, parts, stream, size)
+            self.bucket.complete_multipart_upload(key, upload_id, [parts[n] for n in sorted(parts)])
+        except Exception:
+            self._record_multipart_failure(key, upload_id)
+            raise
+        self._remove_checkpoint(key)
+
+    def _upload_parts(self, key: str, upload_id: str, parts: dict, stream: BinaryIO, size: int) -> None:
+        """
+        并发上传缺少的分片
+
+        Args:
+            key: OSS 对象键
+            upload_id: 分片上传 ID
+            parts: 已完成的分片 {分片号: PartInfo}，上传成功的分片加入其中
+            stream: 可定位的文件对象，从当前位置开始读取
+            size: 待上传的字节数
+        """
+        part_size = self.multipart_part_size
+        start = stream.tell()
+        slots = threading.BoundedSemaphore(self.multipart_threads)
+
+        def upload_part(part_number: int, data: bytes) -> oss2.models.PartInfo:
+            try:
+                result = self.bucket.upload_part(key, upload_id, part_number, data)
+                return oss2.models.PartInfo(part_number, result.etag, size=len(data))
+            finally:
+                slots.release()
+
+        executor = ThreadPoolExecutor(max_workers=self.multipart_threads, thread_name_prefix="oss-part")
+        try:
+            futures = []
+            for part_number in range(1, math.ceil(size / part_size) + 1):
+                offset = (part_number - 1) * part_size
+                length = min(part_size, size - offset)
+                uploaded = parts.get(part_number)
+                if uploaded is not None and uploaded.size == length:
+                    continue
+
+                slots.acquire()
+                if any(future.done() and future.exception() for future in futures):
+                    slots.release()
+                    break
+                stream.seek(start + offset)
+                futures.append(executor.submit(upload_part, part_number, stream.read(length)))
+
+            for future in futures:
+                part = future.result()
+                parts[part.part_number] = part
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    @staticmethod
+    def is_shared_key(key: str) -> bool:
+        """
+        判断对象是否为内容寻址的共享对象（可能被同一用户的多篇游记引用）
+
+        Args:
+            key: OSS 对象键
+
+        Returns:
+            是否为共享对象
+        """
+        return "/sha256/" in key
+
+    def delete_image(self, url: str, force: bool = False) -> bool:
         """
         删除图片
 
+        内容寻址的图片可能被同一用户的多篇游记共用，删除一篇游记的图片会使其他游记的图片失效，
+        因此默认拒绝删除；确认没有其他游记引用时传入 force=True
+
         Args:
             url: 图片 URL
+            force: 是否删除内容寻址的共享对象
 
         Returns:
             是否删除成功
         """
         try:
             # 从 URL 中提取 key
-            key = url.split(f"{self.bucket_name}.{self.endpoint}/")[-1]
+            key = url.split("?")[0].split(f"{self.bucket_name}.{self.endpoint}/")[-1]
+            if self.is_shared_key(key) and not force:
+                print(f"[DEBUG OSS] 共享图片可能被其他游记引用，不删除: {key}")
+                return False
             self.bucket.delete_object(key)
+            self.upload_cache.remove(key)
             return True
         except Exception as e:
             print(f"删除图片失败: {str(e)}")
@@ -144,7 +563,8 @@ class ImageClient:
 
     def list_images_by_note(self, username: str, note_id: str) -> List[str]:
         """
-        列出指定游记的所有图片
+        列出指定游记的所有图片（仅包含按游记目录保存的旧图片，
+        内容寻址的图片通过游记的 images 字段获取）
 
         Args:
             username: 用户名
@@ -165,6 +585,89 @@ class ImageClient:
 
         return urls
 
+    def upload_images(
+        self,
+        items: List[Tuple[ImageSource, str]],
+        username: str,
+        note_id: str,
+        progress_callback: Callable[[int, int, dict], None] = None,
+        max_workers: int = None,
+        timeout: float = None,
+        variants: List[Dict[str, bytes]] = None
+    ) -> List[dict]:
+        """
+        并发上传多张图片
+
+        上传在有界线程池中进行；进度回调在调用线程中执行，可以直接更新 st.progress
+
+        Args:
+            items: (图片字节或文件对象, 文件名) 列表
+            username: 用户名
+            note_id: 游记ID
+            progress_callback: 每张图片完成时调用，参数为 (已完成数, 总数, 该图片的结果)
+            max_workers: 最大并发数，默认按配置
+            timeout: 整体超时（秒），默认按配置；超时未完成的图片记为失败
+            variants: 与 items 一一对应的缩小版本（process_image 的 variants），
+                提供时同时上传（见 upload_image_variants）
+
+        Returns:
+            与输入顺序一致的结果列表，每项包含 success、url（原图）、filename、error，
+            提供 variants 时另有 image（各版本 URL 的字典）
+        """
+        results = [
+            {"success": False, "url": "", "filename": filename, "error": ""}
+            for _, filename in items
+        ]
+        if not items:
+            return results
+
+        deadline = time.monotonic() + (timeout or self.upload_timeout)
+        executor = ThreadPoolExecutor(
+            max_workers=min(max_workers or self.upload_workers, len(items)),
+            thread_name_prefix="oss-upload"
+        )
+        try:
+            futures = {}
+            for i, (image_bytes, filename) in enumerate(items):
+                if variants is not None:
+                    future = executor.submit(
+                        self.upload_image_variants, image_bytes, username, note_id, filename, variants[i]
+                    )
+                else:
+                    future = executor.submit(self.upload_image, image_bytes, username, note_id, filename)
+                futures[future] = i
+            pending = set(futures)
+            completed = 0
+
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = results[futures[future]]
+                    try:
+                        uploaded = future.result()
+                        if variants is not None:
+                            result["image"] = uploaded
+                            uploaded = uploaded["original"]
+                        result["url"] = uploaded
+                        result["success"] = True
+                    except Exception as e:
+                        result["error"] = str(e)
+                    completed += 1
+                    if progress_callback:
+                        progress_callback(completed, len(items), result)
+
+            for future in pending:
+                future.cancel()
+                results[futures[future]]["error"] = "图片上传超时"
+        finally:
+            # 不等待超时的上传结束，尚未开始的任务直接取消
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return results
+
     def batch_upload(
         self,
         images: List[bytes],
@@ -180,16 +683,69 @@ class ImageClient:
             note_id: 游记ID
 
         Returns:
-            图片 URL 列表
+            图片 URL 列表，上传失败的位置为空字符串
         """
+        items = [(image_bytes, f"image_{i + 1}.jpg") for i, image_bytes in enumerate(images)]
         urls = []
-        for i, image_bytes in enumerate(images):
-            filename = f"image_{i + 1}.jpg"
-            try:
-                url = self.upload_image(image_bytes, username, note_id, filename)
-                urls.append(url)
-            except Exception as e:
-                print(f"上传第 {i + 1} 张图片失败: {str(e)}")
-                urls.append("")
+        for i, result in enumerate(self.upload_images(items, username, note_id)):
+            if not result["success"]:
+                print(f"上传第 {i + 1} 张图片失败: {result['error']}")
+            urls.append(result["url"])
 
         return urls
+
+
+_image_client: Optional[ImageClient] = None
+_image_client_lock = threading.Lock()
+
+
+def get_image_client() -> ImageClient:
+    """
+    获取进程内共享的图片客户端
+
+    Returns:
+        图片客户端
+    """
+    global _image_client
+    with _image_client_lock:
+        if _image_client is None:
+            _image_client = ImageClient()
+        return _image_client
+
+
+def sized_image_url(entry: Union[str, dict, None], width: int) -> str:
+    """
+    获取适合显示宽度的图片 URL
+
+    有上传时生成的版本则选用不小于该宽度的最小版本，否则（旧记录）使用 OSS 图片处理缩放
+
+    Args:
+        entry: 游记 images 中的元素或图片 URL
+        width: 显示宽度（像素）
+
+    Returns:
+        图片 URL
+    """
+    if isinstance(entry, dict):
+        return image_url(entry, width)
+    return get_image_client().processed_url(entry, width=width, format="webp", quality=80)
+
+
+def rewrite_markdown_images(markdown: str, width: int = IMAGE_VARIANTS["display"]) -> str:
+    """
+    将 Markdown 中的图片引用替换为适合显示宽度的 URL
+
+    Args:
+        markdown: Markdown 文本
+        width: 显示宽度（像素）
+
+    Returns:
+        替换后的 Markdown
+    """
+    if not markdown or "![" not in markdown:
+        return markdown
+
+    def replace(match: re.Match) -> str:
+        return f"{match.group(1)}{sized_image_url(match.group(2), width)}{match.group(3) or ''})"
+
+    return MARKDOWN_IMAGE_PATTERN.sub(replace, markdown)
@@ -0,0 +1,109 @@
+# note_cache.py
+# -*- coding: utf-8 -*-
+"""
+游记快照缓存模块
+记录最近读取或保存过的游记内容，更新游记时据此只提交有变化的字段
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class NoteSnapshotCache:
+    """进程内共享的游记快照缓存（LRU）"""
+
+    def __init__(self, max_entries: int = 256, ttl: float = 300):
+        """
+        初始化缓存
+
+        Args:
+            max_entries: 最多缓存的游记数
+            ttl: 快照有效期（秒），过期后视为未知，避免基于其他进程已修改的旧内容做比较
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # note_id -> (保存时间, 游记字段)
+        self._notes: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, note_id: str) -> Optional[dict]:
+        """
+        获取游记快照
+
+        Args:
+            note_id: 游记 ID
+
+        Returns:
+            游记字段的副本，未缓存或已过期返回 None
+        """
+        with self._lock:
+            item = self._notes.get(note_id)
+            if item is None:
+                return None
+            saved_at, note = item
+            if time.time() - saved_at > self.ttl:
+                del self._notes[note_id]
+                return None
+            self._notes.move_to_end(note_id)
+            return copy.deepcopy(note)
+
+    def put(self, note_id: str, note: dict) -> None:
+        """
+        保存游记快照
+
+        Args:
+            note_id: 游记 ID
+            note: 游记字段
+        """
+        with self._lock:
+            self._notes[note_id] = (time.time(), copy.deepcopy(note))
+            self._notes.move_to_end(note_id)
+            while len(self._notes) > self.max_entries:
+                self._notes.popitem(last=False)
+
+    def merge(self, note_id: str, fields: dict) -> None:
+        """
+        将已保存的修改合并到快照，未缓存时忽略
+
+        Args:
+            note_id: 游记 ID
+            fields: 修改的字段
+        """
+        with self._lock:
+            item = self._notes.get(note_id)
+            if item is None:
+                return
+            note = item[1]
+            note.update(copy.deepcopy(fields))
+            self._notes[note_id] = (time.time(), note)
+
+    def remove(self, note_id: str) -> None:
+        """
+        删除快照
+
+        Args:
+            note_id: 游记 ID
+        """
+        with self._lock:
+            self._notes.pop(note_id, None)
+
+
+_note_cache: Optional[NoteSnapshotCache] = None
+_note_cache_lock = threading.Lock()
+
+
+def get_note_cache() -> NoteSnapshotCache:
+    """
+    获取进程内共享的游记快照缓存
+
+    Returns:
+        游记快照缓存
+    """
+    global _note_cache
+    with _note_cache_lock:
+        if _note_cache is None:
+            _note_cache = NoteSnapshotCache()
+        return _note_cache
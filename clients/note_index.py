@@ -0,0 +1,127 @@
+# note_index.py
+# -*- coding: utf-8 -*-
+"""
+游记索引模块
+在本地 SQLite 中持久化 note_id → record_id 映射，
+更新/删除游记时无需先扫描飞书表格查找记录 ID
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Iterable, Optional, Tuple
+from utils.config import get_config
+
+
+class NoteIndex:
+    """note_id → record_id 持久化索引"""
+
+    _init_lock = threading.Lock()
+    _initialized_paths = set()
+
+    def __init__(self, db_path: str = None):
+        """
+        初始化索引
+
+        Args:
+            db_path: 数据库文件路径，默认位于本地数据目录
+        """
+        if db_path is None:
+            db_path = os.path.join(get_config().get_local_data_dir(), "note_index.db")
+        self.db_path = db_path
+        self._ensure_schema()
+
+    def _execute(self, sql: str, params: tuple = ()) -> Optional[tuple]:
+        """
+        在独立连接中执行一条语句并提交
+
+        Args:
+            sql: SQL 语句
+            params: 参数
+
+        Returns:
+            第一行结果
+        """
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            with conn:
+                return conn.execute(sql, params).fetchone()
+        finally:
+            conn.close()
+
+    def _ensure_schema(self) -> None:
+        """创建索引表（每个进程每个文件只执行一次）"""
+        with NoteIndex._init_lock:
+            if self.db_path in NoteIndex._initialized_paths:
+                return
+
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            self._execute(
+                "CREATE TABLE IF NOT EXISTS note_index ("
+                "note_id TEXT PRIMARY KEY, "
+                "record_id TEXT NOT NULL)"
+            )
+            NoteIndex._initialized_paths.add(self.db_path)
+
+    def get(self, note_id: str) -> Optional[str]:
+        """
+        查询游记对应的记录 ID
+
+        Args:
+            note_id: 游记 ID
+
+        Returns:
+            记录 ID，未收录返回 None
+        """
+        row = self._execute(
+            "SELECT record_id FROM note_index WHERE note_id = ?",
+            (note_id,)
+        )
+        return row[0] if row else None
+
+    def put(self, note_id: str, record_id: str) -> None:
+        """
+        写入映射
+
+        Args:
+            note_id: 游记 ID
+            record_id: 飞书记录 ID
+        """
+        if not note_id or not record_id:
+            return
+        self._execute(
+            "INSERT OR REPLACE INTO note_index (note_id, record_id) VALUES (?, ?)",
+            (note_id, record_id)
+        )
+
+    def put_many(self, pairs: Iterable[Tuple[str, str]]) -> None:
+        """
+        在一个事务中批量写入映射
+
+        Args:
+            pairs: (游记 ID, 飞书记录 ID) 列表，任一为空的项被跳过
+        """
+        rows = [(note_id, record_id) for note_id, record_id in pairs if note_id and record_id]
+        if not rows:
+            return
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO note_index (note_id, record_id) VALUES (?, ?)",
+                    rows
+                )
+        finally:
+            conn.close()
+
+    def delete(self, note_id: str) -> None:
+        """
+        删除映射
+
+        Args:
+            note_id: 游记 ID
+        """
+        self._execute("DELETE FROM note_index WHERE note_id = ?", (note_id,))
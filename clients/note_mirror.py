@@ -0,0 +1,302 @@
+# note_mirror.py
+# -*- coding: utf-8 -*-
+"""
+游记本地镜像模块
+在本地 SQLite 中保存游记表的只读副本，按用户增量同步，
+读取游记时无需每次访问飞书
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, List
+from utils.config import get_config
+
+
+class NoteMirror:
+    """游记表的本地 SQLite 镜像"""
+
+    _init_lock = threading.Lock()
+    _initialized_paths = set()
+
+    def __init__(self, db_path: str = None):
+        """
+        初始化镜像
+
+        Args:
+            db_path: 数据库文件路径，默认位于本地数据目录
+        """
+        if db_path is None:
+            db_path = os.path.join(get_config().get_local_data_dir(), "note_mirror.db")
+        self.db_path = db_path
+        self._ensure_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        """创建数据库连接"""
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def _ensure_schema(self) -> None:
+        """创建镜像表和索引（每个进程每个文件只执行一次）"""
+        with NoteMirror._init_lock:
+            if self.db_path in NoteMirror._initialized_paths:
+                return
+
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.executescript(
+                        "CREATE TABLE IF NOT EXISTS notes ("
+                        "  note_id TEXT PRIMARY KEY,"
+                        "  record_id TEXT NOT NULL,"
+                        "  username TEXT NOT NULL,"
+                        "  travel_date INTEGER,"
+                        "  updated_at INTEGER NOT NULL DEFAULT 0,"
+                        "  fields TEXT NOT NULL"
+                        ");"
+                        "CREATE INDEX IF NOT EXISTS idx_notes_username ON notes (username);"
+                        "CREATE INDEX IF NOT EXISTS idx_notes_travel_date ON notes (username, travel_date);"
+                        "CREATE TABLE IF NOT EXISTS sync_state ("
+                        "  username TEXT PRIMARY KEY,"
+                        "  synced_at REAL NOT NULL"
+                        ");"
+                    )
+            finally:
+                conn.close()
+            NoteMirror._initialized_paths.add(self.db_path)
+
+    @staticmethod
+    def _row_to_record(row: tuple) -> dict:
+        """将数据库行还原为飞书记录格式"""
+        return {"record_id": row[0], "fields": json.loads(row[1])}
+
+    # ===== 读取 =====
+
+    def get(self, note_id: str) -> Optional[dict]:
+        """
+        获取游记记录
+
+        Args:
+            note_id: 游记 ID
+
+        Returns:
+            飞书记录格式的游记，不存在返回 None
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT record_id, fields FROM notes WHERE note_id = ?",
+                (note_id,)
+            ).fetchone()
+        finally:
+            conn.close()
+        return self._row_to_record(row) if row else None
+
+    def list_by_user(self, username: str, limit: int = 20) -> List[dict]:
+        """
+        列出用户的游记记录，按旅行日期降序
+
+        Args:
+            username: 用户名
+            limit: 数量限制
+
+        Returns:
+            飞书记录格式的游记列表
+        """
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT record_id, fields FROM notes WHERE username = ? "
+                "ORDER BY travel_date DESC LIMIT ?",
+                (username, limit)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [self._row_to_record(row) for row in rows]
+
+    def is_fresh(self, username: str, max_staleness: float) -> bool:
+        """
+        检查用户数据是否在允许的陈旧时间内
+
+        Args:
+            username: 用户名
+            max_staleness: 最大陈旧时间（秒）
+
+        Returns:
+            是否新鲜
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT synced_at FROM sync_state WHERE username = ?",
+                (username,)
+            ).fetchone()
+        finally:
+            conn.close()
+        return bool(row) and time.time() - row[0] <= max_staleness
+
+    # ===== 写入 =====
+
+    def upsert(self, record: dict) -> None:
+        """
+        写入或覆盖一条游记记录
+
+        Args:
+            record: 飞书记录（包含 record_id 和 fields）
+        """
+        self.upsert_many([record])
+
+    def upsert_many(self, records: List[dict]) -> None:
+        """
+        批量写入游记记录
+
+        Args:
+            records: 飞书记录列表
+        """
+        rows = []
+        for record in records:
+            fields = record.get("fields") or {}
+            if not fields.get("note_id"):
+                continue
+            rows.append((
+                fields["note_id"],
+                record.get("record_id", ""),
+                fields.get("username", ""),
+                fields.get("travel_date"),
+                fields.get("updated_at") or 0,
+                json.dumps(fields, ensure_ascii=False)
+            ))
+
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO notes "
+                    "(note_id, record_id, username, travel_date, updated_at, fields) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+        finally:
+            conn.close()
+
+    def merge_fields(self, note_id: str, fields: dict) -> bool:
+        """
+        将更新后的字段合并到已有记录
+
+        Args:
+            note_id: 游记 ID
+            fields: 更新的字段
+
+        Returns:
+            记录是否存在
+        """
+        record = self.get(note_id)
+        if not record:
+            return False
+        record["fields"].update(fields)
+        self.upsert(record)
+        return True
+
+    def delete(self, note_id: str) -> None:
+        """
+        删除游记记录
+
+        Args:
+            note_id: 游记 ID
+        """
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM notes WHERE note_id = ?", (note_id,))
+        finally:
+            conn.close()
+
+    def invalidate(self, username: str) -> None:
+        """
+        标记用户数据需要重新同步
+
+        Args:
+            username: 用户名
+        """
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM sync_state WHERE username = ?", (username,))
+        finally:
+            conn.close()
+
+    def invalidate_note(self, note_id: str) -> None:
+        """
+        标记游记所属用户需要重新同步（保留本地副本直到同步完成）
+
+        Args:
+            note_id: 游记 ID
+        """
+        record = self.get(note_id)
+        if record:
+            self.invalidate(record["fields"].get("username", ""))
+
+    # ===== 同步 =====
+
+    def sync(self, storage, username: str) -> dict:
+        """
+        增量同步用户的游记
+
+        先拉取用户全部记录的 note_id 和 updated_at，
+        只下载新增或修改过的记录，并删除飞书中已不存在的记录。
+
+        Args:
+            storage: 存储后端（如 FeishuClient）
+            username: 用户名
+
+        Returns:
+            同步统计 {"fetched": 下载数, "deleted": 删除数}
+        """
+        started_at = time.time()
+
+        conn = self._connect()
+        try:
+            local = {
+                note_id: (record_id, updated_at)
+                for note_id, record_id, updated_at in conn.execute(
+                    "SELECT note_id, record_id, updated_at FROM notes WHERE username = ?",
+                    (username,)
+                )
+            }
+        finally:
+            conn.close()
+
+        changed = []
+        remote_ids = set()
+        for version in storage.list_trip_note_versions(username):
+            fields = version.get("fields", {})
+            note_id = fields.get("note_id")
+            if not note_id:
+                continue
+            remote_ids.add(note_id)
+            known = local.get(note_id)
+            if not known or known[1] < (fields.get("updated_at") or 0):
+                changed.append(version.get("record_id"))
+
+        if changed:
+            self.upsert_many(storage.batch_get_trip_notes(changed))
+
+        removed = [note_id for note_id in local if note_id not in remote_ids]
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany("DELETE FROM notes WHERE note_id = ?", [(n,) for n in removed])
+                conn.execute(
+                    "INSERT OR REPLACE INTO sync_state (username, synced_at) VALUES (?, ?)",
+                    (username, started_at)
+                )
+        finally:
+            conn.close()
+
+        print(f"[DEBUG] 镜像同步 {username}: 下载 {len(changed)} 条，删除 {len(removed)} 条")
+        return {"fetched": len(changed), "deleted": len(removed)}
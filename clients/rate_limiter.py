@@ -0,0 +1,193 @@
+# rate_limiter.py
+# -*- coding: utf-8 -*-
+"""
+请求调度模块
+令牌桶限制每个应用的请求速率和并发数，
+对限流和临时错误进行带随机抖动的指数退避重试
+"""
+
+import random
+import threading
+import time
+from typing import Callable, Dict, TypeVar
+from utils.config import get_config
+
+T = TypeVar("T")
+
+
+class RetryableError(Exception):
+    """可重试的请求错误"""
+
+    def __init__(self, message: str, throttled: bool = False, retry_after: float = None):
+        """
+        初始化错误
+
+        Args:
+            message: 错误信息
+            throttled: 是否因限流失败
+            retry_after: 服务端建议的重试等待时间（秒）
+        """
+        super().__init__(message)
+        self.throttled = throttled
+        self.retry_after = retry_after
+
+
+class RequestScheduler:
+    """令牌桶请求调度器"""
+
+    def __init__(
+        self,
+        qps: float,
+        max_concurrency: int = 8,
+        max_retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        burst: float = None
+    ):
+        """
+        初始化调度器
+
+        Args:
+            qps: 每秒允许发出的请求数
+            max_concurrency: 同时进行的最大请求数
+            max_retries: 最大重试次数
+            base_delay: 退避基础时间（秒）
+            max_delay: 单次退避上限（秒）
+            burst: 令牌桶容量，默认等于 qps
+
+        Raises:
+            ValueError: qps 或 max_concurrency 不是正数（如配置 FEISHU_QPS = 0）
+        """
+        if qps <= 0:
+            raise ValueError(f"每秒请求数必须大于 0，当前为 {qps}（FEISHU_QPS）")
+        if max_concurrency <= 0:
+            raise ValueError(f"最大并发数必须大于 0，当前为 {max_concurrency}（FEISHU_MAX_CONCURRENCY）")
+        self.qps = qps
+        self.capacity = burst if burst is not None else max(qps, 1)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+
+        self._metrics = {
+            "queue_depth": 0,
+            "in_flight": 0,
+            "requests": 0,
+            "retries": 0,
+            "throttled": 0,
+            "failures": 0
+        }
+
+    def _take_token(self) -> None:
+        """阻塞直到令牌桶中有可用令牌"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.qps)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.qps
+            time.sleep(wait)
+
+    def _backoff(self, attempt: int, error: RetryableError) -> float:
+        """
+        计算退避时间（full jitter）
+
+        Args:
+            attempt: 已重试次数（从 0 开始）
+            error: 本次错误
+
+        Returns:
+            等待时间（秒）
+        """
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if error.retry_after:
+            delay = max(delay, error.retry_after)
+        return delay
+
+    def _update(self, key: str, delta: int) -> None:
+        """更新计数"""
+        with self._lock:
+            self._metrics[key] += delta
+
+    def call(self, send: Callable[[], T]) -> T:
+        """
+        在速率和并发限制下执行请求，可重试错误自动退避重试
+
+        Args:
+            send: 执行一次请求的函数，可重试的失败抛出 RetryableError
+
+        Returns:
+            send 的返回值
+        """
+        attempt = 0
+        while True:
+            self._update("queue_depth", 1)
+            try:
+                self._take_token()
+                self._semaphore.acquire()
+            finally:
+                self._update("queue_depth", -1)
+
+            self._update("in_flight", 1)
+            self._update("requests", 1)
+            try:
+                return send()
+            except RetryableError as e:
+                if e.throttled:
+                    self._update("throttled", 1)
+                if attempt >= self.max_retries:
+                    self._update("failures", 1)
+                    raise Exception(f"请求重试 {attempt} 次后仍失败: {str(e)}")
+                delay = self._backoff(attempt, e)
+                print(f"[DEBUG] 请求失败，{delay:.2f} 秒后第 {attempt + 1} 次重试: {str(e)}")
+                self._update("retries", 1)
+                attempt += 1
+            finally:
+                self._update("in_flight", -1)
+                self._semaphore.release()
+
+            time.sleep(delay)
+
+    def get_metrics(self) -> dict:
+        """
+        获取调度指标
+
+        Returns:
+            queue_depth（排队数）、in_flight（进行中）、requests、retries、throttled、failures
+        """
+        with self._lock:
+            return dict(self._metrics)
+
+
+_schedulers: Dict[str, RequestScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(app_id: str) -> RequestScheduler:
+    """
+    获取应用在进程内共享的调度器
+
+    Args:
+        app_id: 应用 ID，每个应用独立计算 QPS 预算
+
+    Returns:
+        请求调度器
+    """
+    with _schedulers_lock:
+        scheduler = _schedulers.get(app_id)
+        if scheduler is None:
+            config = get_config()
+            scheduler = RequestScheduler(
+                qps=config.get_feishu_qps(),
+                max_concurrency=config.get_feishu_max_concurrency(),
+                max_retries=config.get_feishu_max_retries()
+            )
+            _schedulers[app_id] = scheduler
+        return scheduler
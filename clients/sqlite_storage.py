@@ -0,0 +1,572 @@
+# sqlite_storage.py
+# -*- coding: utf-8 -*-
+"""
+SQLite 存储后端模块
+在本地 SQLite 中保存用户和游记，接口和记录格式与 FeishuClient 相同，
+用于离线开发、压测，以及衡量飞书后端的额外开销
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Iterator, List, Optional, Tuple, Union
+from utils.config import get_config
+from clients.field_codec import get_field_codec
+from clients.storage import StorageBackend, date_to_timestamp
+
+USER_COLUMNS = ["username", "password", "status", "role", "created_at"]
+
+NOTE_COLUMNS = [
+    "note_id", "username", "title", "location", "travel_date", "images", "ocr_results",
+    "user_notes", "ai_content", "summary", "cover_image", "image_count", "created_at", "updated_at"
+]
+
+# list_trip_notes 允许的排序字段
+SORTABLE_COLUMNS = {"travel_date", "created_at", "updated_at", "title"}
+
+
+class SQLiteStorage(StorageBackend):
+    """本地 SQLite 存储后端"""
+
+    _init_lock = threading.Lock()
+    _initialized_paths = set()
+
+    def __init__(self, db_path: str = None):
+        """
+        初始化存储
+
+        Args:
+            db_path: 数据库文件路径，默认按配置
+        """
+        config = get_config()
+        self.db_path = db_path or config.get_sqlite_storage_path()
+        self.codec = get_field_codec()
+        self._ensure_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        """创建数据库连接"""
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def _ensure_schema(self) -> None:
+        """创建数据表和索引（每个进程每个文件只执行一次）"""
+        with SQLiteStorage._init_lock:
+            if self.db_path in SQLiteStorage._initialized_paths:
+                return
+
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            conn = self._connect()
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                with conn:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS users ("
+                        "record_id TEXT PRIMARY KEY, "
+                        "username TEXT NOT NULL UNIQUE, "
+                        "password TEXT NOT NULL, "
+                        "status TEXT NOT NULL, "
+                        "role TEXT NOT NULL, "
+                        "created_at INTEGER NOT NULL)"
+                    )
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS notes ("
+                        "record_id TEXT PRIMARY KEY, "
+                        "note_id TEXT NOT NULL UNIQUE, "
+                        "username TEXT NOT NULL, "
+                        "title TEXT, "
+                        "location TEXT, "
+                        "travel_date INTEGER, "
+                        "images TEXT, "
+                        "ocr_results TEXT, "
+                        "user_notes TEXT, "
+                        "ai_content TEXT, "
+                        "summary TEXT, "
+                        "cover_image TEXT, "
+                        "image_count INTEGER, "
+                        "created_at INTEGER NOT NULL, "
+                        "updated_at INTEGER NOT NULL)"
+                    )
+                    conn.execute(
+                        "CREATE INDEX IF NOT EXISTS idx_notes_user_travel_date "
+                        "ON notes (username, travel_date)"
+                    )
+                    conn.execute(
+                        "CREATE INDEX IF NOT EXISTS idx_notes_user_created_at "
+                        "ON notes (username, created_at)"
+                    )
+            finally:
+                conn.close()
+            SQLiteStorage._initialized_paths.add(self.db_path)
+
+    @staticmethod
+    def _new_record_id() -> str:
+        """生成与飞书格式相似的记录 ID"""
+        return "rec" + uuid.uuid4().hex[:16]
+
+    @staticmethod
+    def _now() -> int:
+        """当前时间的毫秒时间戳"""
+        return int(time.time() * 1000)
+
+    @staticmethod
+    def _to_record(columns: List[str], row: tuple) -> dict:
+        """
+        将查询结果转换为记录
+
+        Args:
+            columns: 字段名（第一个为 record_id）
+            row: 查询结果
+
+        Returns:
+            记录（包含 record_id 和 fields）
+        """
+        fields = {
+            column: value
+            for column, value in zip(columns[1:], row[1:])
+            if value is not None
+        }
+        return {"record_id": row[0], "fields": fields}
+
+    @staticmethod
+    def _note_columns(field_names: List[str] = None) -> List[str]:
+        """需要查询的游记字段，第一个为 record_id"""
+        if not field_names:
+            return ["record_id"] + NOTE_COLUMNS
+        return ["record_id"] + [name for name in field_names if name in NOTE_COLUMNS]
+
+    def _select_notes(self, where: str, params: tuple, field_names: List[str] = None, suffix: str = "") -> List[dict]:
+        """
+        查询游记记录
+
+        Args:
+            where: WHERE 条件
+            params: 参数
+            field_names: 需要返回的字段
+            suffix: ORDER BY / LIMIT 子句
+
+        Returns:
+            记录列表
+        """
+        columns = self._note_columns(field_names)
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                f"SELECT {', '.join(columns)} FROM notes WHERE {where} {suffix}",
+                params
+            ).fetchall()
+        finally:
+            conn.close()
+        return [self._to_record(columns, row) for row in rows]
+
+    def _get_note_by_record_id(self, conn: sqlite3.Connection, record_id: str) -> Optional[dict]:
+        """在指定连接中按记录 ID 读取游记"""
+        columns = self._note_columns()
+        row = conn.execute(
+            f"SELECT {', '.join(columns)} FROM notes WHERE record_id = ?",
+            (record_id,)
+        ).fetchone()
+        return self._to_record(columns, row) if row else None
+
+    # ===== 用户数据操作 =====
+
+    def create_user(self, username: str, password: str, status: str = "pending", role: str = "user") -> dict:
+        """
+        创建用户
+
+        Args:
+            username: 用户名
+            password: 密码
+            status: 状态 (pending/active)
+            role: 用户角色 (user/admin)
+
+        Returns:
+            创建的用户记录
+        """
+        record_id = self._new_record_id()
+        fields = {
+            "username": username,
+            "password": password,
+            "status": status,
+            "role": role,
+            "created_at": self._now()
+        }
+
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO users (record_id, username, password, status, role, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (record_id, username, password, status, role, fields["created_at"])
+                )
+        except sqlite3.IntegrityError:
+            raise Exception(f"用户已存在: {username}")
+        finally:
+            conn.close()
+
+        return {"record": {"record_id": record_id, "fields": fields}}
+
+    def get_user(self, username: str) -> Optional[dict]:
+        """
+        根据用户名获取用户
+
+        Args:
+            username: 用户名
+
+        Returns:
+            用户记录，不存在返回 None
+        """
+        columns = ["record_id"] + USER_COLUMNS
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                f"SELECT {', '.join(columns)} FROM users WHERE username = ?",
+                (username,)
+            ).fetchone()
+        finally:
+            conn.close()
+        return self._to_record(columns, row) if row else None
+
+    def _update_user(self, record_id: str, column: str, value: str) -> dict:
+        """更新用户的单个字段"""
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.execute(
+                    f"UPDATE users SET {column} = ? WHERE record_id = ?",
+                    (value, record_id)
+                )
+        finally:
+            conn.close()
+        if cursor.rowcount == 0:
+            raise Exception(f"用户记录不存在: {record_id}")
+        return {"record": {"record_id": record_id, "fields": {column: value}}}
+
+    def update_user_status(self, record_id: str, status: str) -> dict:
+        """
+        更新用户状态
+
+        Args:
+            record_id: 记录 ID
+            status: 新状态
+
+        Returns:
+            更新后的记录
+        """
+        return self._update_user(record_id, "status", status)
+
+    def update_user_password(self, record_id: str, password: str) -> dict:
+        """
+        更新用户密码
+
+        Args:
+            record_id: 记录 ID
+            password: 新密码（明文）
+
+        Returns:
+            更新后的记录
+        """
+        return self._update_user(record_id, "password", password)
+
+    # ===== 游记数据操作 =====
+
+    def _insert_note(self, conn: sqlite3.Connection, note_data: dict) -> dict:
+        """在指定连接中插入一条游记，返回新记录"""
+        record_id = self._new_record_id()
+        fields = self._build_note_fields(note_data)
+        now = self._now()
+        fields["created_at"] = now
+        fields["updated_at"] = now
+
+        conn.execute(
+            f"INSERT INTO notes (record_id, {', '.join(NOTE_COLUMNS)}) "
+            f"VALUES (?, {', '.join('?' for _ in NOTE_COLUMNS)})",
+            (record_id,) + tuple(fields.get(column) for column in NOTE_COLUMNS)
+        )
+        return {"record_id": record_id, "fields": fields}
+
+    def _update_note(self, conn: sqlite3.Connection, record_id: str, note_data: dict) -> Optional[dict]:
+        """在指定连接中更新一条游记，返回更新后的记录，不存在返回 None"""
+        fields = self._build_note_update_fields(note_data)
+        cursor = conn.execute(
+            f"UPDATE notes SET {', '.join(f'{key} = ?' for key in fields)} WHERE record_id = ?",
+            tuple(fields.values()) + (record_id,)
+        )
+        if cursor.rowcount == 0:
+            return None
+        return self._get_note_by_record_id(conn, record_id)
+
+    def create_trip_note(self, note_data: dict) -> dict:
+        """
+        创建游记
+
+        Args:
+            note_data: 游记数据
+
+        Returns:
+            创建的游记记录
+        """
+        conn = self._connect()
+        try:
+            with conn:
+                record = self._insert_note(conn, note_data)
+        except sqlite3.IntegrityError:
+            raise Exception(f"游记已存在: {note_data.get('note_id')}")
+        finally:
+            conn.close()
+        return {"record": record}
+
+    def get_trip_note(self, note_id: str, field_names: List[str] = None) -> Optional[dict]:
+        """
+        获取游记
+
+        Args:
+            note_id: 游记 ID
+            field_names: 需要返回的字段，None 表示全部字段
+
+        Returns:
+            游记记录，不存在返回 None
+        """
+        records = self._select_notes("note_id = ?", (note_id,), field_names)
+        return records[0] if records else None
+
+    def _note_where(
+        self,
+        username: str,
+        date_from: Union[str, int] = None,
+        date_to: Union[str, int] = None
+    ) -> Tuple[str, tuple]:
+        """构建按用户和旅行日期范围筛选的条件"""
+        where = ["username = ?"]
+        params = [username]
+        start = date_to_timestamp(date_from)
+        if start is not None:
+            where.append("travel_date >= ?")
+            params.append(start)
+        end = date_to_timestamp(date_to)
+        if end is not None:
+            where.append("travel_date <= ?")
+            params.append(end)
+        return " AND ".join(where), tuple(params)
+
+    def list_trip_notes(
+        self,
+        username: str,
+        limit: int = 20,
+        date_from: Union[str, int] = None,
+        date_to: Union[str, int] = None,
+        sort_by: str = None,
+        descending: bool = True,
+        field_names: List[str] = None
+    ) -> List[dict]:
+        """
+        列出用户的游记
+
+        Args:
+            username: 用户名
+            limit: 返回数量限制，不大于 0 时返回空列表
+            date_from: 旅行日期下限（含），YYYY-MM-DD 或毫秒时间戳
+            date_to: 旅行日期上限（含），YYYY-MM-DD 或毫秒时间戳
+            sort_by: 排序字段，如 travel_date、created_at
+            descending: 是否降序
+            field_names: 需要返回的字段，None 表示全部字段
+
+        Returns:
+            游记记录列表
+        """
+        # SQLite 的负数 LIMIT 表示不限制，与飞书后端保持一致
+        if limit <= 0:
+            return []
+
+        where, params = self._note_where(username, date_from, date_to)
+        suffix = ""
+        if sort_by:
+            if sort_by not in SORTABLE_COLUMNS:
+                raise ValueError(f"不支持的排序字段: {sort_by}")
+            suffix = f"ORDER BY {sort_by} {'DESC' if descending else 'ASC'}"
+        return self._select_notes(where, params + (limit,), field_names, f"{suffix} LIMIT ?")
+
+    def iter_trip_notes(self, username: str, field_names: List[str] = None) -> Iterator[dict]:
+        """
+        流式遍历用户的全部游记
+
+        Args:
+            username: 用户名
+            field_names: 需要返回的字段，None 表示全部字段
+
+        Yields:
+            游记记录
+        """
+        columns = self._note_columns(field_names)
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                f"SELECT {', '.join(columns)} FROM notes WHERE username = ?",
+                (username,)
+            )
+            for row in cursor:
+                yield self._to_record(columns, row)
+        finally:
+            conn.close()
+
+    def list_trip_note_versions(self, username: str) -> List[dict]:
+        """
+        列出用户全部游记的版本信息（仅 note_id 和 updated_at）
+
+        Args:
+            username: 用户名
+
+        Returns:
+            游记记录列表，fields 只包含 note_id 和 updated_at
+        """
+        return self._select_notes("username = ?", (username,), ["note_id", "updated_at"])
+
+    def batch_get_trip_notes(self, record_ids: List[str]) -> List[dict]:
+        """
+        按记录 ID 批量获取游记
+
+        Args:
+            record_ids: 记录 ID 列表
+
+        Returns:
+            游记记录列表
+        """
+        if not record_ids:
+            return []
+        placeholders = ", ".join("?" for _ in record_ids)
+        return self._select_notes(f"record_id IN ({placeholders})", tuple(record_ids))
+
+    def update_trip_note(self, record_id: str, note_data: dict) -> dict:
+        """
+        更新游记
+
+        Args:
+            record_id: 记录 ID
+            note_data: 更新数据
+
+        Returns:
+            更新后的记录
+        """
+        conn = self._connect()
+        try:
+            with conn:
+                record = self._update_note(conn, record_id, note_data)
+        finally:
+            conn.close()
+        if record is None:
+            raise Exception(f"游记记录不存在: {record_id}")
+        return {"record": record}
+
+    def delete_trip_note(self, record_id: str) -> bool:
+        """
+        删除游记
+
+        Args:
+            record_id: 记录 ID
+
+        Returns:
+            是否删除成功
+        """
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.execute("DELETE FROM notes WHERE record_id = ?", (record_id,))
+        finally:
+            conn.close()
+        return cursor.rowcount > 0
+
+    # ===== 游记批量操作 =====
+
+    def _batch(self, items: list, apply) -> List[dict]:
+        """
+        在一个事务中逐条执行批量操作，每条使用保存点，单条失败不影响其他记录
+
+        Args:
+            items: 每条记录的参数
+            apply: (连接, 参数) -> 记录 ID，失败时抛出异常
+
+        Returns:
+            与输入顺序一致的结果列表，每项包含 success、record_id、error
+        """
+        results = []
+        conn = self._connect()
+        # 手动控制事务，保存点嵌套在同一个事务中
+        conn.isolation_level = None
+        try:
+            conn.execute("BEGIN")
+            try:
+                for item in items:
+                    conn.execute("SAVEPOINT item")
+                    try:
+                        record_id = apply(conn, item)
+                        conn.execute("RELEASE item")
+                        results.append({"success": True, "record_id": record_id, "error": ""})
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO item")
+                        conn.execute("RELEASE item")
+                        results.append({"success": False, "record_id": "", "error": str(e)})
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+        return results
+
+    def batch_create_trip_notes(self, notes: List[dict]) -> List[dict]:
+        """
+        批量创建游记
+
+        Args:
+            notes: 游记数据列表
+
+        Returns:
+            与输入顺序一致的结果列表，每项包含 success、record_id、error
+        """
+        return self._batch(notes, lambda conn, note: self._insert_note(conn, note)["record_id"])
+
+    def batch_update_trip_notes(self, updates: List[Tuple[str, dict]]) -> List[dict]:
+        """
+        批量更新游记
+
+        Args:
+            updates: (记录 ID, 更新数据) 列表
+
+        Returns:
+            与输入顺序一致的结果列表，每项包含 success、record_id、error
+        """
+        def apply(conn: sqlite3.Connection, update: Tuple[str, dict]) -> str:
+            record_id, note_data = update
+            if self._update_note(conn, record_id, note_data) is None:
+                raise Exception(f"游记记录不存在: {record_id}")
+            return record_id
+
+        results = self._batch(updates, apply)
+        for result, (record_id, _) in zip(results, updates):
+            result["record_id"] = result["record_id"] or record_id
+        return results
+
+    def batch_delete_trip_notes(self, record_ids: List[str]) -> List[dict]:
+        """
+        批量删除游记
+
+        Args:
+            record_ids: 记录 ID 列表
+
+        Returns:
+            与输入顺序一致的结果列表，每项包含 success、record_id、error
+        """
+        def apply(conn: sqlite3.Connection, record_id: str) -> str:
+            cursor = conn.execute("DELETE FROM notes WHERE record_id = ?", (record_id,))
+            if cursor.rowcount == 0:
+                raise Exception(f"游记记录不存在: {record_id}")
+            return record_id
+
+        results = self._batch(list(record_ids), apply)
+        for result, record_id in zip(results, record_ids):
+            result["record_id"] = result["record_id"] or record_id
+        return results
@@ -0,0 +1,188 @@
+# storage.py
+# -*- coding: utf-8 -*-
+"""
+存储后端模块
+定义用户和游记数据的存储接口。记录统一使用飞书多维表格的格式
+{"record_id": ..., "fields": {...}}，UserClient、AuthClient 不关心具体后端。
+"""
+
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple, Union
+from clients.field_codec import FieldCodec
+from utils.config import get_config
+
+
+def date_to_timestamp(value: Union[str, int, None]) -> Optional[int]:
+    """
+    将日期转换为飞书日期字段使用的毫秒时间戳
+
+    Args:
+        value: YYYY-MM-DD 格式字符串或毫秒时间戳
+
+    Returns:
+        毫秒时间戳，无法解析返回 None
+    """
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value:
+        try:
+            dt = datetime.strptime(value, "%Y-%m-%d")
+            return int(dt.timestamp() * 1000)
+        except ValueError:
+            return None
+    return None
+
+
+class StorageBackend(ABC):
+    """用户和游记的存储接口"""
+
+    codec: FieldCodec
+
+    # ===== 用户数据操作 =====
+
+    @abstractmethod
+    def create_user(self, username: str, password: str, status: str = "pending", role: str = "user") -> dict:
+        """创建用户，返回 {"record": 用户记录}"""
+
+    @abstractmethod
+    def get_user(self, username: str) -> Optional[dict]:
+        """根据用户名获取用户记录，不存在返回 None"""
+
+    @abstractmethod
+    def update_user_status(self, record_id: str, status: str) -> dict:
+        """更新用户状态"""
+
+    @abstractmethod
+    def update_user_password(self, record_id: str, password: str) -> dict:
+        """更新用户密码"""
+
+    # ===== 游记数据操作 =====
+
+    @abstractmethod
+    def create_trip_note(self, note_data: dict) -> dict:
+        """创建游记，返回 {"record": 游记记录}"""
+
+    @abstractmethod
+    def get_trip_note(self, note_id: str, field_names: List[str] = None) -> Optional[dict]:
+        """根据 note_id 获取游记记录，不存在返回 None"""
+
+    @abstractmethod
+    def list_trip_notes(
+        self,
+        username: str,
+        limit: int = 20,
+        date_from: Union[str, int] = None,
+        date_to: Union[str, int] = None,
+        sort_by: str = None,
+        descending: bool = True,
+        field_names: List[str] = None
+    ) -> List[dict]:
+        """按用户和旅行日期范围列出游记记录"""
+
+    @abstractmethod
+    def iter_trip_notes(self, username: str, field_names: List[str] = None) -> Iterator[dict]:
+        """流式遍历用户的全部游记记录"""
+
+    @abstractmethod
+    def list_trip_note_versions(self, username: str) -> List[dict]:
+        """列出用户全部游记的 note_id 和 updated_at"""
+
+    @abstractmethod
+    def batch_get_trip_notes(self, record_ids: List[str]) -> List[dict]:
+        """按记录 ID 批量获取游记记录"""
+
+    @abstractmethod
+    def update_trip_note(self, record_id: str, note_data: dict) -> dict:
+        """更新游记，返回 {"record": 更新后的记录}"""
+
+    @abstractmethod
+    def delete_trip_note(self, record_id: str) -> bool:
+        """删除游记，返回是否成功"""
+
+    # ===== 游记批量操作 =====
+
+    @abstractmethod
+    def batch_create_trip_notes(self, notes: List[dict]) -> List[dict]:
+        """批量创建游记，返回与输入顺序一致的 {"success", "record_id", "error"} 列表"""
+
+    @abstractmethod
+    def batch_update_trip_notes(self, updates: List[Tuple[str, dict]]) -> List[dict]:
+        """批量更新游记，返回与输入顺序一致的 {"success", "record_id", "error"} 列表"""
+
+    @abstractmethod
+    def batch_delete_trip_notes(self, record_ids: List[str]) -> List[dict]:
+        """批量删除游记，返回与输入顺序一致的 {"success", "record_id", "error"} 列表"""
+
+    # ===== 字段转换（各后端共用） =====
+
+    def _build_note_fields(self, note_data: dict) -> dict:
+        """
+        将游记数据转换为新建记录的字段
+
+        Args:
+            note_data: 游记数据
+
+        Returns:
+            记录字段
+        """
+        # 注意：travel_date 需要转换为飞书支持的日期格式（整数时间戳毫秒）
+        travel_date = date_to_timestamp(note_data.get("travel_date", "")) or int(time.time() * 1000)
+
+        return self.codec.encode_fields({
+            "note_id": note_data.get("note_id"),
+            "username": note_data.get("username"),
+            "title": note_data.get("title", ""),
+            "location": note_data.get("location", ""),
+            "travel_date": travel_date,
+            "images": note_data.get("images", []),
+            "ocr_results": note_data.get("ocr_results", {}),
+            "user_notes": note_data.get("user_notes", ""),
+            "ai_content": note_data.get("ai_content", ""),
+            # 列表页使用的派生字段，避免列表读取正文和图片列表
+            "summary": note_data.get("summary", ""),
+            "cover_image": note_data.get("cover_image", ""),
+            "image_count": note_data.get("image_count", 0)
+            # 注意：created_at 和 updated_at 是飞书自动管理的字段，不能手动设置
+        })
+
+    def _build_note_update_fields(self, note_data: dict) -> dict:
+        """
+        将游记更新数据转换为记录字段，只包含提供的字段
+
+        Args:
+            note_data: 更新数据
+
+        Returns:
+            记录字段
+        """
+        fields = {"updated_at": int(time.time() * 1000)}
+
+        for key in [
+            "title", "location", "travel_date", "images", "ocr_results", "user_notes", "ai_content",
+            "summary", "cover_image", "image_count"
+        ]:
+            if key in note_data:
+                if key == "travel_date":
+                    fields[key] = date_to_timestamp(note_data[key]) or note_data[key]
+                else:
+                    fields[key] = note_data[key]
+
+        return self.codec.encode_fields(fields)
+
+
+def get_storage() -> StorageBackend:
+    """
+    按配置创建存储后端
+
+    Returns:
+        STORAGE_BACKEND 为 sqlite 时返回 SQLiteStorage，否则返回 FeishuClient
+    """
+    # 两个实现都继承本模块的 StorageBackend，在调用时导入以避免循环导入
+    if get_config().get_storage_backend() == "sqlite":
+        from clients.sqlite_storage import SQLiteStorage
+        return SQLiteStorage()
+
+    from clients.feishu_client import FeishuClient
+    return FeishuClient()
@@ -0,0 +1,148 @@
+# token_cache.py
+# -*- coding: utf-8 -*-
+"""
+访问令牌缓存模块
+在进程内共享飞书 tenant_access_token，并发刷新只请求一次
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+
+class TenantTokenCache:
+    """线程安全的访问令牌缓存"""
+
+    def __init__(
+        self,
+        fetch: Callable[[], Tuple[str, int]],
+        refresh_margin: int = 300,
+        wait_timeout: float = 30
+    ):
+        """
+        初始化令牌缓存
+
+        Args:
+            fetch: 获取新令牌的函数，返回 (令牌, 有效期秒数)
+            refresh_margin: 过期前多少秒开始后台刷新
+            wait_timeout: 等待其他线程刷新的最长时间（秒）
+        """
+        self._fetch = fetch
+        self.refresh_margin = refresh_margin
+        self.wait_timeout = wait_timeout
+
+        self._lock = threading.Lock()
+        self._token: Optional[str] = None
+        self._expire_at = 0.0
+        self._refresh_at = 0.0
+        self._refreshing: Optional[threading.Event] = None
+        self._last_error: Optional[Exception] = None
+
+        self._stats = {
+            "fetches": 0,
+            "cache_hits": 0,
+            "joined_refreshes": 0,
+            "background_refreshes": 0
+        }
+
+    def get(self) -> str:
+        """
+        获取有效令牌
+
+        令牌有效时直接返回；进入刷新窗口后返回旧令牌并在后台刷新；
+        已过期时由一个线程刷新，其余线程等待同一次刷新结果。
+
+        Returns:
+            访问令牌
+        """
+        with self._lock:
+            now = time.time()
+            if self._token and now < self._expire_at:
+                self._stats["cache_hits"] += 1
+                if now >= self._refresh_at and self._refreshing is None:
+                    self._refreshing = threading.Event()
+                    self._stats["background_refreshes"] += 1
+                    threading.Thread(target=self._refresh, daemon=True).start()
+                return self._token
+
+            if self._refreshing is None:
+                self._refreshing = threading.Event()
+                event = self._refreshing
+                owner = True
+            else:
+                event = self._refreshing
+                owner = False
+                self._stats["joined_refreshes"] += 1
+
+        if owner:
+            self._refresh()
+        elif not event.wait(self.wait_timeout):
+            raise Exception("等待访问令牌刷新超时")
+
+        with self._lock:
+            if self._token and time.time() < self._expire_at:
+                return self._token
+            raise Exception(f"获取访问令牌失败: {self._last_error}")
+
+    def _refresh(self) -> None:
+        """请求新令牌并唤醒等待的线程"""
+        try:
+            token, expire = self._fetch()
+            with self._lock:
+                now = time.time()
+                self._token = token
+                self._expire_at = now + expire
+                self._refresh_at = now + max(expire - self.refresh_margin, 0)
+                self._last_error = None
+        except Exception as e:
+            with self._lock:
+                self._last_error = e
+            print(f"[DEBUG] 刷新访问令牌失败: {str(e)}")
+        finally:
+            with self._lock:
+                self._stats["fetches"] += 1
+                event = self._refreshing
+                self._refreshing = None
+            if event:
+                event.set()
+
+    def invalidate(self) -> None:
+        """使当前令牌失效，下次获取时重新请求"""
+        with self._lock:
+            self._token = None
+            self._expire_at = 0.0
+
+    def get_stats(self) -> dict:
+        """
+        获取缓存统计
+
+        Returns:
+            统计信息，fetches_avoided 为无需请求新令牌的获取次数
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats["fetches_avoided"] = stats["cache_hits"] + stats["joined_refreshes"]
+        return stats
+
+
+_caches: Dict[tuple, TenantTokenCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_token_cache(key: tuple, fetch: Callable[[], Tuple[str, int]]) -> TenantTokenCache:
+    """
+    获取进程内共享的令牌缓存
+
+    Args:
+        key: 缓存键，如 (API 根地址, App ID)
+        fetch: 首次创建缓存时使用的令牌获取函数
+
+    Returns:
+        令牌缓存
+    """
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = TenantTokenCache(fetch)
+            _caches[key] = cache
+        return cache
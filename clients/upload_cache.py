@@ -0,0 +1,92 @@
+# upload_cache.py
+# -*- coding: utf-8 -*-
+"""
+已上传图片缓存模块
+记录本进程确认过已存在于 OSS 的内容寻址对象，重复的图片无需再次检查或上传；
+对象可能被其他进程删除，缓存项超过有效期后重新检查
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+class UploadedObjectCache:
+    """进程内共享的 对象键 -> URL 缓存（LRU）"""
+
+    def __init__(self, max_entries: int = 4096, ttl: float = 600):
+        """
+        初始化缓存
+
+        Args:
+            max_entries: 最多缓存的对象数
+            ttl: 缓存有效期（秒），过期后由调用方重新检查对象是否存在
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._urls: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        获取已上传对象的 URL
+
+        Args:
+            key: OSS 对象键
+
+        Returns:
+            URL，未缓存或已过期返回 None
+        """
+        with self._lock:
+            cached = self._urls.get(key)
+            if cached is None:
+                return None
+            url, cached_at = cached
+            if time.monotonic() - cached_at > self.ttl:
+                del self._urls[key]
+                return None
+            self._urls.move_to_end(key)
+            return url
+
+    def put(self, key: str, url: str) -> None:
+        """
+        记录已上传的对象
+
+        Args:
+            key: OSS 对象键
+            url: 公开访问 URL
+        """
+        with self._lock:
+            self._urls[key] = (url, time.monotonic())
+            self._urls.move_to_end(key)
+            while len(self._urls) > self.max_entries:
+                self._urls.popitem(last=False)
+
+    def remove(self, key: str) -> None:
+        """
+        删除记录（对象被删除时调用）
+
+        Args:
+            key: OSS 对象键
+        """
+        with self._lock:
+            self._urls.pop(key, None)
+
+
+_upload_cache: Optional[UploadedObjectCache] = None
+_upload_cache_lock = threading.Lock()
+
+
+def get_upload_cache() -> UploadedObjectCache:
+    """
+    获取进程内共享的已上传图片缓存
+
+    Returns:
+        已上传图片缓存
+    """
+    global _upload_cache
+    with _upload_cache_lock:
+        if _upload_cache is None:
+            _upload_cache = UploadedObjectCache()
+        return _upload_cache
@@ -6,20 +6,227 @@
 """
 
 import uuid
-import json
 from datetime import datetime
-from clients.feishu_client import FeishuClient
+from typing import Optional
+from utils.config import get_config
+from clients.storage import date_to_timestamp, get_storage
+from clients.note_index import NoteIndex
+from clients.note_mirror import NoteMirror
+from clients.user_stats import get_stats_cache
+from clients.note_cache import get_note_cache
+from clients.field_codec import LazyNote, decode_field, decode_json_field
+from clients.write_queue import WriteQueue, get_write_worker
+from utils.image_utils import IMAGE_VARIANTS, image_url
+
+
+def make_summary(ai_content: str, length: int = 150) -> str:
+    """
+    从游记正文生成摘要
+
+    Args:
+        ai_content: AI 生成的 Markdown 正文
+        length: 摘要长度
+
+    Returns:
+        去除 Markdown 标记的摘要
+    """
+    if not ai_content:
+        return ""
+    summary = ai_content[:length].replace("#", "").replace("*", "").strip()
+    if len(ai_content) > length:
+        summary += "..."
+    return summary
 
 
 class UserClient:
     """用户客户端"""
 
-    def __init__(self):
-        """初始化用户客户端"""
-        self.feishu = FeishuClient()
+    def __init__(self, write_behind: bool = None):
+        """
+        初始化用户客户端
+
+        Args:
+            write_behind: 是否通过写入队列保存游记，None 表示按配置
+        """
+        config = get_config()
+        self.storage = get_storage()
+        self.note_index = NoteIndex()
+
+        self.mirror = NoteMirror() if config.get_note_mirror_enabled() else None
+        self.mirror_max_staleness = config.get_note_mirror_max_staleness()
+        self.stats_cache = get_stats_cache()
+        self.note_cache = get_note_cache()
+
+        if write_behind is None:
+            write_behind = config.get_write_behind_enabled()
+        self.write_queue = WriteQueue() if write_behind else None
+        self.write_worker = None
+        if self.write_queue:
+            self.write_worker = get_write_worker(
+                self.write_queue,
+                lambda: UserClient(write_behind=False).apply_pending_write
+            )
+
+    def _use_mirror(self, username: str) -> bool:
+        """
+        确保用户的本地镜像在允许的陈旧时间内
+
+        镜像过期时先增量同步；同步失败则回退到直接读取飞书
+
+        Args:
+            username: 用户名
+
+        Returns:
+            是否可以从镜像读取
+        """
+        if not self.mirror:
+            return False
+        if self.mirror.is_fresh(username, self.mirror_max_staleness):
+            return True
+        try:
+            self.mirror.sync(self.storage, username)
+            return True
+        except Exception as e:
+            print(f"[DEBUG] 镜像同步失败，改为直接读取飞书: {str(e)}")
+            return False
+
+    def _resolve_record_id(self, note_id: str) -> str:
+        """
+        获取游记对应的飞书记录 ID
+
+        优先查本地索引，未命中时查询飞书并回填索引
+
+        Args:
+            note_id: 游记 ID
+
+        Returns:
+            记录 ID，游记不存在返回空字符串
+        """
+        record_id = self.note_index.get(note_id)
+        if record_id:
+            return record_id
+
+        record = self.storage.get_trip_note(note_id, field_names=["note_id"])
+        if not record:
+            return ""
+
+        record_id = record.get("record_id", "")
+        self.note_index.put(note_id, record_id)
+        return record_id
 
     # ===== 游记管理 =====
 
+    # 允许通过 update_note 修改的字段
+    UPDATABLE_FIELDS = ["title", "location", "travel_date", "images", "ocr_results", "user_notes", "ai_content"]
+
+    # 列表页需要的字段（不包含 ai_content、ocr_results 等大字段）
+    LIST_FIELDS = [
+        "note_id", "username", "title", "location", "travel_date", "created_at",
+        "summary", "cover_image", "image_count"
+    ]
+
+    # list_notes 列表项和 list_note_cards 卡片包含的字段
+    LIST_ITEM_KEYS = ["record_id", "note_id", "title", "location", "travel_date", "created_at"]
+    CARD_KEYS = LIST_ITEM_KEYS + ["username", "summary", "cover_image", "image_count"]
+
+    @staticmethod
+    def _add_derived_fields(note_data: dict) -> dict:
+        """
+        根据正文和图片补充列表页使用的摘要、封面和图片数
+
+        Args:
+            note_data: 游记数据或更新数据
+
+        Returns:
+            补充后的数据（原地修改）
+        """
+        if "ai_content" in note_data:
+            note_data["summary"] = make_summary(note_data["ai_content"] or "")
+        if "images" in note_data:
+            images = note_data["images"] or []
+            # 封面使用缩略图
+            note_data["cover_image"] = image_url(images[0] if images else None, IMAGE_VARIANTS["thumb"])
+            note_data["image_count"] = len(images)
+        return note_data
+
+    def _derived_from_fields(self, fields: dict) -> dict:
+        """
+        根据飞书记录的 images、ai_content 计算派生字段
+
+        Args:
+            fields: 飞书记录字段
+
+        Returns:
+            summary、cover_image、image_count
+        """
+        derived = self._add_derived_fields({
+            "images": decode_json_field(fields.get("images"), []),
+            "ai_content": decode_field(fields.get("ai_content")) or ""
+        })
+        del derived["images"], derived["ai_content"]
+        return derived
+
+    def _fill_legacy_records(self, records: list) -> None:
+        """
+        为缺少派生字段的旧记录补读 images、ai_content 计算派生字段，并写回飞书
+
+        只读取派生字段的列表和统计遇到旧记录时调用；写回后下次读取不再补读
+
+        Args:
+            records: 只含 LIST_FIELDS 或 STATS_FIELDS 的飞书记录（原地补充字段）
+        """
+        legacy = [
+            record for record in records
+            if record.get("fields", {}).get("image_count") is None and record.get("record_id")
+        ]
+        if not legacy:
+            return
+
+        try:
+            full = self.storage.batch_get_trip_notes([record["record_id"] for record in legacy])
+        except Exception as e:
+            print(f"[DEBUG] 读取旧游记完整字段失败: {str(e)}")
+            return
+
+        full_fields = {item.get("record_id"): item.get("fields") or {} for item in full}
+        updates = []
+        for record in legacy:
+            fields = full_fields.get(record["record_id"])
+            if fields is None:
+                continue
+            derived = self._derived_from_fields(fields)
+            record.setdefault("fields", {}).update(derived)
+            updates.append((record["record_id"], derived))
+
+        try:
+            results = self.storage.batch_update_trip_notes(updates)
+            print(f"[DEBUG] 为 {sum(1 for r in results if r['success'])} 篇旧游记补写派生字段")
+        except Exception as e:
+            print(f"[DEBUG] 补写旧游记派生字段失败: {str(e)}")
+
+    def _new_note_data(self, username: str, **fields) -> dict:
+        """
+        生成新游记的完整数据（分配 note_id 并补齐默认值）
+
+        Args:
+            username: 用户名
+            **fields: create_note 的其余参数
+
+        Returns:
+            游记数据
+        """
+        return self._add_derived_fields({
+            "note_id": str(uuid.uuid4()),
+            "username": username,
+            "title": fields.get("title") or "",
+            "location": fields.get("location") or "",
+            "travel_date": fields.get("travel_date") or "",
+            "images": fields.get("images") or [],
+            "ocr_results": fields.get("ocr_results") or {},
+            "user_notes": fields.get("user_notes") or "",
+            "ai_content": fields.get("ai_content") or ""
+        })
+
     def create_note(
         self,
         username: str,
@@ -47,26 +254,51 @@ class UserClient:
         Returns:
             (是否成功, 消息, 游记ID)
         """
-        note_id = str(uuid.uuid4())
+        note_data = self._new_note_data(
+            username,
+            title=title,
+            location=location,
+            travel_date=travel_date,
+            images=images,
+            ocr_results=ocr_results,
+            user_notes=user_notes,
+            ai_content=ai_content
+        )
+        note_id = note_data["note_id"]
 
-        note_data = {
-            "note_id": note_id,
-            "username": username,
-            "title": title,
-            "location": location,
-            "travel_date": travel_date,
-            "images": images or [],
-            "ocr_results": ocr_results or {},
-            "user_notes": user_notes,
-            "ai_content": ai_content
-        }
+        if self.write_queue:
+            self._enqueue_write("create", note_id, note_data, username)
+            self.stats_cache.set_note(username, note_id, **self._stats_entry(note_data))
+            self._remember(note_data)
+            return True, "游记已保存，正在同步到飞书", note_id
 
         try:
-            result = self.feishu.create_trip_note(note_data)
+            self._save_new_note(note_data)
+            self._remember(note_data)
             return True, "游记创建成功", note_id
         except Exception as e:
             return False, f"创建游记失败: {str(e)}", None
 
+    def _save_new_note(self, note_data: dict) -> None:
+        """
+        将新游记写入飞书并更新索引、镜像和统计
+
+        Args:
+            note_data: 完整游记数据
+        """
+        note_id = note_data["note_id"]
+        username = note_data["username"]
+
+        result = self.storage.create_trip_note(note_data)
+        record = result.get("record", result)
+        self.note_index.put(note_id, record.get("record_id", ""))
+        if self.mirror:
+            if record.get("fields"):
+                self.mirror.upsert(record)
+            else:
+                self.mirror.invalidate(username)
+        self.stats_cache.set_note(username, note_id, **self._stats_entry(note_data))
+
     def get_note(self, note_id: str) -> dict:
         """
         获取游记详情
@@ -77,37 +309,134 @@ class UserClient:
         Returns:
             游记数据
         """
-        record = self.feishu.get_trip_note(note_id)
+        pending = self.write_queue.pending(note_id) if self.write_queue else []
+        if pending:
+            return self._remember(self._overlay_note(note_id, pending))
+
+        record = None
+        if self.mirror:
+            cached = self.mirror.get(note_id)
+            if cached and self._use_mirror(cached["fields"].get("username", "")):
+                # 同步后重新读取，游记可能已被修改或删除
+                record = self.mirror.get(note_id)
+
+        if record is None:
+            record = self.storage.get_trip_note(note_id)
+            if record and self.mirror:
+                self.mirror.upsert(record)
+
         if record:
-            fields = record.get("fields", {})
-            return {
-                "record_id": record.get("record_id", ""),
-                "note_id": fields.get("note_id", ""),
-                "username": fields.get("username", ""),
-                "title": fields.get("title", ""),
-                "location": fields.get("location", ""),
-                "travel_date": fields.get("travel_date", ""),
-                "images": json.loads(fields.get("images", "[]")),
-                "ocr_results": json.loads(fields.get("ocr_results", "{}")),
-                "user_notes": fields.get("user_notes", ""),
-                "ai_content": fields.get("ai_content", ""),
-                "created_at": fields.get("created_at", None),
-                "updated_at": fields.get("updated_at", None)
-            }
+            self.note_index.put(note_id, record.get("record_id", ""))
+            return self._remember(self._decode_note(record))
         return None
 
-    def list_notes(self, username: str, limit: int = 20) -> list:
+    def _remember(self, note: dict) -> dict:
+        """
+        记录游记可修改字段的快照，供 update_note 比较差异
+
+        Args:
+            note: 游记数据
+
+        Returns:
+            原游记数据
+        """
+        if note:
+            if isinstance(note, LazyNote):
+                snapshot = note.project(self.UPDATABLE_FIELDS)
+            else:
+                snapshot = {key: note.get(key) for key in self.UPDATABLE_FIELDS}
+            self.note_cache.put(note["note_id"], snapshot)
+        return note
+
+    def _decode_note(self, record: dict) -> dict:
+        """
+        将飞书记录解码为游记数据
+
+        images、ocr_results、ai_content、user_notes 在第一次访问时才解码
+
+        Args:
+            record: 飞书记录
+
+        Returns:
+            游记数据
+        """
+        fields = record.get("fields", {})
+        note = LazyNote({
+            "record_id": record.get("record_id", ""),
+            "note_id": fields.get("note_id", ""),
+            "username": fields.get("username", ""),
+            "title": fields.get("title", ""),
+            "location": fields.get("location", ""),
+            "travel_date": fields.get("travel_date", ""),
+            "images": fields.get("images"),
+            "ocr_results": fields.get("ocr_results"),
+            "user_notes": fields.get("user_notes", ""),
+            "ai_content": fields.get("ai_content", ""),
+            "created_at": fields.get("created_at", None),
+            "updated_at": fields.get("updated_at", None)
+        }, {
+            "images": lambda raw: decode_json_field(raw, []),
+            "ocr_results": lambda raw: decode_json_field(raw, {}),
+            "user_notes": lambda raw: decode_field(raw) or "",
+            "ai_content": lambda raw: decode_field(raw) or ""
+        })
+        note["summary"] = fields.get("summary") or make_summary(note["ai_content"])
+        note["cover_image"] = fields.get("cover_image") or image_url(
+            note["images"][0] if note["images"] else None, IMAGE_VARIANTS["thumb"]
+        )
+        image_count = fields.get("image_count")
+        note["image_count"] = int(image_count) if image_count is not None else len(note["images"])
+        return note
+
+    def _decode_note_card(self, record: dict) -> dict:
+        """
+        将列表字段（LIST_FIELDS）解码为游记卡片数据
+
+        旧记录没有 summary/cover_image/image_count 时，
+        若记录中带有完整字段（如来自本地镜像）则现场计算，
+        否则由 _fill_legacy_records 事先补充
+
+        Args:
+            record: 飞书记录
+
+        Returns:
+            游记卡片数据
+        """
+        fields = record.get("fields", {})
+        cover_image = fields.get("cover_image")
+        image_count = fields.get("image_count")
+        images = [] if cover_image and image_count is not None else decode_json_field(fields.get("images"), [])
+        return {
+            "record_id": record.get("record_id", ""),
+            "note_id": fields.get("note_id", ""),
+            "username": fields.get("username", ""),
+            "title": fields.get("title", ""),
+            "location": fields.get("location", ""),
+            "travel_date": fields.get("travel_date", ""),
+            "created_at": fields.get("created_at", None),
+            "summary": fields.get("summary") or make_summary(decode_field(fields.get("ai_content")) or ""),
+            "cover_image": cover_image or image_url(images[0] if images else None, IMAGE_VARIANTS["thumb"]),
+            "image_count": int(image_count) if image_count is not None else len(images)
+        }
+
+    def list_notes(self, username: str, limit: int = 20, field_names: list = None) -> list:
         """
         获取用户的游记列表
 
         Args:
             username: 用户名
             limit: 数量限制
+            field_names: 需要读取的字段，默认为 LIST_FIELDS
 
         Returns:
             游记列表
         """
-        records = self.feishu.list_trip_notes(username, limit)
+        if self._use_mirror(username):
+            records = self.mirror.list_by_user(username, limit)
+        else:
+            records = self.storage.list_trip_notes(
+                username, limit, field_names=field_names or self.LIST_FIELDS
+            )
 
         notes = []
         for record in records:
@@ -121,7 +450,32 @@ class UserClient:
                 "created_at": fields.get("created_at", None)
             })
 
-        return notes
+        return self._overlay_list(username, notes, limit, self.LIST_ITEM_KEYS)
+
+    def list_note_cards(self, username: str, limit: int = 20) -> list:
+        """
+        获取用户的游记列表（一次请求返回卡片所需数据，供列表页直接渲染）
+
+        只读取 LIST_FIELDS，不下载正文和 OCR 结果；
+        没有派生字段的旧记录补读一次完整字段并写回派生字段
+
+        Args:
+            username: 用户名
+            limit: 数量限制
+
+        Returns:
+            游记卡片列表，包含 summary、cover_image、image_count
+        """
+        if self._use_mirror(username):
+            records = self.mirror.list_by_user(username, limit)
+        else:
+            records = self.storage.list_trip_notes(username, limit, field_names=self.LIST_FIELDS)
+            self._fill_legacy_records(records)
+
+        notes = [self._decode_note_card(record) for record in records]
+        self.note_index.put_many((note["note_id"], note["record_id"]) for note in notes)
+
+        return self._overlay_list(username, notes, limit, self.CARD_KEYS)
 
     def update_note(
         self,
@@ -132,7 +486,8 @@ class UserClient:
         images: list = None,
         ocr_results: dict = None,
         user_notes: str = None,
-        ai_content: str = None
+        ai_content: str = None,
+        username: str = None
     ) -> tuple[bool, str]:
         """
         更新游记
@@ -146,17 +501,11 @@ class UserClient:
             ocr_results: OCR 识别结果
             user_notes: 用户感想
             ai_content: AI 生成内容
+            username: 游记所属用户，写入队列据此向用户显示同步失败的写入
 
         Returns:
             (是否成功, 消息)
         """
-        # 获取记录 ID
-        record = self.feishu.get_trip_note(note_id)
-        if not record:
-            return False, "游记不存在"
-
-        record_id = record.get("record_id", "")
-
         # 构建更新数据
         update_data = {}
         if title is not None:
@@ -174,56 +523,532 @@ class UserClient:
         if ai_content is not None:
             update_data["ai_content"] = ai_content
 
+        # 只提交与已知内容不同的字段
+        update_data = self._changed_fields(note_id, update_data)
+        if not update_data:
+            return True, "没有需要保存的修改"
+        self._add_derived_fields(update_data)
+
+        if self.write_queue:
+            owner = self._queued_note_owner(note_id)
+            if owner is None:
+                return False, "游记不存在"
+            self._enqueue_write("update", note_id, update_data, username or owner)
+            self._update_stats(note_id, update_data)
+            self.note_cache.merge(note_id, update_data)
+            return True, "已保存，正在同步到飞书"
+
+        # 获取记录 ID
+        record_id = self._resolve_record_id(note_id)
+        if not record_id:
+            return False, "游记不存在"
+
         try:
-            self.feishu.update_trip_note(record_id, update_data)
+            self._save_note_update(note_id, record_id, update_data)
+            self.note_cache.merge(note_id, update_data)
             return True, "更新成功"
         except Exception as e:
+            # 索引和快照可能已过期，下次更新时重新查询
+            self.note_index.delete(note_id)
+            self.note_cache.remove(note_id)
             return False, f"更新失败: {str(e)}"
 
-    def delete_note(self, note_id: str) -> tuple[bool, str]:
+    def _changed_fields(self, note_id: str, update_data: dict) -> dict:
+        """
+        与游记快照比较，去掉未变化的字段
+
+        没有快照时（如其他进程修改过或缓存已过期）原样返回全部字段
+
+        Args:
+            note_id: 游记 ID
+            update_data: 更新字段
+
+        Returns:
+            有变化的字段
+        """
+        known = self.note_cache.get(note_id)
+        if known is None:
+            return update_data
+
+        changed = {}
+        for key, value in update_data.items():
+            old = known.get(key)
+            if key == "travel_date":
+                same = (date_to_timestamp(value) or value) == (date_to_timestamp(old) or old)
+            else:
+                same = value == old
+            if not same:
+                changed[key] = value
+        return changed
+
+    def _save_note_update(self, note_id: str, record_id: str, update_data: dict) -> None:
+        """
+        将游记更新写入飞书并更新镜像和统计
+
+        Args:
+            note_id: 游记 ID
+            record_id: 飞书记录 ID
+            update_data: 更新字段
+        """
+        result = self.storage.update_trip_note(record_id, update_data)
+        if self.mirror:
+            fields = (result.get("record") or {}).get("fields")
+            if not fields or not self.mirror.merge_fields(note_id, fields):
+                # 无法就地更新镜像时标记需要重新同步
+                self.mirror.invalidate_note(note_id)
+        self._update_stats(note_id, update_data)
+
+    def delete_note(self, note_id: str, username: str = None) -> tuple[bool, str]:
         """
         删除游记
 
         Args:
             note_id: 游记 ID
+            username: 游记所属用户，写入队列据此向用户显示同步失败的写入
 
         Returns:
             (是否成功, 消息)
         """
+        if self.write_queue and self.write_queue.pending(note_id):
+            # 游记还有未同步的写入，删除也排入队列以保持顺序
+            owner = self._queued_note_owner(note_id)
+            if owner is None:
+                return False, "游记不存在"
+            self._enqueue_write("delete", note_id, {}, username or owner)
+            self.stats_cache.remove_note(note_id)
+            self.note_cache.remove(note_id)
+            return True, "删除成功"
+
         try:
-            record = self.feishu.get_trip_note(note_id)
-            if not record:
+            record_id = self._resolve_record_id(note_id)
+            if not record_id:
                 return False, "游记不存在"
 
-            record_id = record.get("record_id", "")
-            self.feishu.delete_trip_note(record_id)
+            if not self.storage.delete_trip_note(record_id):
+                return False, "删除失败: 飞书记录删除失败"
+
+            self.note_index.delete(note_id)
+            self.note_cache.remove(note_id)
+            if self.mirror:
+                self.mirror.delete(note_id)
+            self.stats_cache.remove_note(note_id)
             return True, "删除成功"
         except Exception as e:
             return False, f"删除失败: {str(e)}"
 
+    # ===== 写入队列 =====
+
+    def _enqueue_write(self, op: str, note_id: str, payload: dict, username: str = None) -> None:
+        """
+        将写入追加到写入队列并唤醒后台线程
+
+        Args:
+            op: 操作类型 (create/update/delete)
+            note_id: 游记 ID
+            payload: 写入内容
+            username: 用户名
+        """
+        self.write_queue.enqueue(op, note_id, payload, username)
+        if self.write_worker:
+            self.write_worker.wake()
+
+    def _queued_note_owner(self, note_id: str) -> Optional[str]:
+        """
+        排入写入前确认游记存在，并尽量得到游记所属用户
+
+        依次查未同步的写入、本地镜像和索引，都未命中时才查询飞书
+
+        Args:
+            note_id: 游记 ID
+
+        Returns:
+            用户名（未知时为空字符串），游记不存在返回 None
+        """
+        pending = self.write_queue.pending(note_id)
+        if pending:
+            if pending[-1]["op"] == "delete":
+                return None
+            return next((entry["username"] for entry in pending if entry["username"]), "")
+
+        record = self.mirror.get(note_id) if self.mirror else None
+        if record:
+            return record.get("fields", {}).get("username", "")
+        if self.note_index.get(note_id):
+            return ""
+
+        record = self.storage.get_trip_note(note_id, field_names=["note_id", "username"])
+        if not record:
+            return None
+        self.note_index.put(note_id, record.get("record_id", ""))
+        return record.get("fields", {}).get("username", "")
+
+    def get_failed_writes(self, username: str) -> list:
+        """
+        列出用户超过重试次数、未能同步到飞书的写入
+
+        Args:
+            username: 用户名
+
+        Returns:
+            写入记录列表（含 id、op、note_id、payload、last_error）
+        """
+        if not self.write_queue:
+            return []
+        return self.write_queue.failed(username)
+
+    def retry_failed_write(self, entry_id: int) -> None:
+        """
+        重新同步失败的写入
+
+        Args:
+            entry_id: 写入记录 ID
+        """
+        if not self.write_queue:
+            return
+        self.write_queue.retry(entry_id)
+        if self.write_worker:
+            self.write_worker.wake()
+
+    def discard_failed_write(self, entry_id: int) -> bool:
+        """
+        放弃失败的写入，游记恢复为飞书中的内容
+
+        Args:
+            entry_id: 写入记录 ID
+
+        Returns:
+            是否放弃成功
+        """
+        if not self.write_queue:
+            return False
+        entry = self.write_queue.discard(entry_id)
+        if entry is None:
+            return False
+        # 缓存中保存过这条写入的乐观结果，重新从飞书读取
+        self.note_cache.remove(entry["note_id"])
+        if entry["username"]:
+            self.stats_cache.invalidate(entry["username"])
+        else:
+            self.stats_cache.remove_note(entry["note_id"])
+        return True
+
+    def apply_pending_write(self, entry: dict) -> None:
+        """
+        将写入队列中的一条写入同步到飞书，失败时抛出异常
+
+        Args:
+            entry: 写入记录
+        """
+        note_id = entry["note_id"]
+        if entry["op"] == "create":
+            if not self.note_index.get(note_id):
+                self._save_new_note(entry["payload"])
+            return
+
+        record_id = self._resolve_record_id(note_id)
+        if entry["op"] == "delete":
+            if record_id and not self.storage.delete_trip_note(record_id):
+                raise Exception("飞书记录删除失败")
+            self.note_index.delete(note_id)
+            if self.mirror:
+                self.mirror.delete(note_id)
+            return
+
+        if not record_id:
+            raise Exception("游记不存在")
+        try:
+            self._save_note_update(note_id, record_id, entry["payload"])
+        except Exception:
+            self.note_index.delete(note_id)
+            raise
+
+    @staticmethod
+    def _pending_fields(payload: dict) -> dict:
+        """将排队中的写入内容转换为与飞书读取结果一致的表示（日期为毫秒时间戳）"""
+        fields = dict(payload)
+        if fields.get("travel_date"):
+            fields["travel_date"] = date_to_timestamp(fields["travel_date"]) or fields["travel_date"]
+        return fields
+
+    def _overlay_note(self, note_id: str, pending: list) -> dict:
+        """
+        在游记上叠加尚未同步的写入，使页面能读到自己刚保存的内容
+
+        Args:
+            note_id: 游记 ID
+            pending: 该游记的未同步写入
+
+        Returns:
+            游记数据，已被删除返回 None
+        """
+        if pending[-1]["op"] == "delete":
+            return None
+
+        if pending[0]["op"] == "create":
+            note = self._pending_fields(pending[0]["payload"])
+            note.update(record_id="", created_at=None, updated_at=None)
+            updates = pending[1:]
+        else:
+            record = self.storage.get_trip_note(note_id)
+            if not record:
+                return None
+            note = self._decode_note(record)
+            updates = pending
+
+        for entry in updates:
+            note.update(self._pending_fields(entry["payload"]))
+        return note
+
+    def _overlay_list(self, username: str, notes: list, limit: int, keys: list) -> list:
+        """
+        在游记列表上叠加尚未同步的写入：新建的排在最前，更新就地合并，删除的移除
+
+        Args:
+            username: 用户名
+            notes: 游记列表（列表项或卡片）
+            limit: 数量限制
+            keys: 列表项包含的字段
+
+        Returns:
+            叠加后的游记列表
+        """
+        if not self.write_queue:
+            return notes
+        pending = self.write_queue.pending()
+        if not pending:
+            return notes
+
+        by_id = {note["note_id"]: note for note in notes}
+        created = []
+        deleted = set()
+        for entry in pending:
+            note_id = entry["note_id"]
+            fields = self._pending_fields(entry["payload"])
+            if entry["op"] == "create" and entry["username"] == username:
+                note = {key: fields.get(key) for key in keys}
+                note.update(record_id="", note_id=note_id, created_at=None)
+                by_id[note_id] = note
+                created.append(note)
+            elif entry["op"] == "update" and note_id in by_id:
+                by_id[note_id].update({k: v for k, v in fields.items() if k in keys})
+            elif entry["op"] == "delete":
+                deleted.add(note_id)
+            if entry["status"] == "failed" and note_id in by_id:
+                by_id[note_id]["sync_failed"] = True
+
+        merged = list(reversed(created)) + notes
+        return [note for note in merged if note["note_id"] not in deleted][:limit]
+
+    # ===== 批量操作 =====
+
+    def create_notes(self, username: str, notes: list) -> list:
+        """
+        批量创建游记
+
+        Args:
+            username: 用户名
+            notes: 游记列表，每项为 create_note 参数组成的字典
+
+        Returns:
+            与输入顺序一致的 (是否成功, 消息, 游记ID) 列表
+        """
+        note_data_list = [self._new_note_data(username, **note) for note in notes]
+        results = self.storage.batch_create_trip_notes(note_data_list)
+
+        self.note_index.put_many(
+            (note_data["note_id"], result["record_id"])
+            for note_data, result in zip(note_data_list, results) if result["success"]
+        )
+        outcomes = []
+        for note_data, result in zip(note_data_list, results):
+            if result["success"]:
+                self.stats_cache.set_note(username, note_data["note_id"], **self._stats_entry(note_data))
+                outcomes.append((True, "游记创建成功", note_data["note_id"]))
+            else:
+                outcomes.append((False, f"创建游记失败: {result['error']}", None))
+
+        if self.mirror:
+            self.mirror.invalidate(username)
+
+        return outcomes
+
+    def update_notes(self, updates: dict) -> dict:
+        """
+        批量更新游记
+
+        Args:
+            updates: {游记 ID: 更新字段字典}，字段同 update_note 参数
+
+        Returns:
+            {游记 ID: (是否成功, 消息)}
+        """
+        outcomes = {}
+        pending = []
+
+        for note_id, fields in updates.items():
+            record_id = self._resolve_record_id(note_id)
+            if not record_id:
+                outcomes[note_id] = (False, "游记不存在")
+                continue
+            update_data = self._add_derived_fields({
+                key: value for key, value in fields.items()
+                if key in self.UPDATABLE_FIELDS and value is not None
+            })
+            pending.append((note_id, record_id, update_data))
+
+        results = self.storage.batch_update_trip_notes(
+            [(record_id, update_data) for _, record_id, update_data in pending]
+        )
+        for (note_id, _, update_data), result in zip(pending, results):
+            if self.mirror:
+                self.mirror.invalidate_note(note_id)
+            if result["success"]:
+                self._update_stats(note_id, update_data)
+                self.note_cache.merge(note_id, update_data)
+                outcomes[note_id] = (True, "更新成功")
+            else:
+                self.note_index.delete(note_id)
+                self.note_cache.remove(note_id)
+                outcomes[note_id] = (False, f"更新失败: {result['error']}")
+
+        return outcomes
+
+    def delete_notes(self, note_ids: list) -> dict:
+        """
+        批量删除游记
+
+        Args:
+            note_ids: 游记 ID 列表
+
+        Returns:
+            {游记 ID: (是否成功, 消息)}
+        """
+        outcomes = {}
+        pending = []
+
+        for note_id in note_ids:
+            record_id = self._resolve_record_id(note_id)
+            if record_id:
+                pending.append((note_id, record_id))
+            else:
+                outcomes[note_id] = (False, "游记不存在")
+
+        results = self.storage.batch_delete_trip_notes([record_id for _, record_id in pending])
+        for (note_id, _), result in zip(pending, results):
+            if result["success"]:
+                self.note_index.delete(note_id)
+                self.note_cache.remove(note_id)
+                if self.mirror:
+                    self.mirror.delete(note_id)
+                self.stats_cache.remove_note(note_id)
+                outcomes[note_id] = (True, "删除成功")
+            else:
+                outcomes[note_id] = (False, f"删除失败: {result['error']}")
+
+        return outcomes
+
+    def backfill_derived_fields(self, username: str) -> int:
+        """
+        为旧游记补写 summary、cover_image、image_count 字段
+
+        Args:
+            username: 用户名
+
+        Returns:
+            补写的游记数量
+        """
+        updates = []
+        records = self.storage.iter_trip_notes(
+            username,
+            field_names=["note_id", "images", "ai_content", "summary", "image_count"]
+        )
+        for record in records:
+            fields = record.get("fields", {})
+            if fields.get("image_count") is not None and (fields.get("summary") or not fields.get("ai_content")):
+                continue
+            updates.append((record.get("record_id", ""), self._derived_from_fields(fields)))
+
+        results = self.storage.batch_update_trip_notes(updates) if updates else []
+        if self.mirror:
+            self.mirror.invalidate(username)
+        return sum(1 for result in results if result["success"])
+
     # ===== 用户统计 =====
 
+    # 统计所需的字段
+    STATS_FIELDS = ["note_id", "image_count", "location", "travel_date"]
+
     def get_user_stats(self, username: str) -> dict:
         """
         获取用户统计信息
 
+        首次调用时流式遍历一次用户的游记，之后使用缓存并随增删改增量更新
+
         Args:
             username: 用户名
 
         Returns:
-            统计信息
+            统计信息（total_notes、total_images、notes_by_location、
+            first_travel_date、last_travel_date）
+        """
+        if not self.stats_cache.is_loaded(username):
+            from_mirror = self._use_mirror(username)
+            if from_mirror:
+                records = self.mirror.list_by_user(username, limit=-1)
+            else:
+                records = self.storage.iter_trip_notes(username, field_names=self.STATS_FIELDS)
+
+            entries = {}
+            legacy = []
+            for record in records:
+                fields = record.get("fields", {})
+                if not from_mirror and fields.get("image_count") is None:
+                    legacy.append(record)
+                entries[fields.get("note_id", "")] = self._stats_entry(fields)
+
+            # 旧记录没有 image_count，补读图片列表后重新计算
+            self._fill_legacy_records(legacy)
+            for record in legacy:
+                fields = record.get("fields", {})
+                entries[fields.get("note_id", "")] = self._stats_entry(fields)
+            self.stats_cache.load(username, entries)
+
+        return self.stats_cache.summarize(username)
+
+    def _update_stats(self, note_id: str, update_data: dict) -> None:
         """
-        notes = self.list_notes(username, limit=1000)
+        根据更新内容调整缓存的统计字段
 
-        total_notes = len(notes)
-        total_images = 0
+        Args:
+            note_id: 游记 ID
+            update_data: 更新的字段
+        """
+        changes = {}
+        if "images" in update_data:
+            changes["image_count"] = len(update_data["images"])
+        if "location" in update_data:
+            changes["location"] = update_data["location"]
+        if "travel_date" in update_data:
+            changes["travel_date"] = date_to_timestamp(update_data["travel_date"])
+        if changes:
+            self.stats_cache.update_note(note_id, **changes)
 
-        for note in notes:
-            note_data = self.get_note(note["note_id"])
-            if note_data:
-                total_images += len(note_data.get("images", []))
+    @staticmethod
+    def _stats_entry(fields: dict) -> dict:
+        """
+        从游记字段提取统计所需的值
 
+        Args:
+            fields: 飞书记录字段或游记数据
+
+        Returns:
+            统计字段
+        """
+        image_count = fields.get("image_count")
+        if image_count is None:
+            image_count = len(decode_json_field(fields.get("images"), []))
         return {
-            "total_notes": total_notes,
-            "total_images": total_images
+            "image_count": int(image_count),
+            "location": fields.get("location", ""),
+            "travel_date": date_to_timestamp(fields.get("travel_date"))
         }
@@ -0,0 +1,160 @@
+# user_stats.py
+# -*- coding: utf-8 -*-
+"""
+用户统计缓存模块
+按游记保存统计所需的字段，汇总结果随游记增删改增量维护
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+
+
+class UserStatsCache:
+    """进程内共享的用户统计缓存"""
+
+    def __init__(self, ttl: float = 300):
+        """
+        初始化缓存
+
+        Args:
+            ttl: 缓存有效期（秒），过期后重新统计以纳入其他进程的修改
+        """
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # username -> {note_id: {"image_count", "location", "travel_date"}}
+        self._notes: Dict[str, Dict[str, dict]] = {}
+        self._loaded_at: Dict[str, float] = {}
+        self._owners: Dict[str, str] = {}
+
+    def is_loaded(self, username: str) -> bool:
+        """
+        检查用户统计是否已缓存且未过期
+
+        Args:
+            username: 用户名
+
+        Returns:
+            是否可用
+        """
+        with self._lock:
+            loaded_at = self._loaded_at.get(username)
+            return loaded_at is not None and time.time() - loaded_at <= self.ttl
+
+    def load(self, username: str, notes: Dict[str, dict]) -> None:
+        """
+        写入一次完整统计的结果
+
+        Args:
+            username: 用户名
+            notes: {游记 ID: 统计字段}
+        """
+        with self._lock:
+            for note_id in self._notes.get(username, {}):
+                self._owners.pop(note_id, None)
+            self._notes[username] = dict(notes)
+            self._loaded_at[username] = time.time()
+            for note_id in notes:
+                self._owners[note_id] = username
+
+    def set_note(self, username: str, note_id: str, **fields) -> None:
+        """
+        新增或更新一篇游记的统计字段（用户统计未缓存时忽略）
+
+        Args:
+            username: 用户名
+            note_id: 游记 ID
+            **fields: image_count、location、travel_date 中需要更新的字段
+        """
+        with self._lock:
+            notes = self._notes.get(username)
+            if notes is None:
+                return
+            entry = notes.setdefault(note_id, {"image_count": 0, "location": "", "travel_date": None})
+            entry.update(fields)
+            self._owners[note_id] = username
+
+    def update_note(self, note_id: str, **fields) -> None:
+        """
+        更新已缓存游记的统计字段
+
+        Args:
+            note_id: 游记 ID
+            **fields: 需要更新的字段
+        """
+        with self._lock:
+            username = self._owners.get(note_id)
+        if username:
+            self.set_note(username, note_id, **fields)
+
+    def remove_note(self, note_id: str) -> None:
+        """
+        移除游记的统计字段
+
+        Args:
+            note_id: 游记 ID
+        """
+        with self._lock:
+            username = self._owners.pop(note_id, None)
+            if username:
+                self._notes.get(username, {}).pop(note_id, None)
+
+    def invalidate(self, username: str) -> None:
+        """
+        丢弃用户的缓存统计
+
+        Args:
+            username: 用户名
+        """
+        with self._lock:
+            self._loaded_at.pop(username, None)
+
+    def summarize(self, username: str) -> Optional[dict]:
+        """
+        汇总用户统计
+
+        Args:
+            username: 用户名
+
+        Returns:
+            统计信息，未缓存返回 None
+        """
+        with self._lock:
+            notes = self._notes.get(username)
+            if notes is None:
+                return None
+            entries = list(notes.values())
+
+        locations = {}
+        dates = []
+        for entry in entries:
+            location = entry.get("location") or "未知地点"
+            locations[location] = locations.get(location, 0) + 1
+            if entry.get("travel_date"):
+                dates.append(entry["travel_date"])
+
+        return {
+            "total_notes": len(entries),
+            "total_images": sum(entry.get("image_count", 0) for entry in entries),
+            "notes_by_location": locations,
+            "first_travel_date": min(dates) if dates else None,
+            "last_travel_date": max(dates) if dates else None
+        }
+
+
+_stats_cache: Optional[UserStatsCache] = None
+_stats_cache_lock = threading.Lock()
+
+
+def get_stats_cache() -> UserStatsCache:
+    """
+    获取进程内共享的统计缓存
+
+    Returns:
+        统计缓存
+    """
+    global _stats_cache
+    with _stats_cache_lock:
+        if _stats_cache is None:
+            _stats_cache = UserStatsCache()
+        return _stats_cache
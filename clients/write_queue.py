@@ -0,0 +1,403 @@
+# write_queue.py
+# -*- coding: utf-8 -*-
+"""
+游记写入队列模块
+保存游记时先把写入追加到本地 SQLite 日志并立即返回，
+由后台线程按顺序同步到飞书，失败时退避重试；飞书不可用期间写入不会丢失
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from utils.config import get_config
+
+
+class WriteQueue:
+    """持久化的游记写入日志"""
+
+    _init_lock = threading.Lock()
+    _initialized_paths = set()
+
+    def __init__(self, db_path: str = None, max_attempts: int = None):
+        """
+        初始化写入队列
+
+        Args:
+            db_path: 数据库文件路径，默认位于本地数据目录
+            max_attempts: 单条写入的最大尝试次数，超过后标记为失败
+        """
+        config = get_config()
+        if db_path is None:
+            db_path = os.path.join(config.get_local_data_dir(), "write_queue.db")
+        self.db_path = db_path
+        self.max_attempts = max_attempts or config.get_write_behind_max_attempts()
+        self._ensure_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        """创建数据库连接"""
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _ensure_schema(self) -> None:
+        """创建日志表（每个进程每个文件只执行一次）"""
+        with WriteQueue._init_lock:
+            if self.db_path in WriteQueue._initialized_paths:
+                return
+
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS pending_writes ("
+                        "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                        "op TEXT NOT NULL, "
+                        "note_id TEXT NOT NULL, "
+                        "username TEXT, "
+                        "payload TEXT NOT NULL, "
+                        "status TEXT NOT NULL DEFAULT 'pending', "
+                        "attempts INTEGER NOT NULL DEFAULT 0, "
+                        "next_attempt_at REAL NOT NULL DEFAULT 0, "
+                        "last_error TEXT, "
+                        "created_at REAL NOT NULL)"
+                    )
+                    conn.execute(
+                        "CREATE INDEX IF NOT EXISTS idx_pending_writes_note "
+                        "ON pending_writes (note_id, id)"
+                    )
+            finally:
+                conn.close()
+            WriteQueue._initialized_paths.add(self.db_path)
+
+    @staticmethod
+    def _row_to_entry(row: sqlite3.Row) -> dict:
+        """将数据库行转换为写入记录"""
+        entry = dict(row)
+        entry["payload"] = json.loads(entry["payload"])
+        return entry
+
+    def enqueue(self, op: str, note_id: str, payload: dict, username: str = None) -> int:
+        """
+        追加一条写入
+
+        Args:
+            op: 操作类型 (create/update/delete)
+            note_id: 游记 ID
+            payload: 写入内容（create 为完整游记数据，update 为更新字段）
+            username: 用户名
+
+        Returns:
+            写入记录 ID
+        """
+        if op not in ("create", "update", "delete"):
+            raise ValueError(f"不支持的写入操作: {op}")
+
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.execute(
+                    "INSERT INTO pending_writes (op, note_id, username, payload, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (op, note_id, username, json.dumps(payload, ensure_ascii=False), time.time())
+                )
+                return cursor.lastrowid
+        finally:
+            conn.close()
+
+    def pending(self, note_id: str = None) -> List[dict]:
+        """
+        列出尚未同步的写入（包括超过重试次数、等待用户处理的），按写入顺序排列
+
+        Args:
+            note_id: 只列出该游记的写入，None 表示全部
+
+        Returns:
+            写入记录列表
+        """
+        sql = "SELECT * FROM pending_writes WHERE status IN ('pending', 'failed')"
+        params = ()
+        if note_id is not None:
+            sql += " AND note_id = ?"
+            params = (note_id,)
+
+        conn = self._connect()
+        try:
+            rows = conn.execute(sql + " ORDER BY id", params).fetchall()
+        finally:
+            conn.close()
+        return [self._row_to_entry(row) for row in rows]
+
+    def due(self, limit: int = 50) -> List[dict]:
+        """
+        取出可以执行的写入
+
+        每个游记只返回最早的一条，保证同一游记的写入按顺序执行；
+        处于退避等待中的游记暂不返回，也不会阻塞其他游记；
+        最早的一条已失败的游记在用户重试或放弃之前不再同步
+
+        Args:
+            limit: 最大条数
+
+        Returns:
+            写入记录列表
+        """
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT * FROM pending_writes AS w "
+                "WHERE status = 'pending' AND next_attempt_at <= ? "
+                "AND id = (SELECT MIN(id) FROM pending_writes "
+                "WHERE note_id = w.note_id AND status IN ('pending', 'failed')) "
+                "ORDER BY id LIMIT ?",
+                (time.time(), limit)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [self._row_to_entry(row) for row in rows]
+
+    def complete(self, entry_id: int) -> None:
+        """
+        删除已同步的写入
+
+        Args:
+            entry_id: 写入记录 ID
+        """
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM pending_writes WHERE id = ?", (entry_id,))
+        finally:
+            conn.close()
+
+    def fail(self, entry: dict, error: str, retry_delay: float) -> None:
+        """
+        记录一次失败，安排重试；超过最大尝试次数时标记为失败
+
+        Args:
+            entry: 写入记录
+            error: 错误信息
+            retry_delay: 距下次重试的时间（秒）
+        """
+        attempts = entry["attempts"] + 1
+        status = "failed" if attempts >= self.max_attempts else "pending"
+
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "UPDATE pending_writes SET attempts = ?, status = ?, "
+                    "next_attempt_at = ?, last_error = ? WHERE id = ?",
+                    (attempts, status, time.time() + retry_delay, error, entry["id"])
+                )
+        finally:
+            conn.close()
+
+    def failed(self, username: str = None) -> List[dict]:
+        """
+        列出超过最大尝试次数、不再自动重试的写入
+
+        Args:
+            username: 只列出该用户的写入，None 表示全部
+
+        Returns:
+            写入记录列表
+        """
+        sql = "SELECT * FROM pending_writes WHERE status = 'failed'"
+        params = ()
+        if username is not None:
+            sql += " AND username = ?"
+            params = (username,)
+
+        conn = self._connect()
+        try:
+            rows = conn.execute(sql + " ORDER BY id", params).fetchall()
+        finally:
+            conn.close()
+        return [self._row_to_entry(row) for row in rows]
+
+    def retry(self, entry_id: int) -> None:
+        """
+        重新排入失败的写入，尝试次数清零
+
+        Args:
+            entry_id: 写入记录 ID
+        """
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "UPDATE pending_writes SET status = 'pending', attempts = 0, "
+                    "next_attempt_at = 0 WHERE id = ? AND status = 'failed'",
+                    (entry_id,)
+                )
+        finally:
+            conn.close()
+
+    def discard(self, entry_id: int) -> Optional[dict]:
+        """
+        放弃失败的写入；放弃新建时同时放弃该游记之后的写入
+
+        Args:
+            entry_id: 写入记录 ID
+
+        Returns:
+            被放弃的写入记录，不存在或不是失败状态返回 None
+        """
+        conn = self._connect()
+        try:
+            with conn:
+                row = conn.execute(
+                    "SELECT * FROM pending_writes WHERE id = ? AND status = 'failed'",
+                    (entry_id,)
+                ).fetchone()
+                if row is None:
+                    return None
+                if row["op"] == "create":
+                    conn.execute("DELETE FROM pending_writes WHERE note_id = ?", (row["note_id"],))
+                else:
+                    conn.execute("DELETE FROM pending_writes WHERE id = ?", (entry_id,))
+        finally:
+            conn.close()
+        return self._row_to_entry(row)
+
+    def count(self) -> int:
+        """
+        获取未同步的写入数
+
+        Returns:
+            写入数
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT COUNT(*) FROM pending_writes WHERE status = 'pending'"
+            ).fetchone()
+        finally:
+            conn.close()
+        return row[0]
+
+
+class WriteBehindWorker:
+    """后台同步写入队列的工作线程"""
+
+    def __init__(
+        self,
+        queue: WriteQueue,
+        apply_factory: Callable[[], Callable[[dict], None]],
+        interval: float = 2.0,
+        base_delay: float = 2.0,
+        max_delay: float = 300.0
+    ):
+        """
+        初始化工作线程
+
+        Args:
+            queue: 写入队列
+            apply_factory: 在工作线程中创建写入函数的工厂；
+                写入函数执行一条写入，失败时抛出异常
+            interval: 空闲时检查队列的间隔（秒）
+            base_delay: 失败重试的基础等待时间（秒）
+            max_delay: 失败重试的最长等待时间（秒）
+        """
+        self.queue = queue
+        self.apply_factory = apply_factory
+        self.interval = interval
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def flush(self, apply: Callable[[dict], None]) -> int:
+        """
+        执行当前所有到期的写入
+
+        Args:
+            apply: 写入函数
+
+        Returns:
+            成功同步的写入数
+        """
+        synced = 0
+        while True:
+            entries = self.queue.due()
+            if not entries:
+                return synced
+
+            progressed = False
+            for entry in entries:
+                try:
+                    apply(entry)
+                    self.queue.complete(entry["id"])
+                    synced += 1
+                    progressed = True
+                except Exception as e:
+                    delay = min(self.max_delay, self.base_delay * (2 ** entry["attempts"]))
+                    print(f"[DEBUG] 写入 {entry['op']} {entry['note_id']} 同步失败，{delay:.0f} 秒后重试: {str(e)}")
+                    self.queue.fail(entry, str(e), delay)
+
+            if not progressed:
+                return synced
+
+    def _run(self) -> None:
+        """工作线程主循环"""
+        apply = self.apply_factory()
+        while not self._stopped.is_set():
+            try:
+                self.flush(apply)
+            except Exception as e:
+                print(f"[DEBUG] 写入队列同步异常: {str(e)}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def start(self) -> None:
+        """启动工作线程"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def wake(self) -> None:
+        """有新写入时唤醒工作线程"""
+        self._wake.set()
+
+    def stop(self) -> None:
+        """停止工作线程"""
+        self._stopped.set()
+        self._wake.set()
+
+
+_workers: Dict[str, WriteBehindWorker] = {}
+_workers_lock = threading.Lock()
+
+
+def get_write_worker(
+    queue: WriteQueue,
+    apply_factory: Callable[[], Callable[[dict], None]]
+) -> WriteBehindWorker:
+    """
+    获取写入队列在进程内共享的工作线程，首次调用时启动
+
+    Args:
+        queue: 写入队列
+        apply_factory: 创建写入函数的工厂
+
+    Returns:
+        工作线程
+    """
+    with _workers_lock:
+        worker = _workers.get(queue.db_path)
+        if worker is None:
+            worker = WriteBehindWorker(queue, apply_factory)
+            worker.start()
+            _workers[queue.db_path] = worker
+        return worker
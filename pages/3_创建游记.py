@@ -9,7 +9,9 @@ import streamlit as st
 import uuid
 from datetime import datetime
 from utils.auth import require_login
-from utils.image_utils import validate_image, compress_image
+from utils.image_utils import image_url, IMAGE_VARIANTS
+from utils.photo_buffer import PhotoBuffer, PhotoBufferFull
+from utils.image_executor import ImageProcessError, ImageQueueFull, get_image_executor
 from clients.ai_client import AIClient
 from clients.ocr_client import OCRClient
 from clients.image_client import ImageClient
@@ -24,12 +26,12 @@ st.set_page_config(
 )
 
 # 初始化 session state (v0.3.0 重构)
-# current_batch_photos: 当前批次的照片列表
+# current_batch_photos: 当前批次的照片（PhotoBuffer，只保存编码字节和预览图）
 # current_batch_comment: 当前批次的评论
 # submitted_batches: 已提交的批次列表
 # _processed_files: 已处理的文件集合（防止重复处理）
 if "current_batch_photos" not in st.session_state:
-    st.session_state.current_batch_photos = []
+    st.session_state.current_batch_photos = PhotoBuffer()
 if "current_batch_comment" not in st.session_state:
     st.session_state.current_batch_comment = ""
 if "submitted_batches" not in st.session_state:
@@ -38,6 +40,25 @@ if "_processed_files" not in st.session_state:
     st.session_state._processed_files = set()
 
 
+def add_photo(source, filename: str) -> bool:
+    """
+    添加照片到当前批次
+
+    Args:
+        source: Streamlit 上传的文件对象
+        filename: 文件名
+
+    Returns:
+        是否添加成功
+    """
+    try:
+        st.session_state.current_batch_photos.add(source, filename)
+        return True
+    except (ValueError, PhotoBufferFull, ImageQueueFull, ImageProcessError, TimeoutError) as e:
+        st.error(str(e))
+        return False
+
+
 def require_auth():
     """检查登录状态"""
     if not require_login():
@@ -60,11 +81,12 @@ def show_create_note_page():
         for i, batch in enumerate(st.session_state.submitted_batches):
             with st.expander(f"批次 {i + 1}: {len(batch['image_urls'])} 张照片 - {batch.get('comment', '无评论')[:30]}..."):
                 # 显示照片网格
-                cols = st.columns(min(4, len(batch["image_urls"])))
+                batch_images = batch.get("images") or batch["image_urls"]
+                cols = st.columns(min(4, len(batch_images)))
                 for j, col in enumerate(cols):
-                    if j < len(batch["image_urls"]):
+                    if j < len(batch_images):
                         with col:
-                            st.image(batch["image_urls"][j], width="stretch")
+                            st.image(image_url(batch_images[j], IMAGE_VARIANTS["thumb"]), width="stretch")
 
                 # 显示评论
                 if batch.get("comment"):
@@ -130,12 +152,7 @@ def show_create_note_page():
                             for p in st.session_state.current_batch_photos
                         )
                         if not is_duplicate:
-                            image = validate_image(uploaded_file)
-                            if image:
-                                st.session_state.current_batch_photos.append({
-                                    "image": image,
-                                    "filename": uploaded_file.name
-                                })
+                            if add_photo(uploaded_file, uploaded_file.name):
                                 print(f"[DEBUG] 添加照片: {uploaded_file.name}")
                                 st.session_state._processed_files.add(file_id)
                                 new_files_added = True
@@ -182,23 +199,21 @@ def show_create_note_page():
 
             # 处理相机文件
             if camera_files:
+                new_files_added = False
                 for camera_file in camera_files:
                     file_id = f"camera_{camera_file.name}_{camera_file.size}"
 
                     if file_id not in st.session_state._processed_files:
-                        image = validate_image(camera_file)
-                        if image:
-                            # 提取文件扩展名
-                            ext = camera_file.name.split('.')[-1] if '.' in camera_file.name else 'jpg'
-                            filename = f"camera_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{ext}"
-                            st.session_state.current_batch_photos.append({
-                                "image": image,
-                                "filename": filename
-                            })
+                        # 提取文件扩展名
+                        ext = camera_file.name.split('.')[-1] if '.' in camera_file.name else 'jpg'
+                        filename = f"camera_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{ext}"
+                        if add_photo(camera_file, filename):
                             print(f"[DEBUG] 添加相机照片: {filename}")
                             st.session_state._processed_files.add(file_id)
+                            new_files_added = True
 
-                if camera_files:
+                # 只有在添加了新文件时才 rerun（添加失败时保留错误提示）
+                if new_files_added:
                     st.rerun()
 
             # 处理 Streamlit 原生相机
@@ -207,13 +222,8 @@ def show_create_note_page():
                 file_id = f"camera_{camera_image.name}_{camera_image.size}"
 
                 if file_id not in st.session_state._processed_files:
-                    image = validate_image(camera_image)
-                    if image:
-                        filename = f"camera_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
-                        st.session_state.current_batch_photos.append({
-                            "image": image,
-                            "filename": filename
-                        })
+                    filename = f"camera_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
+                    if add_photo(camera_image, filename):
                         print(f"[DEBUG] 添加拍照: {filename}")
                         st.session_state._processed_files.add(file_id)
                         st.rerun()
@@ -230,7 +240,7 @@ def show_create_note_page():
                     if idx < len(st.session_state.current_batch_photos):
                         photo = st.session_state.current_batch_photos[idx]
                         with col:
-                            st.image(photo["image"], width="content")
+                            st.image(photo["thumbnail"], width="content")
                             # 删除按钮
                             if st.button("🗑️", key=f"del_photo_{idx}"):
                                 removed = st.session_state.current_batch_photos.pop(idx)
@@ -269,20 +279,44 @@ def show_create_note_page():
                 # 上传照片到 OSS
                 image_client = ImageClient()
                 batch_id = str(uuid.uuid4())
-                image_urls = []
-
-                for i, photo in enumerate(st.session_state.current_batch_photos):
-                    print(f"[DEBUG] 上传照片 {i+1}/{len(st.session_state.current_batch_photos)}")
-                    img_bytes = compress_image(photo["image"])
-                    filename = f"batch_{batch_id}_photo_{i+1}.jpg"
-                    url = image_client.upload_image(img_bytes, username, batch_id, filename)
-                    image_urls.append(url)
-                    print(f"[DEBUG] 照片上传成功: {url}")
-
-                # 创建批次记录
+                # 在图片处理进程中缩放、编码；写入临时文件的照片提交时才读取
+                photos = st.session_state.current_batch_photos
+                normalized = get_image_executor().normalize_each(
+                    [lambda photo=photo: photos.read(photo) for photo in photos], variants=True
+                )
+                items = [
+                    (result["data"], f"batch_{batch_id}_photo_{i+1}.jpg")
+                    for i, result in enumerate(normalized)
+                ]
+
+                # 并发上传，逐张更新进度
+                upload_progress = st.progress(0.0, text="正在上传照片...")
+
+                def on_uploaded(done, total, result):
+                    print(f"[DEBUG] 照片上传完成 {done}/{total}: {result['url'] or result['error']}")
+                    upload_progress.progress(done / total, text=f"已上传 {done}/{total} 张照片")
+
+                results = image_client.upload_images(
+                    items, username, batch_id, progress_callback=on_uploaded,
+                    variants=[result["variants"] for result in normalized]
+                )
+                failed = [r for r in results if not r["success"]]
+                if failed:
+                    raise Exception(
+                        f"{len(failed)} 张照片上传失败: " +
+                        "; ".join(f"{r['filename']}: {r['error']}" for r in failed)
+                    )
+                images = [r["image"] for r in results]
+                # 生成游记和 OCR 使用展示尺寸，游记正文中嵌入的也是展示图
+                image_urls = [image_url(image, IMAGE_VARIANTS["display"]) for image in images]
+
+                # 创建批次记录（拍摄时间来自照片 EXIF）
+                taken_at = [result["taken_at"] for result in normalized if result["taken_at"]]
                 batch = {
                     "batch_id": batch_id,
+                    "images": images,
                     "image_urls": image_urls,
+                    "taken_at": min(taken_at) if taken_at else None,
                     "comment": st.session_state.current_batch_comment,
                     "timestamp": datetime.now().isoformat()
                 }
@@ -291,7 +325,7 @@ def show_create_note_page():
                 print(f"[DEBUG] 提交批次 {batch_id}: {len(image_urls)} 张照片")
 
                 # 清空当前批次
-                st.session_state.current_batch_photos = []
+                st.session_state.current_batch_photos.clear()
                 st.session_state.current_batch_comment = ""
 
                 st.success(f"✅ 已提交批次 {len(st.session_state.submitted_batches)}！继续添加或生成游记")
@@ -310,9 +344,10 @@ def show_create_note_page():
             st.warning("请先至少提交一批内容")
             return
 
-        # 使用默认值
+        # 旅行日期取最早的照片拍摄时间，照片都没有 EXIF 时使用今天
         location = "未命名地点"
-        travel_date = str(datetime.now().date())
+        taken_at = [batch["taken_at"] for batch in st.session_state.submitted_batches if batch.get("taken_at")]
+        travel_date = str(min(taken_at).date() if taken_at else datetime.now().date())
         auto_title = True
 
         generate_trip_note(username, location, travel_date, auto_title)
@@ -331,6 +366,7 @@ def generate_trip_note(username: str, location: str, travel_date: str, auto_titl
             note_id = str(uuid.uuid4())
 
             # 收集所有照片信息（从已提交的批次中）
+            all_images = []
             all_image_urls = []
             all_comments = []
             ocr_results = {}
@@ -346,6 +382,7 @@ def generate_trip_note(username: str, location: str, travel_date: str, auto_titl
                     image_urls = batch.get("image_urls", [])
                     comment = batch.get("comment", "")
 
+                    all_images.extend(batch.get("images") or image_urls)
                     all_image_urls.extend(image_urls)
                     if comment:
                         all_comments.append(f"批次{i+1}: {comment}")
@@ -395,7 +432,7 @@ def generate_trip_note(username: str, location: str, travel_date: str, auto_titl
                 title=title,
                 location=location,
                 travel_date=travel_date,
-                images=all_image_urls,
+                images=all_images,
                 ocr_results=ocr_results_str,
                 user_notes=user_notes_str,
                 ai_content=ai_content
@@ -428,7 +465,7 @@ def generate_trip_note(username: str, location: str, travel_date: str, auto_titl
 
                 # 清空临时数据
                 st.session_state.submitted_batches = []
-                st.session_state.current_batch_photos = []
+                st.session_state.current_batch_photos.clear()
                 st.session_state.current_batch_comment = ""
 
                 if st.button("🏠 返回首页", use_container_width=True):
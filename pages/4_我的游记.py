@@ -9,6 +9,9 @@ import streamlit as st
 from datetime import datetime
 from utils.auth import require_login
 from clients.user_client import UserClient
+from clients.image_client import sized_image_url
+from utils.image_utils import IMAGE_VARIANTS
+from utils.async_bridge import gather_sync
 
 # 页面配置
 st.set_page_config(
@@ -36,10 +39,10 @@ def show_note_card(note, index):
     col1, col2 = st.columns([1, 3])
 
     with col1:
-        # 显示第一张图片
-        images = note.get("images", [])
-        if images and len(images) > 0:
-            st.image(images[0], width="content")
+        # 显示封面图片
+        cover_image = note.get("cover_image", "")
+        if cover_image:
+            st.image(sized_image_url(cover_image, IMAGE_VARIANTS["thumb"]), width="content")
         else:
             st.image("https://via.placeholder.com/300x200?text=无图片", width="content")
 
@@ -75,24 +78,59 @@ def show_note_card(note, index):
                 st.markdown(f"🕒 {created_dt.strftime('%Y-%m-%d')}")
 
         # 摘要
-        ai_content = note.get("ai_content", "")
-        if ai_content:
-            # 提取前 150 字作为摘要
-            summary = ai_content[:150].replace("#", "").replace("*", "").strip()
-            if len(ai_content) > 150:
-                summary += "..."
+        summary = note.get("summary", "")
+        if summary:
             st.markdown(f"*{summary}*")
 
         # 图片数量
-        images_count = len(note.get("images", []))
+        images_count = note.get("image_count", 0)
         if images_count > 0:
             st.markdown(f"📷 {images_count} 张照片")
 
+        if note.get("sync_failed"):
+            st.caption("⚠️ 部分修改未能同步到飞书，请在页面顶部重试或放弃")
+
         st.markdown("---")
 
 
-def show_delete_confirmation():
-    """显示删除确认对话框"""
+def show_failed_writes(user_client, username):
+    """
+    显示未能同步到飞书的写入，提供重试和放弃操作
+
+    Args:
+        user_client: 用户客户端
+        username: 用户名
+    """
+    failed = user_client.get_failed_writes(username)
+    if not failed:
+        return
+
+    op_names = {"create": "新建", "update": "修改", "delete": "删除"}
+    st.warning(f"⚠️ 有 {len(failed)} 项保存未能同步到飞书")
+    for entry in failed:
+        title = entry["payload"].get("title") or entry["note_id"]
+        col_info, col_retry, col_discard = st.columns([4, 1, 1])
+        with col_info:
+            st.markdown(f"**{op_names.get(entry['op'], entry['op'])}** {title}")
+            if entry.get("last_error"):
+                st.caption(entry["last_error"])
+        with col_retry:
+            if st.button("重试", key=f"retry_write_{entry['id']}"):
+                user_client.retry_failed_write(entry["id"])
+                st.rerun()
+        with col_discard:
+            if st.button("放弃", key=f"discard_write_{entry['id']}"):
+                user_client.discard_failed_write(entry["id"])
+                st.rerun()
+
+
+def show_delete_confirmation(username):
+    """
+    显示删除确认对话框
+
+    Args:
+        username: 用户名
+    """
     if st.session_state.get("show_delete_confirm", False):
         note_id = st.session_state.get("delete_note_id", "")
 
@@ -105,7 +143,7 @@ def show_delete_confirmation():
                 with st.spinner("删除中..."):
                     try:
                         user_client = UserClient()
-                        success, message = user_client.delete_note(note_id)
+                        success, message = user_client.delete_note(note_id, username=username)
 
                         if success:
                             st.success("游记已删除")
@@ -153,7 +191,22 @@ def show_my_notes_page():
     # 获取游记列表
     try:
         user_client = UserClient()
-        notes = user_client.list_notes(username, limit=100)
+        show_failed_writes(user_client, username)
+
+        # 游记列表和统计信息相互独立，并发读取
+        notes, stats = gather_sync(
+            lambda: user_client.list_note_cards(username, limit=100),
+            lambda: user_client.get_user_stats(username)
+        )
+
+        if stats.get("total_notes"):
+            col_stat1, col_stat2, col_stat3 = st.columns(3)
+            with col_stat1:
+                st.metric("游记", stats["total_notes"])
+            with col_stat2:
+                st.metric("照片", stats.get("total_images", 0))
+            with col_stat3:
+                st.metric("到访地点", len(stats.get("notes_by_location") or {}))
 
         # 过滤和排序
         if search:
@@ -176,13 +229,10 @@ def show_my_notes_page():
         # 显示游记
         if notes:
             for i, note in enumerate(notes):
-                # 获取完整游记数据
-                full_note = user_client.get_note(note["note_id"])
-                if full_note:
-                    show_note_card(full_note, i)
+                show_note_card(note, i)
 
             # 删除确认对话框
-            show_delete_confirmation()
+            show_delete_confirmation(username)
 
         else:
             # 空状态
@@ -9,6 +9,7 @@ import streamlit as st
 from datetime import datetime
 from utils.auth import require_login
 from clients.user_client import UserClient
+from clients.image_client import rewrite_markdown_images
 
 # 页面配置
 st.set_page_config(
@@ -103,7 +104,8 @@ def show_note_detail(note_id: str):
         # AI 生成的游记内容
         ai_content = note.get("ai_content", "")
         if ai_content:
-            st.markdown(ai_content)
+            # 图片按展示尺寸加载，导出内容仍保留原图链接
+            st.markdown(rewrite_markdown_images(ai_content))
         else:
             st.info("暂无游记内容")
 
@@ -112,7 +114,7 @@ def show_note_detail(note_id: str):
         if user_notes:
             st.markdown("---")
             st.markdown("### 💭 我的感想")
-            st.markdown(user_notes)
+            st.markdown(rewrite_markdown_images(user_notes))
 
         # OCR 识别结果
         ocr_results = note.get("ocr_results", {})
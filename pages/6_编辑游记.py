@@ -9,7 +9,8 @@ import streamlit as st
 import uuid
 from datetime import datetime
 from utils.auth import require_login
-from utils.image_utils import validate_image, compress_image
+from utils.image_utils import validate_image, image_url, IMAGE_VARIANTS
+from utils.image_executor import get_image_executor
 from clients.user_client import UserClient
 from clients.ai_client import AIClient
 from clients.ocr_client import OCRClient
@@ -131,15 +132,15 @@ def show_edit_page():
         if images:
             st.markdown("#### 现有照片")
 
-            for i, img_url in enumerate(images):
+            for i, image in enumerate(images):
                 col1, col2, col3 = st.columns([1, 3, 1])
 
                 with col1:
-                    st.image(img_url, width="content")
+                    st.image(image_url(image, IMAGE_VARIANTS["thumb"]), width="content")
 
                 with col2:
                     st.markdown(f"照片 {i + 1}")
-                    st.caption(img_url)
+                    st.caption(image_url(image))
 
                 with col3:
                     if st.button("删除", key=f"del_img_{i}"):
@@ -177,7 +178,7 @@ def show_edit_page():
                         with st.spinner("正在识别..."):
                             try:
                                 ocr_client = OCRClient()
-                                img_bytes = compress_image(image)
+                                img_bytes = get_image_executor().normalize(uploaded_file.getvalue())["data"]
                                 ocr_text = ocr_client.extract_text_from_image(img_bytes)
 
                                 if ocr_text:
@@ -189,8 +190,9 @@ def show_edit_page():
                                 st.error(f"OCR 失败: {str(e)}")
 
                     if st.button("➕ 添加到游记", type="primary"):
+                        # 只保存编码字节，不在会话中保存解码后的图片
                         st.session_state.pending_new_photo = {
-                            "image": image,
+                            "data": uploaded_file.getvalue(),
                             "note": photo_note,
                             "ocr": st.session_state.get("new_ocr_text", "")
                         }
@@ -246,45 +248,51 @@ def show_edit_page():
                 try:
                     user_client = UserClient()
 
-                    # 准备更新数据
+                    # 先上传新增照片，与其他修改一起保存
+                    new_photo_uploaded = False
+                    if st.session_state.get("pending_new_photo"):
+                        try:
+                            image_client = ImageClient()
+                            pending = st.session_state.pending_new_photo
+
+                            # 上传图片
+                            normalized = get_image_executor().normalize(pending["data"], variants=True)
+                            filename = f"new_photo_{uuid.uuid4().hex[:8]}.jpg"
+                            result = image_client.upload_images(
+                                [(normalized["data"], filename)], username, note_id,
+                                variants=[normalized["variants"]]
+                            )[0]
+                            if not result["success"]:
+                                raise Exception(result["error"])
+
+                            # 添加到图片列表
+                            images.append(result["image"])
+                            new_photo_uploaded = True
+
+                        except Exception as e:
+                            st.warning(f"照片上传失败: {str(e)}")
+
+                    # 准备更新数据（未修改的字段不会提交）
                     update_data = {
                         "title": new_title,
                         "location": new_location,
                         "travel_date": str(new_travel_date),
+                        "images": images,
                         "user_notes": edit_user_notes,
                         "ai_content": edit_ai_content
                     }
 
                     # 更新游记
-                    success, message = user_client.update_note(note_id, **update_data)
+                    success, message = user_client.update_note(note_id, username=username, **update_data)
 
                     if success:
                         st.success("保存成功！")
 
-                        # 处理新增照片
-                        if st.session_state.get("pending_new_photo"):
-                            try:
-                                image_client = ImageClient()
-                                pending = st.session_state.pending_new_photo
-
-                                # 上传图片
-                                img_bytes = compress_image(pending["image"])
-                                filename = f"new_photo_{uuid.uuid4().hex[:8]}.jpg"
-                                url = image_client.upload_image(img_bytes, username, note_id, filename)
-
-                                # 添加到图片列表
-                                images.append(url)
-
-                                # 更新游记
-                                user_client.update_note(note_id, images=images)
+                        if new_photo_uploaded:
+                            st.success("新照片已上传")
 
-                                st.success("新照片已上传")
-
-                                # 清理临时数据
-                                del st.session_state.pending_new_photo
-
-                            except Exception as e:
-                                st.warning(f"照片上传失败: {str(e)}")
+                            # 清理临时数据
+                            del st.session_state.pending_new_photo
 
                         # 返回详情页
                         if st.button("查看游记", use_container_width=True):
@@ -0,0 +1,82 @@
+# tests/benchmark_image_upload.py
+# -*- coding: utf-8 -*-
+"""
+上传前图片处理基准测试
+对比原有路径（打开并解码全尺寸图片后 compress_image）与 normalize_image_bytes
+的上传字节数和 CPU 时间
+
+运行: python tests/benchmark_image_upload.py [照片文件 ...]
+不指定文件时生成 12MP、48MP 的合成照片
+"""
+
+import io
+import os
+import sys
+import time
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from PIL import Image, ImageFilter
+
+from utils.image_utils import compress_image, normalize_image_bytes
+
+REPEAT = 3
+
+
+def synthetic_photo(width: int, height: int) -> bytes:
+    """生成带噪点和渐变、压缩率接近真实照片的 JPEG"""
+    noise = Image.effect_noise((width // 4, height // 4), 60).filter(ImageFilter.GaussianBlur(1))
+    gradient = Image.linear_gradient("L").resize((width // 4, height // 4))
+    image = Image.merge("RGB", (noise, gradient, Image.blend(noise, gradient, 0.5)))
+    image = image.resize((width, height), Image.Resampling.BICUBIC)
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=92)
+    return buffer.getvalue()
+
+
+def legacy_path(data: bytes) -> bytes:
+    """原有路径：validate_image 打开、页面显示时解码全尺寸，再 compress_image"""
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    return compress_image(image)
+
+
+def measure(func, data: bytes) -> tuple:
+    """返回 (输出字节数, 平均 CPU 毫秒)"""
+    output = func(data)
+    started = time.process_time()
+    for _ in range(REPEAT):
+        func(data)
+    return len(output), (time.process_time() - started) / REPEAT * 1000
+
+
+def main() -> None:
+    """主函数"""
+    if len(sys.argv) > 1:
+        photos = {}
+        for path in sys.argv[1:]:
+            with open(path, "rb") as f:
+                photos[os.path.basename(path)] = f.read()
+    else:
+        photos = {
+            "12MP 4032x3024": synthetic_photo(4032, 3024),
+            "48MP 8064x6048": synthetic_photo(8064, 6048)
+        }
+
+    paths = [
+        ("原有路径", legacy_path),
+        ("normalize(1920)", lambda data: normalize_image_bytes(data, max_edge=1920, quality=85)),
+        ("normalize(不缩放)", lambda data: normalize_image_bytes(data, max_edge=0, quality=85))
+    ]
+
+    print(f"{'照片':<16}{'路径':<20}{'上传字节':>12}{'CPU(ms)':>10}")
+    for name, data in photos.items():
+        print(f"{name:<16}{'(输入)':<20}{len(data):>12,}")
+        for label, func in paths:
+            size, cpu_ms = measure(func, data)
+            print(f"{'':<16}{label:<20}{size:>12,}{cpu_ms:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,9 +8,13 @@ import unittest
 from unittest.mock import Mock, patch, MagicMock
 import sys
 import os
+import json
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 # 添加项目根目录到路径
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 
 class TestAIClient(unittest.TestCase):
@@ -79,10 +83,511 @@ class TestImageClient(unittest.TestCase):
         self.assertIn("photo.jpg", key)
 
 
+class TestImageUpload(unittest.TestCase):
+    """图片批量上传测试"""
+
+    def _make_client(self, put_object=None):
+        """创建使用 Mock Bucket 的图片客户端"""
+        from clients.image_client import ImageClient
+        from clients.upload_cache import UploadedObjectCache
+
+        client = ImageClient.__new__(ImageClient)
+        client.bucket_name = "bucket"
+        client.endpoint = "oss.example.com"
+        client.upload_workers = 4
+        client.upload_timeout = 5
+        client.multipart_threshold = 256 * 1024
+        client.multipart_part_size = 100 * 1024
+        client.multipart_threads = 3
+        client.multipart_max_attempts = 3
+        client.checkpoint_dir = tempfile.mkdtemp()
+        client.checkpoint_max_age = 7 * 86400
+        client.upload_cache = UploadedObjectCache()
+        client.bucket = Mock()
+        client.bucket.object_exists.return_value = False
+        client.bucket.put_object.side_effect = put_object
+        return client
+
+    def test_upload_images_concurrently_in_order(self):
+        """测试并发上传、按输入顺序返回逐张结果并在调用线程回报进度"""
+        import time
+
+        def put_object(key, data):
+            time.sleep(0.2)
+            if data == b"bad":
+                raise Exception("AccessDenied")
+
+        client = self._make_client(put_object)
+        items = [(f"ok{i}".encode(), f"p{i}.jpg") for i in range(8)]
+        items[3] = (b"bad", "p3.jpg")
+        progress = []
+
+        started = time.monotonic()
+        results = client.upload_images(
+            items, "alice", "n1",
+            progress_callback=lambda done, total, result: progress.append(
+                (done, total, threading.current_thread() is threading.main_thread())
+            )
+        )
+
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertEqual([r["filename"] for r in results], [f"p{i}.jpg" for i in range(8)])
+        self.assertTrue(results[0]["url"].endswith(".jpg"))
+        self.assertFalse(results[3]["success"])
+        self.assertIn("AccessDenied", results[3]["error"])
+        self.assertEqual([p[0] for p in progress], list(range(1, 9)))
+        self.assertTrue(all(p[2] for p in progress))
+
+    def test_upload_images_deadline(self):
+        """测试超过整体超时的图片记为失败"""
+        import time
+
+        client = self._make_client(lambda key, data: time.sleep(1.0 if data == b"slow" else 0))
+        results = client.upload_images([(b"fast", "a.jpg"), (b"slow", "b.jpg")], "alice", "n1", timeout=0.3)
+
+        self.assertTrue(results[0]["success"])
+        self.assertFalse(results[1]["success"])
+        self.assertEqual(results[1]["error"], "图片上传超时")
+
+    def test_duplicate_images_upload_once(self):
+        """测试相同内容的图片只上传一次，已在 OSS 的图片只做存在检查"""
+        client = self._make_client()
+
+        first = client.upload_image(b"photo", "alice", "n1", "a.JPG")
+        second = client.upload_image(b"photo", "alice", "n2", "b.jpg")
+        self.assertEqual(first, second)
+        self.assertIn("/trip_note/alice/sha256/", first)
+        client.bucket.put_object.assert_called_once()
+        client.bucket.object_exists.assert_called_once()
+
+        # 其他进程已上传过：HEAD 命中后不再上传
+        client.upload_cache = type(client.upload_cache)()
+        client.bucket.object_exists.return_value = True
+        self.assertEqual(client.upload_image(b"photo", "alice", "n3", "c.jpg"), first)
+        client.bucket.put_object.assert_called_once()
+
+        # 共享对象默认不删除
+        self.assertFalse(client.delete_image(first))
+        client.bucket.delete_object.assert_not_called()
+        self.assertTrue(client.delete_image(first, force=True))
+        client.bucket.delete_object.assert_called_once()
+
+        # 缓存过期后重新检查：其他进程删除的对象会被重新上传
+        client.upload_cache = type(client.upload_cache)(ttl=0)
+        client.bucket.object_exists.return_value = False
+        client.upload_image(b"photo", "alice", "n4", "d.jpg")
+        client.upload_image(b"photo", "alice", "n5", "e.jpg")
+        self.assertEqual(client.bucket.put_object.call_count, 3)
+
+    def test_upload_image_variants(self):
+        """测试上传原图、展示图和缩略图，并按显示宽度选择版本"""
+        import io
+        from PIL import Image
+        from utils.image_utils import build_image_variants, image_url
+
+        buffer = io.BytesIO()
+        Image.new("RGB", (2000, 1000), (200, 100, 50)).save(buffer, format="JPEG")
+        uploaded = {}
+        client = self._make_client(lambda key, data: uploaded.__setitem__(key, data))
+
+        data = buffer.getvalue()
+        result = client.upload_images(
+            [(data, "p.jpg")], "alice", "n1", variants=[build_image_variants(data)]
+        )[0]
+        image = result["image"]
+
+        self.assertEqual(result["url"], image["original"])
+        self.assertEqual(len(set(image.values())), 3)
+        self.assertTrue(image["thumb"].endswith("_thumb.jpg"))
+        self.assertTrue(image["display"].endswith("_display.jpg"))
+        sizes = {name: Image.open(io.BytesIO(uploaded[url.split("oss.example.com/")[1]])).size
+                 for name, url in image.items()}
+        self.assertEqual(sizes, {"original": (2000, 1000), "display": (1280, 640), "thumb": (320, 160)})
+
+        self.assertEqual(image_url(image, 300), image["thumb"])
+        self.assertEqual(image_url(image, 800), image["display"])
+        self.assertEqual(image_url(image, 1600), image["original"])
+        self.assertEqual(image_url(image), image["original"])
+        self.assertEqual(image_url("https://old/p.jpg", 300), "https://old/p.jpg")
+
+        # 小图片不生成更大的版本
+        buffer = io.BytesIO()
+        Image.new("RGB", (300, 200)).save(buffer, format="JPEG")
+        small = client.upload_image_variants(
+            buffer.getvalue(), "alice", "n1", "s.jpg", build_image_variants(buffer.getvalue())
+        )
+        self.assertEqual(set(small.values()), {small["original"]})
+
+    def test_processed_urls_and_markdown_rewrite(self):
+        """测试 OSS 图片处理 URL 生成和 Markdown 图片替换"""
+        import clients.image_client as image_module
+
+        client = self._make_client()
+        client.process_enabled = True
+        url = "https://bucket.oss.example.com/trip_note/alice/a.jpg"
+
+        self.assertEqual(
+            client.processed_url(url, width=300, format="webp", quality=80),
+            url + "?x-oss-process=image/resize,m_lfit,w_300/format,webp/quality,q_80"
+        )
+        self.assertEqual(client.processed_url(url), url)
+        self.assertEqual(client.processed_url("https://other.com/a.jpg", width=300), "https://other.com/a.jpg")
+        processed = client.processed_url(url, width=300)
+        self.assertEqual(client.processed_url(processed, width=600), processed)
+        # 上传时生成的缩小版本不再处理
+        thumb = "https://bucket.oss.example.com/trip_note/alice/sha256/ab/abcd_thumb.jpg"
+        self.assertEqual(client.processed_url(thumb, width=300, format="webp"), thumb)
+        with patch.object(image_module, "get_image_client", return_value=client):
+            self.assertEqual(image_module.sized_image_url(thumb, 320), thumb)
+
+        markdown = (
+            f'开头\n![外滩]({url} "夜景")\n'
+            '![](https://bucket.oss.example.com/b.jpg)\n'
+            '[链接](https://bucket.oss.example.com/c.jpg)'
+        )
+        with patch.object(image_module, "get_image_client", return_value=client):
+            rewritten = image_module.rewrite_markdown_images(markdown, 1280)
+            self.assertEqual(
+                image_module.sized_image_url({"original": "o", "display": "d", "thumb": "t"}, 300), "t"
+            )
+
+        suffix = "?x-oss-process=image/resize,m_lfit,w_1280/format,webp/quality,q_80"
+        self.assertIn(f'![外滩]({url}{suffix} "夜景")', rewritten)
+        self.assertIn(f"![](https://bucket.oss.example.com/b.jpg{suffix})", rewritten)
+        self.assertIn("[链接](https://bucket.oss.example.com/c.jpg)", rewritten)
+
+    def test_multipart_upload_resumes_from_checkpoint(self):
+        """测试大图片分片上传，失败后重试只上传缺少的分片"""
+        import io
+        import oss2
+
+        client = self._make_client()
+        data = os.urandom(450 * 1024)
+        # 模拟 OSS 上已保存的分片
+        stored = {}
+        attempts = []
+        fail_parts = {3}
+
+        def upload_part(key, upload_id, part_number, part_data):
+            attempts.append(part_number)
+            if part_number in fail_parts:
+                fail_parts.discard(part_number)
+                raise Exception("connection reset")
+            stored[part_number] = part_data
+            return Mock(etag=f"etag-{part_number}")
+
+        client.bucket.init_multipart_upload.return_value = Mock(upload_id="u1")
+        client.bucket.upload_part.side_effect = upload_part
+        list_parts = lambda bucket, key, upload_id: [
+            oss2.models.PartInfo(n, f"etag-{n}", size=len(part)) for n, part in stored.items()
+        ]
+
+        with patch('clients.image_client.oss2.PartIterator', side_effect=list_parts):
+            with self.assertRaises(Exception):
+                client.upload_image(io.BytesIO(data), "alice", "n1", "big.jpg")
+            self.assertEqual(len(os.listdir(client.checkpoint_dir)), 1)
+            client.bucket.complete_multipart_upload.assert_not_called()
+
+            attempts.clear()
+            url = client.upload_image(data, "alice", "n1", "big.jpg")
+
+        self.assertTrue(url.endswith(".jpg"))
+        self.assertIn(3, attempts)
+        self.assertNotIn(1, attempts)
+        client.bucket.init_multipart_upload.assert_called_once()
+        client.bucket.put_object.assert_not_called()
+        parts = client.bucket.complete_multipart_upload.call_args[0][2]
+        self.assertEqual([p.part_number for p in parts], [1, 2, 3, 4, 5])
+        self.assertEqual(b"".join(stored[n] for n in range(1, 6)), data)
+        self.assertEqual(os.listdir(client.checkpoint_dir), [])
+
+    def test_multipart_upload_aborted_after_max_attempts(self):
+        """测试分片上传多次失败后放弃 OSS 上的分片，过期检查点被清理"""
+        import io
+        import json
+        import time
+
+        client = self._make_client()
+        client.multipart_max_attempts = 2
+        client.bucket.init_multipart_upload.return_value = Mock(upload_id="u1")
+        client.bucket.upload_part.side_effect = Exception("connection reset")
+        data = os.urandom(300 * 1024)
+
+        with patch('clients.image_client.oss2.PartIterator', return_value=[]):
+            for _ in range(2):
+                with self.assertRaises(Exception):
+                    client.upload_image(io.BytesIO(data), "alice", "n1", "big.jpg")
+        client.bucket.abort_multipart_upload.assert_called_once()
+        self.assertEqual(client.bucket.abort_multipart_upload.call_args.args[1], "u1")
+        self.assertEqual(os.listdir(client.checkpoint_dir), [])
+
+        # 超过保留天数的检查点在下次分片上传前放弃
+        stale = os.path.join(client.checkpoint_dir, "stale.json")
+        with open(stale, "w", encoding="utf-8") as f:
+            json.dump({"key": "trip_note/alice/old.jpg", "upload_id": "u0"}, f)
+        old = time.time() - 8 * 86400
+        os.utime(stale, (old, old))
+        self.assertEqual(client.prune_checkpoints(), 1)
+        client.bucket.abort_multipart_upload.assert_called_with("trip_note/alice/old.jpg", "u0")
+        self.assertFalse(os.path.exists(stale))
+
+
+class TestImageUtils(unittest.TestCase):
+    """图片规范化测试"""
+
+    def test_normalize_image_bytes(self):
+        """测试上传前缩小到最长边上限并只编码一次"""
+        import io
+        from PIL import Image
+        from utils.image_utils import normalize_image_bytes
+
+        buffer = io.BytesIO()
+        Image.new("RGB", (4000, 3000), (10, 120, 200)).save(buffer, format="JPEG", quality=95)
+        data = buffer.getvalue()
+
+        with patch('utils.image_utils.get_config') as mock_config:
+            mock_config.return_value.get_image_max_edge.return_value = 1000
+            mock_config.return_value.get_image_jpeg_quality.return_value = 85
+            normalized = normalize_image_bytes(data)
+        self.assertEqual(Image.open(io.BytesIO(normalized)).size, (1000, 750))
+
+        # 已解码的图片不被修改；RGBA 转为 RGB
+        rgba = Image.new("RGBA", (500, 400))
+        result = Image.open(io.BytesIO(normalize_image_bytes(rgba, max_edge=200, quality=80)))
+        self.assertEqual((result.size, result.mode), ((200, 160), "RGB"))
+        self.assertEqual(rgba.size, (500, 400))
+        self.assertEqual(Image.open(io.BytesIO(normalize_image_bytes(rgba, max_edge=0, quality=80))).size, (500, 400))
+
+    def test_normalize_image_applies_exif(self):
+        """测试按 EXIF 方向转正、去除 EXIF，并返回拍摄时间和 GPS"""
+        import io
+        from datetime import datetime
+        from PIL import Image
+        from utils.image_utils import normalize_image
+
+        image = Image.new("RGB", (400, 200), (255, 255, 255))
+        image.paste((255, 0, 0), (0, 0, 200, 200))
+        exif = Image.Exif()
+        exif[0x0112] = 6  # 需顺时针旋转 90 度
+        exif[0x0132] = "2024:01:01 00:00:00"
+        exif.get_ifd(0x8769)[0x9003] = "2024:05:01 08:30:00"
+        exif.get_ifd(0x8825).update({1: "N", 2: (31.0, 14.0, 24.0), 3: "E", 4: (121.0, 29.0, 24.0)})
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", exif=exif)
+
+        data, metadata = normalize_image(buffer.getvalue(), max_edge=200, quality=90)
+        result = Image.open(io.BytesIO(data))
+
+        self.assertEqual(result.size, (100, 200))
+        # 原图左侧的红色转正后位于上方
+        self.assertGreater(result.getpixel((50, 20))[0], 200)
+        self.assertLess(result.getpixel((50, 20))[1], 60)
+        self.assertEqual(len(result.getexif()), 0)
+        self.assertEqual(metadata["taken_at"], datetime(2024, 5, 1, 8, 30))
+        self.assertEqual(metadata["gps"], {"latitude": 31.24, "longitude": 121.49})
+
+        plain = io.BytesIO()
+        image.save(plain, format="PNG")
+        self.assertEqual(normalize_image(plain.getvalue(), max_edge=0, quality=90)[1], {"taken_at": None, "gps": None})
+
+    def test_gps_with_zero_denominator_ignored(self):
+        """测试 GPS 分量分母为 0 时不返回坐标"""
+        from PIL import Image
+        from PIL.TiffImagePlugin import IFDRational
+        from utils.image_utils import read_image_metadata
+
+        exif = Image.Exif()
+        exif[0x0132] = "2024:01:01 00:00:00"
+        exif.get_ifd(0x8825).update({
+            1: "N", 2: (IFDRational(31, 1), IFDRational(14, 0), IFDRational(0, 0)),
+            3: "E", 4: (121.0, 29.0, 24.0)
+        })
+        self.assertIsNone(read_image_metadata(exif)["gps"])
+
+
+    def test_process_image_decodes_once(self):
+        """测试工作进程中每张图片只打开一次，缩小版本由编码前的图片生成"""
+        import io
+        from PIL import Image
+        from utils.image_executor import process_image
+        from utils.image_utils import build_image_variants
+
+        buffer = io.BytesIO()
+        Image.new("RGB", (3000, 2000), (30, 60, 90)).save(buffer, format="JPEG")
+
+        with patch('PIL.Image.open', wraps=Image.open) as mock_open, \
+                patch('utils.image_executor.build_image_variants', wraps=build_image_variants) as mock_variants:
+            result = process_image(buffer.getvalue(), 1500, 80, variants=True)
+
+        # 只打开上传的原图：缩小版本从编码前的图片生成，不重新解码已压缩的 JPEG
+        self.assertEqual(mock_open.call_count, 1)
+        source = mock_variants.call_args[0][0]
+        self.assertEqual((source.size, result["size"], result["original_size"]), ((1500, 1000), (1500, 1000), (3000, 2000)))
+        self.assertEqual(set(result["variants"]), {"display", "thumb"})
+
+
+class TestPhotoBuffer(unittest.TestCase):
+    """待上传照片缓冲区测试"""
+
+    def test_photo_buffer_budget_and_spill(self):
+        """测试待上传照片只保存编码字节，超过内存预算时写入临时文件或拒绝"""
+        import io
+        from PIL import Image
+        from utils.photo_buffer import PhotoBuffer, PhotoBufferFull
+        from utils.image_executor import ImageExecutor
+
+        def jpeg(size):
+            buffer = io.BytesIO()
+            Image.effect_noise(size, 50).convert("RGB").save(buffer, format="JPEG")
+            return buffer.getvalue()
+
+        photos = [jpeg((1200, 900)) for _ in range(3)]
+        inline = ImageExecutor(max_workers=0, max_queue=4)
+        buffer = PhotoBuffer(memory_budget=len(photos[0]) * 2, spill=True, executor=inline)
+        for i, data in enumerate(photos):
+            buffer.add(io.BytesIO(data), f"p{i}.jpg")
+
+        self.assertEqual(len(buffer), 3)
+        self.assertIsNone(buffer[2]["data"])
+        self.assertTrue(os.path.exists(buffer[2]["path"]))
+        self.assertLessEqual(buffer.memory_bytes, buffer.memory_budget)
+        self.assertEqual([buffer.read(p) for p in buffer], photos)
+        self.assertLessEqual(max(Image.open(io.BytesIO(buffer[0]["thumbnail"])).size), 320)
+
+        spilled = buffer.pop(2)["path"]
+        self.assertFalse(os.path.exists(spilled))
+        buffer.clear()
+        self.assertEqual((len(buffer), buffer.memory_bytes), (0, 0))
+
+        strict = PhotoBuffer(memory_budget=len(photos[0]) * 2, spill=False, executor=inline)
+        strict.add(photos[0], "a.jpg")
+        with self.assertRaises(PhotoBufferFull):
+            for data in photos[1:]:
+                strict.add(data, "b.jpg")
+        with self.assertRaises(ValueError):
+            strict.add(b"not an image", "c.jpg")
+
+
+    def test_preview_timeout_releases_queue_slot(self):
+        """测试预览图超时时抛出 TimeoutError 并释放队列位置"""
+        from concurrent.futures import Future
+        from utils.photo_buffer import PhotoBuffer
+        from utils.image_executor import ImageExecutor
+
+        executor = ImageExecutor(max_workers=1, max_queue=2)
+
+        def stuck(*args):
+            future = Future()
+            future.add_done_callback(executor._release)
+            return future
+
+        buffer = PhotoBuffer(memory_budget=1024, spill=False, executor=executor, timeout=0.05)
+        with patch.object(executor, "_submit", side_effect=stuck):
+            with self.assertRaises(TimeoutError):
+                buffer.add(b"data", "a.jpg")
+        self.assertEqual((len(buffer), executor.pending), (0, 0))
+
+
+class TestImageExecutor(unittest.TestCase):
+    """图片处理进程池测试"""
+
+    def test_image_executor_process_pool(self):
+        """测试图片在工作进程中规范化，队列放不下整批时拒绝"""
+        import io
+        from PIL import Image
+        from utils.image_executor import ImageExecutor, ImageQueueFull
+
+        def encode(size, image_format):
+            buffer = io.BytesIO()
+            Image.new("RGB", size, (30, 60, 90)).save(buffer, format=image_format)
+            return buffer.getvalue()
+
+        executor = ImageExecutor(max_workers=1, max_queue=2)
+        try:
+            results = executor.normalize_many(
+                [encode((3000, 2000), "JPEG"), encode((400, 300), "PNG")],
+                max_edge=1500, quality=80, timeout=60, variants=True
+            )
+            self.assertEqual([r["size"] for r in results], [(1500, 1000), (400, 300)])
+            self.assertEqual([r["format"] for r in results], ["JPEG", "PNG"])
+            self.assertEqual(Image.open(io.BytesIO(results[1]["data"])).format, "JPEG")
+            # 缩小版本在工作进程中生成
+            self.assertEqual(
+                {name: Image.open(io.BytesIO(data)).size for name, data in results[0]["variants"].items()},
+                {"display": (1280, 853), "thumb": (320, 213)}
+            )
+            self.assertEqual(list(results[1]["variants"]), ["thumb"])
+
+            # 完成回调在结果返回后释放队列位置
+            import time
+            for _ in range(100):
+                if executor.pending == 0:
+                    break
+                time.sleep(0.01)
+            self.assertEqual(executor.pending, 0)
+
+            with self.assertRaises(ImageQueueFull):
+                executor.submit_many([b"a", b"b", b"c"], max_edge=100, quality=80)
+            self.assertEqual(executor.pending, 0)
+
+            # 逐张读取提交，批次大于队列上限也能处理
+            loaded = []
+            loaders = [lambda i=i: loaded.append(i) or encode((200 + i, 100), "JPEG") for i in range(3)]
+            results = executor.normalize_each(loaders, max_edge=100, quality=80, timeout=60)
+            self.assertEqual(loaded, [0, 1, 2])
+            self.assertEqual([r["original_size"] for r in results], [(200, 100), (201, 100), (202, 100)])
+
+            with self.assertRaises(ValueError):
+                executor.normalize(encode((10, 10), "GIF"), max_edge=100, quality=80, timeout=60)
+        finally:
+            executor.shutdown()
+
+    def test_worker_killed_mid_task(self):
+        """测试工作进程异常退出时返回可读的错误，并在下次提交时重建进程池"""
+        import io
+        import signal
+        from PIL import Image
+        from utils.image_executor import ImageExecutor, ImageProcessError
+
+        buffer = io.BytesIO()
+        Image.effect_noise((4000, 3000), 50).convert("RGB").save(buffer, format="JPEG")
+        executor = ImageExecutor(max_workers=1, max_queue=4)
+        try:
+            future = executor.submit(buffer.getvalue(), max_edge=1000, quality=80)
+            broken = executor._pool
+            for pid in list(broken._processes):
+                os.kill(pid, signal.SIGKILL)
+
+            with self.assertRaises(ImageProcessError):
+                executor.result(future, timeout=60)
+            self.assertIsNot(executor._pool, broken)
+            self.assertEqual(executor.pending, 0)
+
+            small = io.BytesIO()
+            Image.new("RGB", (200, 100)).save(small, format="PNG")
+            self.assertEqual(executor.normalize(small.getvalue(), max_edge=100, quality=80, timeout=60)["size"], (100, 50))
+        finally:
+            executor.shutdown()
+
+    def test_decompression_bomb_rejected(self):
+        """测试像素数超过上限的图片返回可读的错误"""
+        import io
+        from PIL import Image
+        from utils.image_executor import ImageExecutor, ImageProcessError
+
+        buffer = io.BytesIO()
+        Image.new("RGB", (300, 300)).save(buffer, format="PNG")
+        executor = ImageExecutor(max_workers=0, max_queue=4)
+        with patch.object(Image, "MAX_IMAGE_PIXELS", 100):
+            with self.assertRaises(ImageProcessError):
+                executor.normalize(buffer.getvalue(), max_edge=100, quality=80)
+        self.assertEqual(executor.pending, 0)
+
+
 class TestAuthClient(unittest.TestCase):
     """认证客户端测试"""
 
-    @patch('clients.auth_client.FeishuClient')
+    @patch('clients.auth_client.get_storage')
     def test_register_success(self, mock_feishu):
         """测试用户注册成功"""
         from clients.auth_client import AuthClient
@@ -98,7 +603,7 @@ class TestAuthClient(unittest.TestCase):
         self.assertTrue(success)
         self.assertEqual(message, "注册成功")
 
-    @patch('clients.auth_client.FeishuClient')
+    @patch('clients.auth_client.get_storage')
     def test_register_user_exists(self, mock_feishu):
         """测试用户已存在"""
         from clients.auth_client import AuthClient
@@ -128,7 +633,15 @@ class TestAuthClient(unittest.TestCase):
 class TestUserClient(unittest.TestCase):
     """用户客户端测试"""
 
-    @patch('clients.user_client.FeishuClient')
+    def setUp(self):
+        # 索引、镜像和写入队列数据库写入临时目录，不在仓库中生成 .local_data
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        patcher = patch('utils.config.Config.get_local_data_dir', return_value=tmp_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch('clients.user_client.get_storage')
     def test_create_note(self, mock_feishu):
         """测试创建游记"""
         from clients.user_client import UserClient
@@ -153,10 +666,902 @@ class TestUserClient(unittest.TestCase):
         self.assertTrue(success)
         self.assertIsNotNone(note_id)
 
+    def _make_client_with_index(self, mock_feishu_instance, write_behind=False):
+        """创建使用临时索引文件的用户客户端"""
+        from clients.user_client import UserClient
+        from clients.note_index import NoteIndex
+        from clients.write_queue import WriteQueue
+
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        db_path = os.path.join(tmp_dir.name, "note_index.db")
+        queue_path = os.path.join(tmp_dir.name, "write_queue.db")
+
+        from clients.user_stats import UserStatsCache
+        from clients.note_cache import NoteSnapshotCache
+
+        with patch('clients.user_client.get_storage', return_value=mock_feishu_instance), \
+                patch('clients.user_client.NoteIndex', side_effect=lambda: NoteIndex(db_path)), \
+                patch('clients.user_client.get_stats_cache', return_value=UserStatsCache()), \
+                patch('clients.user_client.get_note_cache', return_value=NoteSnapshotCache()), \
+                patch('clients.user_client.WriteQueue', side_effect=lambda: WriteQueue(queue_path, 3)), \
+                patch('clients.user_client.get_write_worker', return_value=Mock()):
+            return UserClient(write_behind=write_behind)
+
+    def test_write_behind_returns_before_feishu(self):
+        """测试写入队列：保存立即返回，读取包含未同步的写入，后台失败后重试"""
+        from clients.write_queue import WriteBehindWorker
+
+        mock_feishu_instance = Mock()
+        mock_feishu_instance.list_trip_notes.return_value = []
+        client = self._make_client_with_index(mock_feishu_instance, write_behind=True)
+
+        success, _, note_id = client.create_note("alice", "标题", "西湖", "2026-02-19", images=["u1"])
+        self.assertTrue(success)
+        client.update_note(note_id, title="新标题")
+        mock_feishu_instance.create_trip_note.assert_not_called()
+
+        note = client.get_note(note_id)
+        self.assertEqual(note["title"], "新标题")
+        cards = client.list_note_cards("alice")
+        self.assertEqual([(c["note_id"], c["title"], c["image_count"]) for c in cards], [(note_id, "新标题", 1)])
+
+        # 飞书不可用时写入保留在队列中
+        worker = WriteBehindWorker(client.write_queue, None, base_delay=0)
+        mock_feishu_instance.create_trip_note.side_effect = Exception("飞书 API 请求失败: timeout")
+        self.assertEqual(worker.flush(client.apply_pending_write), 0)
+        self.assertEqual(client.write_queue.count(), 2)
+        self.assertEqual(client.write_queue.pending()[0]["attempts"], 1)
+
+        mock_feishu_instance.create_trip_note.side_effect = None
+        mock_feishu_instance.create_trip_note.return_value = {"record": {"record_id": "rec1"}}
+        self.assertEqual(worker.flush(client.apply_pending_write), 2)
+        self.assertEqual(client.write_queue.count(), 0)
+        mock_feishu_instance.update_trip_note.assert_called_once()
+        self.assertEqual(mock_feishu_instance.update_trip_note.call_args.args[0], "rec1")
+
+    def test_failed_writes_stay_visible(self):
+        """测试超过重试次数的写入仍叠加在列表上，可重试或放弃；不存在的游记不排入队列"""
+        from clients.write_queue import WriteBehindWorker
+
+        mock_feishu_instance = Mock()
+        mock_feishu_instance.list_trip_notes.return_value = []
+        mock_feishu_instance.get_trip_note.return_value = None
+        client = self._make_client_with_index(mock_feishu_instance, write_behind=True)
+
+        self.assertEqual(client.update_note("missing", title="x"), (False, "游记不存在"))
+        self.assertEqual(client.write_queue.count(), 0)
+
+        _, _, note_id = client.create_note("alice", "标题", "西湖", "2026-02-19")
+        client.update_note(note_id, title="新标题", username="alice")
+        worker = WriteBehindWorker(client.write_queue, None, base_delay=0)
+        mock_feishu_instance.create_trip_note.side_effect = Exception("飞书 API 请求失败: timeout")
+        for _ in range(3):
+            worker.flush(client.apply_pending_write)
+
+        failed = client.get_failed_writes("alice")
+        self.assertEqual([entry["op"] for entry in failed], ["create"])
+        self.assertEqual(client.write_queue.due(), [])
+        cards = client.list_note_cards("alice")
+        self.assertEqual([(c["title"], c.get("sync_failed")) for c in cards], [("新标题", True)])
+
+        client.retry_failed_write(failed[0]["id"])
+        mock_feishu_instance.create_trip_note.side_effect = None
+        mock_feishu_instance.create_trip_note.return_value = {"record": {"record_id": "rec1"}}
+        self.assertEqual(worker.flush(client.apply_pending_write), 2)
+        self.assertEqual(client.get_failed_writes("alice"), [])
+
+        # 放弃失败的新建时同时放弃之后的写入
+        _, _, other_id = client.create_note("alice", "另一篇", "西湖", "2026-02-19")
+        client.update_note(other_id, title="改")
+        mock_feishu_instance.create_trip_note.side_effect = Exception("飞书 API 请求失败: timeout")
+        for _ in range(3):
+            worker.flush(client.apply_pending_write)
+        self.assertTrue(client.discard_failed_write(client.get_failed_writes("alice")[0]["id"]))
+        self.assertEqual(client.write_queue.pending(other_id), [])
+
+    def test_update_note_uses_index(self):
+        """测试创建后更新游记不再查询记录 ID"""
+        mock_feishu_instance = Mock()
+        mock_feishu_instance.create_trip_note.return_value = {"record": {"record_id": "rec1"}}
+        client = self._make_client_with_index(mock_feishu_instance)
+
+        _, _, note_id = client.create_note("testuser", "标题", "西湖", "2026-02-19")
+        success, _ = client.update_note(note_id, title="新标题")
+
+        self.assertTrue(success)
+        mock_feishu_instance.get_trip_note.assert_not_called()
+        mock_feishu_instance.update_trip_note.assert_called_once_with("rec1", {"title": "新标题"})
+
+    def test_update_note_sends_only_changed_fields(self):
+        """测试更新游记只提交有变化的字段，没有变化时不请求飞书"""
+        mock_feishu_instance = Mock()
+        mock_feishu_instance.get_trip_note.return_value = {"record_id": "rec1", "fields": {
+            "note_id": "n1", "username": "alice", "title": "标题", "location": "西湖",
+            "travel_date": 1771430400000, "images": '["u1"]', "user_notes": "", "ai_content": "正文"
+        }}
+        client = self._make_client_with_index(mock_feishu_instance)
+        note = client.get_note("n1")
+
+        unchanged = {key: note[key] for key in ["title", "location", "images", "user_notes", "ai_content"]}
+        success, _ = client.update_note("n1", **unchanged)
+        self.assertTrue(success)
+        mock_feishu_instance.update_trip_note.assert_not_called()
+
+        client.update_note("n1", **dict(unchanged, title="新标题", images=["u1", "u2"]))
+        mock_feishu_instance.update_trip_note.assert_called_once_with("rec1", {
+            "title": "新标题", "images": ["u1", "u2"], "cover_image": "u1", "image_count": 2
+        })
+
+        # 已保存的修改合并到快照，再次保存相同内容不再请求
+        client.update_note("n1", title="新标题", images=["u1", "u2"])
+        self.assertEqual(mock_feishu_instance.update_trip_note.call_count, 1)
+
+    def test_index_miss_falls_back_to_lookup(self):
+        """测试索引未命中时查询飞书并回填，删除后移除"""
+        mock_feishu_instance = Mock()
+        mock_feishu_instance.get_trip_note.return_value = {"record_id": "rec9", "fields": {}}
+        mock_feishu_instance.delete_trip_note.return_value = True
+        client = self._make_client_with_index(mock_feishu_instance)
+
+        client.update_note("n9", title="a")
+        client.update_note("n9", title="b")
+        self.assertEqual(mock_feishu_instance.get_trip_note.call_count, 1)
+
+        # 飞书删除失败时保留索引
+        mock_feishu_instance.delete_trip_note.return_value = False
+        success, _ = client.delete_note("n9")
+        self.assertFalse(success)
+        self.assertEqual(client.note_index.get("n9"), "rec9")
+
+        mock_feishu_instance.delete_trip_note.return_value = True
+        success, _ = client.delete_note("n9")
+        self.assertTrue(success)
+        self.assertIsNone(client.note_index.get("n9"))
+
+    def test_list_note_cards_single_fetch(self):
+        """测试列表页数据一次请求返回完整游记"""
+        mock_feishu_instance = Mock()
+        mock_feishu_instance.list_trip_notes.return_value = [
+            {"record_id": f"rec{i}", "fields": {
+                "note_id": f"n{i}",
+                "username": "testuser",
+                "title": f"游记{i}",
+                "cover_image": f"url{i}",
+                "image_count": 1,
+                "ai_content": "# 标题\n" + "正文" * 100,
+                "created_at": 1700000000000
+            }}
+            for i in range(30)
+        ]
+        client = self._make_client_with_index(mock_feishu_instance)
+
+        notes = client.list_note_cards("testuser", limit=100)
+
+        self.assertEqual(len(notes), 30)
+        self.assertEqual(notes[0]["cover_image"], "url0")
+        self.assertEqual(notes[0]["image_count"], 1)
+        self.assertTrue(notes[0]["summary"].endswith("..."))
+        self.assertNotIn("#", notes[0]["summary"])
+        self.assertEqual(mock_feishu_instance.list_trip_notes.call_count, 1)
+        field_names = mock_feishu_instance.list_trip_notes.call_args.kwargs["field_names"]
+        self.assertNotIn("ai_content", field_names)
+        self.assertNotIn("ocr_results", field_names)
+        mock_feishu_instance.get_trip_note.assert_not_called()
+        self.assertEqual(client.note_index.get("n29"), "rec29")
+
+    def test_legacy_records_backfilled_on_read(self):
+        """测试没有派生字段的旧记录在列表和统计中补读完整字段并写回"""
+        mock_feishu_instance = Mock()
+        legacy = [{"record_id": "rec1", "fields": {"note_id": "n1", "username": "testuser", "title": "旧游记"}}]
+        mock_feishu_instance.list_trip_notes.return_value = [dict(r, fields=dict(r["fields"])) for r in legacy]
+        mock_feishu_instance.iter_trip_notes.return_value = iter([dict(r, fields=dict(r["fields"])) for r in legacy])
+        mock_feishu_instance.batch_get_trip_notes.return_value = [{"record_id": "rec1", "fields": {
+            "note_id": "n1", "images": json.dumps(["url1", "url2"]), "ai_content": "旧正文"
+        }}]
+        mock_feishu_instance.batch_update_trip_notes.return_value = [{"success": True, "record_id": "rec1"}]
+        client = self._make_client_with_index(mock_feishu_instance)
+
+        cards = client.list_note_cards("testuser")
+        self.assertEqual(
+            (cards[0]["cover_image"], cards[0]["image_count"], cards[0]["summary"]),
+            ("url1", 2, "旧正文")
+        )
+        mock_feishu_instance.batch_get_trip_notes.assert_called_once_with(["rec1"])
+        mock_feishu_instance.batch_update_trip_notes.assert_called_once_with([
+            ("rec1", {"summary": "旧正文", "cover_image": "url1", "image_count": 2})
+        ])
+
+        self.assertEqual(client.get_user_stats("testuser")["total_images"], 2)
+
+    def test_user_stats_single_pass_and_incremental(self):
+        """测试统计只遍历一次，之后随增删改增量更新"""
+        mock_feishu_instance = Mock()
+        mock_feishu_instance.iter_trip_notes.return_value = iter([
+            {"record_id": "r1", "fields": {
+                "note_id": "n1", "image_count": 2,
+                "location": "西湖", "travel_date": 1700000000000
+            }},
+            {"record_id": "r2", "fields": {
+                "note_id": "n2", "image_count": 1,
+                "location": "西湖", "travel_date": 1710000000000
+            }}
+        ])
+        mock_feishu_instance.create_trip_note.return_value = {"record": {"record_id": "r3"}}
+        mock_feishu_instance.delete_trip_note.return_value = True
+        client = self._make_client_with_index(mock_feishu_instance)
+
+        stats = client.get_user_stats("testuser")
+        self.assertEqual(stats["total_notes"], 2)
+        self.assertEqual(stats["total_images"], 3)
+        self.assertEqual(stats["notes_by_location"], {"西湖": 2})
+        self.assertEqual(stats["first_travel_date"], 1700000000000)
+
+        client.note_index.put("n1", "r1")
+        client.note_index.put("n2", "r2")
+        _, _, note_id = client.create_note("testuser", "新游记", "灵隐寺", "2026-02-19", images=["d"])
+        client.update_note("n1", images=["a"])
+        client.delete_note("n2")
+
+        stats = client.get_user_stats("testuser")
+        self.assertEqual(stats["total_notes"], 2)
+        self.assertEqual(stats["total_images"], 2)
+        self.assertEqual(stats["notes_by_location"], {"西湖": 1, "灵隐寺": 1})
+        self.assertEqual(mock_feishu_instance.iter_trip_notes.call_count, 1)
+        mock_feishu_instance.get_trip_note.assert_not_called()
+
+    def test_create_note_stores_derived_fields(self):
+        """测试创建游记时写入摘要、封面和图片数"""
+        mock_feishu_instance = Mock()
+        mock_feishu_instance.create_trip_note.return_value = {"record": {"record_id": "rec1"}}
+        client = self._make_client_with_index(mock_feishu_instance)
+
+        client.create_note("testuser", "标题", "西湖", "2026-02-19",
+                           images=["url1", "url2"], ai_content="# 西湖\n很美")
+
+        note_data = mock_feishu_instance.create_trip_note.call_args.args[0]
+        self.assertEqual(note_data["cover_image"], "url1")
+        self.assertEqual(note_data["image_count"], 2)
+        self.assertEqual(note_data["summary"], "西湖\n很美")
+
+    def test_bulk_create_and_delete(self):
+        """测试批量创建后批量删除，记录 ID 来自索引"""
+        mock_feishu_instance = Mock()
+        mock_feishu_instance.batch_create_trip_notes.side_effect = lambda notes: [
+            {"success": True, "record_id": f"rec{i}", "error": ""} for i in range(len(notes))
+        ]
+        mock_feishu_instance.batch_delete_trip_notes.side_effect = lambda ids: [
+            {"success": True, "record_id": rid, "error": ""} for rid in ids
+        ]
+        mock_feishu_instance.get_trip_note.return_value = None
+        client = self._make_client_with_index(mock_feishu_instance)
+
+        created = client.create_notes("testuser", [{"title": "a"}, {"title": "b"}])
+        note_ids = [note_id for _, _, note_id in created]
+        outcomes = client.delete_notes(note_ids + ["missing"])
+
+        mock_feishu_instance.batch_delete_trip_notes.assert_called_once_with(["rec0", "rec1"])
+        self.assertTrue(all(outcomes[note_id][0] for note_id in note_ids))
+        self.assertEqual(outcomes["missing"], (False, "游记不存在"))
+
+
+class _FakeBitableHandler(BaseHTTPRequestHandler):
+    """本地模拟的飞书多维表格接口"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_POST(self):
+        self.server.request_log.append(("POST", self.path))
+        body = self._read_body()
+
+        if "tenant_access_token" in self.path:
+            self._send({"code": 0, "tenant_access_token": "t-test", "expire": 7200})
+            return
+
+        # /bitable/v1/apps/{app}/tables/{table}/records/search?page_size=..
+        from urllib.parse import urlparse, parse_qs
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        parts = parsed.path.split("/")
+        table_id = parts[parts.index("tables") + 1]
+        records = self.server.tables.get(table_id, [])
+
+        def match(fields, cond):
+            actual = fields.get(cond["field_name"])
+            value = cond["value"]
+            if cond["operator"] == "is":
+                return actual == value[0]
+            if cond["operator"] == "isGreaterEqual":
+                return actual is not None and actual >= int(value[1])
+            if cond["operator"] == "isLessEqual":
+                return actual is not None and actual <= int(value[1])
+            raise ValueError(cond["operator"])
+
+        conditions = (body.get("filter") or {}).get("conditions", [])
+        matched = [r for r in records if all(match(r["fields"], c) for c in conditions)]
+        for rule in reversed(body.get("sort") or []):
+            matched.sort(key=lambda r: r["fields"].get(rule["field_name"]) or 0, reverse=rule.get("desc", False))
+
+        field_names = body.get("field_names")
+        start = int(query.get("page_token", ["0"])[0])
+        page_size = int(query.get("page_size", ["20"])[0])
+        page = matched[start:start + page_size]
+
+        items = []
+        for record in page:
+            fields = {
+                k: ([{"text": v, "type": "text"}] if isinstance(v, str) else v)
+                for k, v in record["fields"].items()
+                if not field_names or k in field_names
+            }
+            items.append({"record_id": record["record_id"], "fields": fields})
+
+        has_more = start + page_size < len(matched)
+        self._send({"code": 0, "data": {
+            "items": items,
+            "has_more": has_more,
+            "page_token": str(start + page_size) if has_more else None,
+            "total": len(matched)
+        }})
+
+
+class TestFeishuClient(unittest.TestCase):
+    """飞书客户端测试"""
+
+    def _make_client(self, api_base="http://feishu.invalid/open-apis", client_class=None):
+        """创建使用 Mock 配置的飞书客户端"""
+        from clients.feishu_client import FeishuClient
+
+        client_class = client_class or FeishuClient
+        with patch('clients.feishu_client.get_config') as mock_config:
+            mock_config.return_value = Mock()
+            mock_config.return_value.get_feishu_app_id.return_value = "cli_test"
+            mock_config.return_value.get_feishu_app_secret.return_value = "secret"
+            mock_config.return_value.get_feishu_api_base.return_value = api_base
+            mock_config.return_value.get_feishu_table_id_user.return_value = "tbl_user"
+            mock_config.return_value.get_feishu_table_id_note.return_value = "tbl_note"
+            return client_class()
+
+    def _start_fake_server(self, tables):
+        """启动本地模拟服务器"""
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeBitableHandler)
+        server.tables = tables
+        server.request_log = []
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server, f"http://127.0.0.1:{server.server_address[1]}/open-apis"
+
+    def test_search_records_follows_page_token(self):
+        """测试分页查询跟随 page_token，每页使用同一请求体"""
+        client = self._make_client()
+        pages = [
+            {"items": [{"record_id": "r1"}], "has_more": True, "page_token": "p2"},
+            {"items": [{"record_id": "r2"}], "has_more": False}
+        ]
+        client._request = Mock(side_effect=pages)
+
+        records = list(client._search_records("app", "tbl", field_names=["note_id"]))
+
+        self.assertEqual([r["record_id"] for r in records], ["r1", "r2"])
+        self.assertEqual(client._request.call_count, 2)
+        self.assertTrue(client._request.call_args_list[1].args[1].endswith("/records/search"))
+        self.assertEqual(client._request.call_args_list[1].kwargs["data"], {"field_names": ["note_id"]})
+        second_params = client._request.call_args_list[1].kwargs["params"]
+        self.assertEqual(second_params["page_token"], "p2")
+        self.assertEqual(second_params["page_size"], 500)
+
+    def test_get_trip_note_stops_after_match(self):
+        """测试找到游记后不再请求后续页面"""
+        client = self._make_client()
+        client._request = Mock(return_value={
+            "items": [{"record_id": "r1", "fields": {"note_id": "n1"}}],
+            "has_more": True,
+            "page_token": "p2"
+        })
+
+        record = client.get_trip_note("n1")
+
+        self.assertEqual(record["record_id"], "r1")
+        self.assertEqual(client._request.call_count, 1)
+
+    def test_search_filters_on_server(self):
+        """测试查询条件、排序和字段裁剪由服务端处理"""
+        notes = [
+            {"record_id": f"r{i}", "fields": {
+                "note_id": f"n{i}",
+                "username": "alice" if i % 2 else "bob",
+                "title": f"游记{i}",
+                "ai_content": "很长的正文" * 10,
+                "travel_date": 1700000000000 + i * 86400000
+            }}
+            for i in range(1, 1201)
+        ]
+        users = [{"record_id": "u1", "fields": {"username": "alice", "password": "x"}}]
+        server, api_base = self._start_fake_server({"tbl_note": notes, "tbl_user": users})
+        client = self._make_client(api_base)
+
+        user = client.get_user("alice")
+        self.assertEqual(user["fields"]["username"], "alice")
+
+        note = client.get_trip_note("n1100")
+        self.assertEqual(note["record_id"], "r1100")
+        self.assertEqual(note["fields"]["title"], "游记1100")
+
+        records = client.list_trip_notes(
+            "alice",
+            limit=3,
+            date_from=1700000000000 + 10 * 86400000,
+            sort_by="travel_date",
+            descending=False,
+            field_names=["note_id", "title"]
+        )
+        self.assertEqual([r["fields"]["note_id"] for r in records], ["n11", "n13", "n15"])
+        self.assertNotIn("ai_content", records[0]["fields"])
+        # 不合法的数量不发送请求
+        self.assertEqual(client.list_trip_notes("alice", limit=0), [])
+        self.assertEqual(client.list_trip_notes("alice", limit=-1), [])
+
+        searches = [path for method, path in server.request_log if "/search" in path]
+        self.assertEqual(len(searches), 3)
+
+    def test_batch_create_chunks_and_reports_per_record(self):
+        """测试批量创建按上限分块并逐条返回结果"""
+        client = self._make_client()
+
+        def fake_request(method, url, data=None, params=None):
+            records = data["records"]
+            if records[0]["fields"]["note_id"] == "n500":
+                raise Exception("飞书 API 请求失败: TooManyRequest")
+            return {"records": [
+                {"record_id": f"rec_{r['fields']['note_id']}", "fields": r["fields"]}
+                for r in records
+            ]}
+
+        client._request = Mock(side_effect=fake_request)
+        notes = [{"note_id": f"n{i}", "username": "alice"} for i in range(1100)]
+
+        results = client.batch_create_trip_notes(notes)
+
+        self.assertEqual(client._request.call_count, 3)
+        self.assertTrue(client._request.call_args_list[0].args[1].endswith("/batch_create"))
+        self.assertEqual(len(results), 1100)
+        self.assertEqual(results[0]["record_id"], "rec_n0")
+        self.assertFalse(results[500]["success"])
+        self.assertIn("TooManyRequest", results[999]["error"])
+        self.assertTrue(results[1000]["success"])
+
+        # 重试同一批游记使用相同的 client_token，飞书不会重复创建
+        tokens = [call.kwargs["params"]["client_token"] for call in client._request.call_args_list]
+        self.assertEqual(len(set(tokens)), 3)
+        client._request.reset_mock()
+        client.batch_create_trip_notes(notes)
+        self.assertEqual([call.kwargs["params"]["client_token"] for call in client._request.call_args_list], tokens)
+
+    def test_client_tokens(self):
+        """测试 client_token 为 uuidv4 格式，游记按 ID 固定，注册每次不同"""
+        import uuid
+        from clients.feishu_client import make_client_token
+
+        token = make_client_token("note", "n1")
+        self.assertEqual(uuid.UUID(token).version, 4)
+        self.assertEqual(token, make_client_token("note", "n1"))
+        self.assertNotEqual(token, make_client_token("note", "n2"))
+
+        client = self._make_client()
+        client._request = Mock(return_value={"record": {"record_id": "u1"}})
+        client.create_user("alice", "secret")
+        client.create_user("alice", "secret")
+        tokens = [call.kwargs["params"]["client_token"] for call in client._request.call_args_list]
+        self.assertNotEqual(tokens[0], tokens[1])
+        self.assertEqual({uuid.UUID(t).version for t in tokens}, {4})
+
+
+class TestFieldCodec(unittest.TestCase):
+    """游记字段编码测试"""
+
+    def test_large_fields_compressed_and_decoded_lazily(self):
+        """测试大字段压缩保存、读取时延迟解码，旧记录照常读取"""
+        from clients.field_codec import ZlibCodec, CompactJsonCodec
+        from clients.user_client import UserClient
+
+        ai_content = "# 西湖游记\n\n" + "湖光山色，游人如织。" * 200
+        fields = ZlibCodec(threshold=1024).encode_fields({
+            "note_id": "n1",
+            "images": ["https://oss.example.com/u1.jpg"],
+            "ocr_results": {"batch1_photo1": "断桥残雪"},
+            "ai_content": ai_content,
+            "user_notes": "很开心"
+        })
+        self.assertTrue(fields["ai_content"].startswith("z1:"))
+        self.assertLess(len(fields["ai_content"]), len(ai_content.encode("utf-8")) // 4)
+        self.assertEqual(fields["images"], '["https://oss.example.com/u1.jpg"]')
+        self.assertEqual(fields["user_notes"], "很开心")
+
+        client = UserClient.__new__(UserClient)
+        note = client._decode_note({"record_id": "rec1", "fields": dict(fields, summary="摘要", image_count=1)})
+        self.assertTrue(dict.__getitem__(note, "ai_content").startswith("z1:"))
+        self.assertEqual(note["ai_content"], ai_content)
+        self.assertEqual(note["ocr_results"], {"batch1_photo1": "断桥残雪"})
+        self.assertEqual(dict(note)["images"], ["https://oss.example.com/u1.jpg"])
+
+        legacy = client._decode_note({"record_id": "rec2", "fields": {
+            "note_id": "n2",
+            "images": json.dumps(["a.jpg", "b.jpg"], ensure_ascii=False),
+            "ocr_results": "",
+            "ai_content": "旧正文"
+        }})
+        self.assertEqual(legacy["images"], ["a.jpg", "b.jpg"])
+        self.assertEqual(legacy["ocr_results"], {})
+        self.assertEqual(legacy["image_count"], 2)
+        self.assertEqual(legacy["summary"], "旧正文")
+
+        self.assertEqual(CompactJsonCodec().encode_json({"a": [1, 2]}), '{"a":[1,2]}')
+
+    def test_plain_text_with_prefix(self):
+        """测试以压缩前缀开头的普通文本可以原样读取，zlib 编码时转义"""
+        from clients.field_codec import ZlibCodec, decode_field
+
+        text = "z1: 第一天的行程"
+        self.assertEqual(decode_field(text), text)
+        encoded = ZlibCodec().encode_text(text)
+        self.assertNotEqual(encoded, text)
+        self.assertEqual(decode_field(encoded), text)
+
+    def test_lazy_note_equality(self):
+        """测试惰性游记与解码后的字典比较时 == 和 != 一致"""
+        import json
+        from clients.field_codec import LazyNote
+
+        decoded = {"title": "西湖", "images": ["a.jpg"]}
+
+        def make():
+            return LazyNote({"title": "西湖", "images": '["a.jpg"]'}, {"images": json.loads})
+
+        self.assertTrue(make() == decoded)
+        self.assertFalse(make() != decoded)
+        self.assertFalse(decoded != make())
+        self.assertFalse(make() != make())
+        self.assertTrue(make() != {"title": "西湖", "images": []})
+
+
+class TestSQLiteStorage(unittest.TestCase):
+    """SQLite 存储后端测试"""
+
+    def setUp(self):
+        from clients.sqlite_storage import SQLiteStorage
+
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_path = tmp_dir.name
+        self.storage = SQLiteStorage(os.path.join(tmp_dir.name, "storage.db"))
+
+    def test_note_queries_and_batches(self):
+        """测试游记查询、字段裁剪和批量操作的逐条结果"""
+        results = self.storage.batch_create_trip_notes([
+            {"note_id": f"n{i}", "username": "alice" if i % 2 else "bob",
+             "title": f"游记{i}", "travel_date": f"2026-01-{i:02d}", "images": [f"u{i}"]}
+            for i in range(1, 10)
+        ] + [{"note_id": "n1", "username": "alice"}])
+        self.assertTrue(all(r["success"] for r in results[:9]))
+        self.assertFalse(results[9]["success"])
+
+        records = self.storage.list_trip_notes(
+            "alice", limit=2, date_from="2026-01-02", sort_by="travel_date",
+            descending=False, field_names=["note_id", "title"]
+        )
+        self.assertEqual([r["fields"] for r in records], [
+            {"note_id": "n3", "title": "游记3"}, {"note_id": "n5", "title": "游记5"}
+        ])
+
+        record_id = self.storage.get_trip_note("n3")["record_id"]
+        updated = self.storage.update_trip_note(record_id, {"title": "新标题", "images": []})
+        self.assertEqual(updated["record"]["fields"]["title"], "新标题")
+        self.assertEqual(updated["record"]["fields"]["images"], "[]")
+
+        deleted = self.storage.batch_delete_trip_notes([record_id, "rec_missing"])
+        self.assertEqual([r["success"] for r in deleted], [True, False])
+        self.assertIsNone(self.storage.get_trip_note("n3"))
+        self.assertEqual(len(list(self.storage.iter_trip_notes("alice"))), 4)
+        self.assertEqual(self.storage.list_trip_notes("alice", limit=-1), [])
+
+    def test_clients_run_on_sqlite_backend(self):
+        """测试用户客户端和认证客户端使用 SQLite 后端离线运行"""
+        from clients.auth_client import AuthClient
+        from clients.user_client import UserClient
+        from clients.note_index import NoteIndex
+        from clients.user_stats import UserStatsCache
+        from clients.note_cache import NoteSnapshotCache
+
+        mock_config = Mock()
+        mock_config.get_storage_backend.return_value = "sqlite"
+        mock_config.get_note_mirror_enabled.return_value = False
+        mock_config.get_write_behind_enabled.return_value = False
+        index_path = os.path.join(self.tmp_path, "note_index.db")
+
+        with patch('clients.storage.get_config', return_value=mock_config), \
+                patch('clients.user_client.get_config', return_value=mock_config), \
+                patch('clients.sqlite_storage.SQLiteStorage', return_value=self.storage), \
+                patch('clients.user_client.NoteIndex', side_effect=lambda: NoteIndex(index_path)), \
+                patch('clients.user_client.get_stats_cache', return_value=UserStatsCache()), \
+                patch('clients.user_client.get_note_cache', return_value=NoteSnapshotCache()):
+            auth_client = AuthClient()
+            user_client = UserClient()
+
+        self.assertEqual(auth_client.register("alice1", "secret1"), (True, "注册成功，请等待管理员激活账号"))
+        self.assertEqual(auth_client.register("alice1", "secret1")[1], "用户名已被注册")
+        self.storage.update_user_status(self.storage.get_user("alice1")["record_id"], "active")
+        self.assertTrue(auth_client.login("alice1", "secret1")[0])
+
+        success, _, note_id = user_client.create_note("alice1", "标题", "西湖", "2026-02-19", images=["u1"])
+        self.assertTrue(success)
+        self.assertTrue(user_client.update_note(note_id, title="新标题")[0])
+        self.assertEqual(user_client.get_note(note_id)["title"], "新标题")
+        self.assertEqual(user_client.list_note_cards("alice1")[0]["image_count"], 1)
+        self.assertEqual(user_client.get_user_stats("alice1")["total_images"], 1)
+        self.assertEqual(user_client.delete_note(note_id), (True, "删除成功"))
+
+
+class TestNoteMirror(unittest.TestCase):
+    """游记本地镜像测试"""
+
+    def setUp(self):
+        from clients.note_mirror import NoteMirror
+
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.mirror = NoteMirror(os.path.join(tmp_dir.name, "note_mirror.db"))
+        patcher = patch('utils.config.Config.get_local_data_dir', return_value=tmp_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.remote = {
+            f"n{i}": {"record_id": f"r{i}", "fields": {
+                "note_id": f"n{i}", "username": "alice", "title": f"游记{i}",
+                "travel_date": 1700000000000 + i, "updated_at": 1000
+            }}
+            for i in range(3)
+        }
+        self.feishu = Mock()
+        self.feishu.list_trip_note_versions.side_effect = lambda username: [
+            {"record_id": r["record_id"], "fields": {
+                "note_id": r["fields"]["note_id"], "updated_at": r["fields"]["updated_at"]
+            }}
+            for r in self.remote.values()
+        ]
+        self.feishu.batch_get_trip_notes.side_effect = lambda ids: [
+            json.loads(json.dumps(r)) for r in self.remote.values() if r["record_id"] in ids
+        ]
+
+    def test_incremental_sync(self):
+        """测试增量同步只下载修改过的记录并删除已移除的记录"""
+        self.assertEqual(self.mirror.sync(self.feishu, "alice"), {"fetched": 3, "deleted": 0})
+        self.assertTrue(self.mirror.is_fresh("alice", 60))
+
+        self.remote["n1"]["fields"].update({"title": "改过的标题", "updated_at": 2000})
+        del self.remote["n2"]
+
+        self.assertEqual(self.mirror.sync(self.feishu, "alice"), {"fetched": 1, "deleted": 1})
+        self.assertEqual(self.mirror.get("n1")["fields"]["title"], "改过的标题")
+        self.assertIsNone(self.mirror.get("n2"))
+        self.assertEqual(
+            [r["record_id"] for r in self.mirror.list_by_user("alice")],
+            ["r1", "r0"]
+        )
+
+    def test_user_client_reads_from_mirror(self):
+        """测试启用镜像后列表读取不再访问飞书"""
+        from clients.user_client import UserClient
+
+        with patch('clients.user_client.get_storage', return_value=self.feishu), \
+                patch('clients.user_client.NoteMirror', return_value=self.mirror), \
+                patch('clients.user_client.get_config') as mock_config:
+            mock_config.return_value.get_note_mirror_enabled.return_value = True
+            mock_config.return_value.get_note_mirror_max_staleness.return_value = 60
+            client = UserClient()
+
+        self.assertEqual(len(client.list_notes("alice")), 3)
+        self.assertEqual(len(client.list_notes("alice")), 3)
+        self.assertEqual(client.get_note("n0")["title"], "游记0")
+
+        self.assertEqual(self.feishu.list_trip_note_versions.call_count, 1)
+        self.feishu.list_trip_notes.assert_not_called()
+        self.feishu.get_trip_note.assert_not_called()
+
+
+class TestHttpSession(unittest.TestCase):
+    """HTTP 会话测试"""
+
+    def test_session_is_shared(self):
+        """测试会话在进程内共享"""
+        from clients.http_session import get_session
+
+        self.assertIs(get_session(), get_session())
+
+    def test_default_timeout_applied(self):
+        """测试未指定超时时使用默认超时"""
+        import requests
+        from clients.http_session import create_session
+        from requests.adapters import HTTPAdapter
+
+        session = create_session(pool_size=4, timeout=7)
+        with patch.object(HTTPAdapter, 'send', side_effect=requests.ConnectionError) as mock_send:
+            with self.assertRaises(requests.ConnectionError):
+                session.get("https://example.invalid/")
+            self.assertEqual(mock_send.call_args.kwargs["timeout"], 7)
+
+            with self.assertRaises(requests.ConnectionError):
+                session.get("https://example.invalid/", timeout=3)
+            self.assertEqual(mock_send.call_args.kwargs["timeout"], 3)
+
+
+class TestTokenCache(unittest.TestCase):
+    """访问令牌缓存测试"""
+
+    def test_concurrent_refresh_is_single_flight(self):
+        """测试并发获取令牌只请求一次"""
+        import time
+        from clients.token_cache import TenantTokenCache
+
+        fetch = Mock(side_effect=lambda: (time.sleep(0.2), ("t-1", 7200))[1])
+        cache = TenantTokenCache(fetch)
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get())) for _ in range(50)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(results, ["t-1"] * 50)
+        self.assertEqual(fetch.call_count, 1)
+        self.assertEqual(cache.get_stats()["fetches_avoided"], 49)
+
+    def test_background_refresh_before_expiry(self):
+        """测试进入刷新窗口后返回旧令牌并后台刷新"""
+        import time
+        from clients.token_cache import TenantTokenCache
+
+        tokens = iter([("t-1", 400), ("t-2", 7200)])
+        cache = TenantTokenCache(lambda: next(tokens), refresh_margin=400)
+
+        self.assertEqual(cache.get(), "t-1")
+        self.assertEqual(cache.get(), "t-1")
+
+        deadline = time.time() + 2
+        while cache.get_stats()["fetches"] < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(cache.get(), "t-2")
+
+
+class TestRequestScheduler(unittest.TestCase):
+    """请求调度器测试"""
+
+    def test_token_bucket_limits_rate(self):
+        """测试令牌桶限制请求速率"""
+        import time
+        from clients.rate_limiter import RequestScheduler
+
+        scheduler = RequestScheduler(qps=50, burst=1)
+        started = time.monotonic()
+        for _ in range(6):
+            scheduler.call(lambda: None)
+
+        self.assertGreaterEqual(time.monotonic() - started, 0.09)
+        self.assertEqual(scheduler.get_metrics()["requests"], 6)
+
+    def test_retries_throttled_requests(self):
+        """测试限流错误退避重试并记录指标"""
+        from clients.rate_limiter import RequestScheduler, RetryableError
+
+        scheduler = RequestScheduler(qps=1000, base_delay=0.001, max_delay=0.01)
+        send = Mock(side_effect=[
+            RetryableError("TooManyRequest", throttled=True),
+            RetryableError("timeout"),
+            {"code": 0}
+        ])
+
+        self.assertEqual(scheduler.call(send), {"code": 0})
+        metrics = scheduler.get_metrics()
+        self.assertEqual(metrics["retries"], 2)
+        self.assertEqual(metrics["throttled"], 1)
+        self.assertEqual(metrics["in_flight"], 0)
+        self.assertEqual(metrics["queue_depth"], 0)
+
+    def test_rejects_non_positive_limits(self):
+        """测试每秒请求数或并发数不是正数时报错"""
+        from clients.rate_limiter import RequestScheduler
+
+        for kwargs in ({"qps": 0}, {"qps": -1}, {"qps": 10, "max_concurrency": 0}):
+            with self.assertRaises(ValueError):
+                RequestScheduler(**kwargs)
+
+    def test_gives_up_after_max_retries(self):
+        """测试超过最大重试次数后报错"""
+        from clients.rate_limiter import RequestScheduler, RetryableError
+
+        scheduler = RequestScheduler(qps=1000, max_retries=2, base_delay=0.001)
+        send = Mock(side_effect=RetryableError("TooManyRequest", throttled=True))
+
+        with self.assertRaises(Exception):
+            scheduler.call(send)
+        self.assertEqual(send.call_count, 3)
+        self.assertEqual(scheduler.get_metrics()["failures"], 1)
+
+    def test_retry_after_seconds_and_http_date(self):
+        """测试 Retry-After 为秒数或 HTTP 日期时都能解析，无法解析时忽略"""
+        from email.utils import format_datetime
+        from datetime import datetime, timedelta, timezone
+        from clients.feishu_client import FeishuClient
+        from clients.rate_limiter import RetryableError
+
+        client = FeishuClient.__new__(FeishuClient)
+        later = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+        cases = {"5": (5, 5), later: (25, 30), "soon": None}
+        for value, expected in cases.items():
+            with self.assertRaises(RetryableError) as ctx:
+                client._check_status(429, {"Retry-After": value})
+            if expected is None:
+                self.assertIsNone(ctx.exception.retry_after)
+            else:
+                self.assertGreaterEqual(ctx.exception.retry_after, expected[0])
+                self.assertLessEqual(ctx.exception.retry_after, expected[1])
+
 
 class TestUtils(unittest.TestCase):
     """工具函数测试"""
 
+    def test_gather_sync_runs_reads_concurrently(self):
+        """测试并发读取按提交顺序返回结果"""
+        import time
+        from utils.async_bridge import gather_sync
+
+        # 两项读取互相等待，顺序执行时会超时
+        barrier = threading.Barrier(2, timeout=5)
+
+        def read(value):
+            barrier.wait()
+            return value
+
+        self.assertEqual(
+            gather_sync(lambda: read("notes"), lambda: read("stats"), timeout=10),
+            ["notes", "stats"]
+        )
+
+        def fail():
+            raise ValueError("boom")
+
+        result = gather_sync(fail, lambda: 1, return_exceptions=True)
+        self.assertIsInstance(result[0], ValueError)
+        self.assertEqual(result[1], 1)
+        with self.assertRaises(ValueError):
+            gather_sync(fail, lambda: 1)
+        with self.assertRaises(TimeoutError):
+            gather_sync(lambda: time.sleep(0.5), timeout=0.05)
+
+    def test_config_bool_parsing(self):
+        """测试开关配置的字符串按字面含义解析"""
+        from utils.config import Config
+
+        cases = {"false": False, "False": False, "0": False, "true": True, "on": True, False: False, 1: True}
+        for value, expected in cases.items():
+            with patch.object(Config, "_get_optional", return_value=value):
+                self.assertIs(Config.get_image_process_enabled(), expected)
+
     def test_hash_password(self):
         """测试密码哈希"""
         from utils.auth import hash_password
@@ -0,0 +1,82 @@
+# async_bridge.py
+# -*- coding: utf-8 -*-
+"""
+并发读取桥接模块
+Streamlit 页面是同步执行的，这里用进程内共享的线程池并发执行一组相互独立的
+阻塞读取（如 UserClient 的方法调用），页面同步等待全部结果
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional
+
+# 线程池大小：每组读取通常只有两三项，多个会话同时读取时排队
+MAX_WORKERS = 8
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """
+    获取进程内共享的线程池，首次调用时创建
+
+    Returns:
+        线程池
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="gather")
+        return _executor
+
+
+def gather_sync(
+    *tasks: Callable[[], Any],
+    timeout: float = None,
+    return_exceptions: bool = False
+) -> List[Any]:
+    """
+    并发执行一组相互独立的读取，全部完成后按提交顺序返回结果
+
+    例如列表页同时读取游记列表和统计信息：
+
+        notes, stats = gather_sync(
+            lambda: user_client.list_note_cards(username),
+            lambda: user_client.get_user_stats(username)
+        )
+
+    Args:
+        tasks: 无参数的阻塞函数
+        timeout: 等待整组完成的超时（秒），None 表示一直等待
+        return_exceptions: 为 True 时失败项以异常对象返回，否则抛出第一个异常
+
+    Returns:
+        与 tasks 顺序一致的结果列表
+
+    Raises:
+        TimeoutError: 整组未能在超时前完成
+    """
+    executor = _get_executor()
+    futures = [executor.submit(task) for task in tasks]
+    deadline = time.monotonic() + timeout if timeout is not None else None
+
+    results = []
+    try:
+        for future in futures:
+            remaining = max(0.0, deadline - time.monotonic()) if deadline is not None else None
+            try:
+                results.append(future.result(timeout=remaining))
+            except Exception as e:
+                if not future.done():
+                    raise TimeoutError("并发读取超时")
+                if not return_exceptions:
+                    raise
+                results.append(e)
+    except BaseException:
+        # 出错或超时时取消尚未开始的读取
+        for future in futures:
+            future.cancel()
+        raise
+    return results
@@ -5,12 +5,34 @@
 从 streamlit secrets 中读取配置，并提供统一访问接口
 """
 
+import os
 import streamlit as st
 
 
 class Config:
     """配置类 - 从 streamlit secrets 读取配置"""
 
+    @staticmethod
+    def _get_optional(key: str, default):
+        """读取可选配置，未配置 secrets.toml 时返回默认值"""
+        try:
+            return st.secrets.get(key, default)
+        except Exception:
+            return default
+
+    @staticmethod
+    def _get_bool(key: str, default: bool) -> bool:
+        """读取可选的开关配置，字符串按 true/false、1/0、yes/no、on/off 解析"""
+        value = Config._get_optional(key, default)
+        if isinstance(value, str):
+            value = value.strip().lower()
+            if value in ("true", "1", "yes", "on"):
+                return True
+            if value in ("false", "0", "no", "off", ""):
+                return False
+            return default
+        return bool(value)
+
     @staticmethod
     def get_deepseek_api_key() -> str:
         """获取 DeepSeek API Key"""
@@ -61,6 +83,11 @@ class Config:
         """获取飞书 App Secret"""
         return st.secrets["FEISHU_APP_SECRET"]
 
+    @staticmethod
+    def get_feishu_api_base() -> str:
+        """获取飞书开放平台 API 根地址"""
+        return st.secrets.get("FEISHU_API_BASE", "https://open.feishu.cn/open-apis")
+
     @staticmethod
     def get_feishu_app_token_user() -> str:
         """获取飞书用户表 App Token"""
@@ -81,6 +108,152 @@ class Config:
         """获取飞书记录表 Table ID"""
         return st.secrets["FEISHU_TABLE_ID_NOTE"]
 
+    @staticmethod
+    def get_local_data_dir() -> str:
+        """获取本地数据目录（索引、缓存等）"""
+        return Config._get_optional("LOCAL_DATA_DIR", ".local_data")
+
+    @staticmethod
+    def get_http_pool_size() -> int:
+        """获取 HTTP 连接池大小（每个主机）"""
+        return int(Config._get_optional("HTTP_POOL_SIZE", 20))
+
+    @staticmethod
+    def get_http_timeout() -> float:
+        """获取 HTTP 请求默认超时（秒）"""
+        return float(Config._get_optional("HTTP_TIMEOUT", 30))
+
+    @staticmethod
+    def get_note_mirror_enabled() -> bool:
+        """是否启用游记本地镜像"""
+        return Config._get_bool("NOTE_MIRROR_ENABLED", False)
+
+    @staticmethod
+    def get_note_mirror_max_staleness() -> float:
+        """获取游记本地镜像允许的最大陈旧时间（秒）"""
+        return float(Config._get_optional("NOTE_MIRROR_MAX_STALENESS", 60))
+
+    @staticmethod
+    def get_feishu_qps() -> float:
+        """获取飞书接口每秒请求预算（每个应用）"""
+        return float(Config._get_optional("FEISHU_QPS", 10))
+
+    @staticmethod
+    def get_feishu_max_concurrency() -> int:
+        """获取飞书接口最大并发请求数"""
+        return int(Config._get_optional("FEISHU_MAX_CONCURRENCY", 8))
+
+    @staticmethod
+    def get_feishu_max_retries() -> int:
+        """获取飞书接口限流或临时错误的最大重试次数"""
+        return int(Config._get_optional("FEISHU_MAX_RETRIES", 3))
+
+    @staticmethod
+    def get_write_behind_enabled() -> bool:
+        """是否启用游记写入队列（先写本地日志，后台同步到飞书）"""
+        return Config._get_bool("WRITE_BEHIND_ENABLED", False)
+
+    @staticmethod
+    def get_write_behind_max_attempts() -> int:
+        """获取写入队列中单条写入的最大尝试次数"""
+        return int(Config._get_optional("WRITE_BEHIND_MAX_ATTEMPTS", 20))
+
+    @staticmethod
+    def get_field_codec() -> str:
+        """获取游记大字段的编码方式 (plain/compact/zlib)"""
+        return Config._get_optional("FIELD_CODEC", "compact")
+
+    @staticmethod
+    def get_field_compress_threshold() -> int:
+        """获取 zlib 编码下触发压缩的字段大小（字节）"""
+        return int(Config._get_optional("FIELD_COMPRESS_THRESHOLD", 2048))
+
+    @staticmethod
+    def get_storage_backend() -> str:
+        """获取用户和游记的存储后端 (feishu/sqlite)"""
+        return Config._get_optional("STORAGE_BACKEND", "feishu")
+
+    @staticmethod
+    def get_sqlite_storage_path() -> str:
+        """获取 SQLite 存储后端的数据库文件路径"""
+        default = os.path.join(Config.get_local_data_dir(), "storage.db")
+        return Config._get_optional("SQLITE_STORAGE_PATH", default)
+
+    @staticmethod
+    def get_image_upload_workers() -> int:
+        """获取批量上传图片的最大并发数"""
+        return int(Config._get_optional("IMAGE_UPLOAD_WORKERS", 4))
+
+    @staticmethod
+    def get_image_upload_timeout() -> float:
+        """获取批量上传图片的整体超时（秒）"""
+        return float(Config._get_optional("IMAGE_UPLOAD_TIMEOUT", 60))
+
+    @staticmethod
+    def get_image_multipart_threshold() -> int:
+        """获取改用分片上传的图片大小阈值（字节）"""
+        return int(Config._get_optional("IMAGE_MULTIPART_THRESHOLD", 5 * 1024 * 1024))
+
+    @staticmethod
+    def get_image_multipart_part_size() -> int:
+        """获取分片上传的分片大小（字节），OSS 要求不小于 100KB"""
+        return max(100 * 1024, int(Config._get_optional("IMAGE_MULTIPART_PART_SIZE", 1024 * 1024)))
+
+    @staticmethod
+    def get_image_multipart_threads() -> int:
+        """获取单张图片分片上传的并发数"""
+        return int(Config._get_optional("IMAGE_MULTIPART_THREADS", 3))
+
+    @staticmethod
+    def get_image_multipart_max_attempts() -> int:
+        """获取同一分片上传的最大尝试次数，超过后放弃（abort）已上传的分片"""
+        return int(Config._get_optional("IMAGE_MULTIPART_MAX_ATTEMPTS", 3))
+
+    @staticmethod
+    def get_image_checkpoint_max_age_days() -> float:
+        """获取分片上传检查点的保留天数，过期的未完成上传会被放弃"""
+        return float(Config._get_optional("IMAGE_CHECKPOINT_MAX_AGE_DAYS", 7))
+
+    @staticmethod
+    def get_image_max_edge() -> int:
+        """获取上传前图片最长边的上限（像素），0 表示不缩放"""
+        return int(Config._get_optional("IMAGE_MAX_EDGE", 1920))
+
+    @staticmethod
+    def get_image_jpeg_quality() -> int:
+        """获取上传图片的 JPEG 质量 (1-100)"""
+        return int(Config._get_optional("IMAGE_JPEG_QUALITY", 85))
+
+    @staticmethod
+    def get_image_worker_processes() -> int:
+        """获取图片处理进程数，0 表示在当前线程中处理"""
+        return int(Config._get_optional("IMAGE_WORKER_PROCESSES", min(2, os.cpu_count() or 1)))
+
+    @staticmethod
+    def get_image_worker_queue() -> int:
+        """获取图片处理进程池中排队和处理中的图片数上限"""
+        return int(Config._get_optional("IMAGE_WORKER_QUEUE", 32))
+
+    @staticmethod
+    def get_image_process_timeout() -> float:
+        """获取图片在进程池中处理的超时（秒）：提交一批照片时为整批超时，生成预览时为单张超时"""
+        return float(Config._get_optional("IMAGE_PROCESS_TIMEOUT", 120))
+
+    @staticmethod
+    def get_photo_buffer_memory_budget() -> int:
+        """获取每个会话待上传照片占用内存的上限（字节）"""
+        return int(Config._get_optional("PHOTO_BUFFER_MEMORY_BUDGET", 64 * 1024 * 1024))
+
+    @staticmethod
+    def get_photo_buffer_spill() -> bool:
+        """超过内存上限的待上传照片是否写入临时目录（否则拒绝添加）"""
+        return Config._get_bool("PHOTO_BUFFER_SPILL", True)
+
+    @staticmethod
+    def get_image_process_enabled() -> bool:
+        """是否通过 OSS 图片处理参数（x-oss-process）按显示尺寸获取图片"""
+        return Config._get_bool("IMAGE_PROCESS_ENABLED", True)
+
 
 # 便捷访问函数
 def get_config() -> Config:
@@ -0,0 +1,374 @@
+# image_executor.py
+# -*- coding: utf-8 -*-
+"""
+图片处理进程池模块
+图片的解码、缩放和 JPEG 编码在独立进程中进行，避免一个用户的大批照片占用
+Streamlit 服务进程的 GIL、拖慢其他会话；排队的图片数有上限
+"""
+
+import io
+import multiprocessing
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Iterable, List, Optional
+from PIL import Image
+from utils.config import get_config
+from utils.image_utils import SUPPORTED_FORMATS, build_image_variants, encode_jpeg, prepare_image
+
+
+class ImageQueueFull(Exception):
+    """图片处理队列已满"""
+
+
+class ImageProcessError(Exception):
+    """图片处理失败（工作进程异常退出或图片像素过多）"""
+
+
+def process_image(data: bytes, max_edge: int, quality: int, variants: bool = False) -> dict:
+    """
+    规范化图片（在工作进程中执行）
+
+    图片只解码一次：上传的 JPEG 和缩小版本都由同一张解码、缩放后的图片编码，
+    缩小版本不会从已压缩的 JPEG 再次压缩
+
+    Args:
+        data: 图片的编码字节
+        max_edge: 最长边上限（像素），0 表示不缩放
+        quality: JPEG 质量 (1-100)
+        variants: 是否同时生成缩小版本（见 build_image_variants）
+
+    Returns:
+        {"data": JPEG 字节, "format": 原格式, "original_size": (宽, 高), "size": (宽, 高),
+         "taken_at": 拍摄时间 datetime 或 None, "gps": {"latitude", "longitude"} 或 None}，
+        variants 为 True 时另有 "variants": {版本名: JPEG 字节}
+
+    Raises:
+        ValueError: 无法识别或不支持的图片格式
+        Image.DecompressionBombError: 图片像素数超过 PIL 的安全上限
+    """
+    try:
+        image = Image.open(io.BytesIO(data))
+    except Image.DecompressionBombError:
+        raise
+    except Exception:
+        raise ValueError("无法识别的图片文件")
+    if image.format not in SUPPORTED_FORMATS:
+        raise ValueError("不支持的图片格式，请上传 JPG 或 PNG 图片")
+
+    result = {"format": image.format, "original_size": image.size}
+    prepared, metadata = prepare_image(image, max_edge=max_edge, lazy=True)
+    result.update(data=encode_jpeg(prepared, quality), size=prepared.size, **metadata)
+    if variants:
+        result["variants"] = build_image_variants(prepared, quality)
+    return result
+
+
+class ImageExecutor:
+    """进程内共享的图片处理执行器"""
+
+    def __init__(self, max_workers: int = None, max_queue: int = None):
+        """
+        初始化执行器
+
+        Args:
+            max_workers: 工作进程数，默认按配置；0 表示在调用线程中处理
+            max_queue: 排队和处理中的图片数上限，默认按配置
+        """
+        config = get_config()
+        self.max_workers = max_workers if max_workers is not None else config.get_image_worker_processes()
+        self.max_queue = max_queue or config.get_image_worker_queue()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # 任务所在的进程池，工作进程异常退出时据此丢弃
+        self._pools: "weakref.WeakKeyDictionary[Future, ProcessPoolExecutor]" = weakref.WeakKeyDictionary()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """获取进程池（首次使用时创建；Streamlit 服务进程有多个线程，使用 spawn 而不是 fork）"""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def _reserve(self, count: int) -> None:
+        """占用队列位置，不足时抛出 ImageQueueFull"""
+        with self._lock:
+            if self._pending + count > self.max_queue:
+                raise ImageQueueFull("图片处理繁忙，请稍后再试")
+            self._pending += count
+
+    def _release(self, _future: Future = None) -> None:
+        """释放一个队列位置"""
+        with self._lock:
+            self._pending -= 1
+
+    def _discard_pool(self, pool: Optional[ProcessPoolExecutor]) -> None:
+        """丢弃已损坏的进程池，下一次提交时重建"""
+        with self._lock:
+            # 其他任务可能已经换上新的进程池
+            if pool is not None and self._pool is pool:
+                print("[DEBUG] 图片处理工作进程异常退出，丢弃进程池")
+                self._pool = None
+
+    @property
+    def pending(self) -> int:
+        """排队和处理中的图片数"""
+        return self._pending
+
+    def _submit(self, data: bytes, max_edge: int, quality: int, variants: bool) -> Future:
+        """提交一张已占用队列位置的图片"""
+        if self.max_workers <= 0:
+            future = Future()
+            try:
+                future.set_result(process_image(data, max_edge, quality, variants))
+            except Exception as e:
+                future.set_exception(e)
+            self._release()
+            return future
+
+        with self._lock:
+            try:
+                pool = self._get_pool()
+                future = pool.submit(process_image, data, max_edge, quality, variants)
+            except BrokenProcessPool:
+                # 工作进程异常退出（如内存不足被杀），重建进程池
+                print("[DEBUG] 图片处理进程池已损坏，重新创建")
+                self._pool = None
+                pool = self._get_pool()
+                future = pool.submit(process_image, data, max_edge, quality, variants)
+            self._pools[future] = pool
+        future.add_done_callback(self._release)
+        return future
+
+    def result(self, future: Future, timeout: float = None) -> dict:
+        """
+        等待一张图片的处理结果
+
+        Args:
+            future: submit 返回的 Future
+            timeout: 等待超时（秒）
+
+        Returns:
+            process_image 的返回值
+
+        Raises:
+            ImageProcessError: 工作进程异常退出或图片像素过多
+            TimeoutError: 超时前未处理完
+            ValueError: 不支持的图片
+        """
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            # 尚未开始处理的图片取消后释放队列位置
+            future.cancel()
+            raise TimeoutError("图片处理超时，请稍后重试")
+        except BrokenProcessPool:
+            self._discard_pool(self._pools.get(future))
+            raise ImageProcessError("图片处理失败，照片可能过大或已损坏，请更换照片后重试")
+        except Image.DecompressionBombError:
+            raise ImageProcessError("照片像素过多，请缩小后再上传")
+
+    def submit(self, data: bytes, max_edge: int = None, quality: int = None, variants: bool = False) -> Future:
+        """
+        提交一张图片
+
+        Args:
+            data: 图片的编码字节
+            max_edge: 最长边上限（像素），默认按配置
+            quality: JPEG 质量，默认按配置
+            variants: 是否同时生成缩小版本
+
+        Returns:
+            结果为 process_image 返回值的 Future
+
+        Raises:
+            ImageQueueFull: 队列已满
+        """
+        return self.submit_many([data], max_edge, quality, variants)[0]
+
+    def submit_many(
+        self,
+        items: List[bytes],
+        max_edge: int = None,
+        quality: int = None,
+        variants: bool = False
+    ) -> List[Future]:
+        """
+        提交一批图片；队列放不下整批时一张也不提交
+
+        Args:
+            items: 图片的编码字节列表
+            max_edge: 最长边上限（像素），默认按配置
+            quality: JPEG 质量，默认按配置
+            variants: 是否同时生成缩小版本
+
+        Returns:
+            与输入顺序一致的 Future 列表
+
+        Raises:
+            ImageQueueFull: 队列已满
+        """
+        # 配置在服务进程中读取，工作进程不访问 st.secrets
+        config = get_config()
+        if max_edge is None:
+            max_edge = config.get_image_max_edge()
+        quality = quality or config.get_image_jpeg_quality()
+
+        self._reserve(len(items))
+        futures = []
+        try:
+            for data in items:
+                futures.append(self._submit(data, max_edge, quality, variants))
+        except Exception:
+            # 未提交的图片释放队列位置
+            for _ in range(len(items) - len(futures)):
+                self._release()
+            raise
+        return futures
+
+    def normalize(
+        self,
+        data: bytes,
+        max_edge: int = None,
+        quality: int = None,
+        timeout: float = None,
+        variants: bool = False
+    ) -> dict:
+        """
+        规范化一张图片并等待结果
+
+        Args:
+            data: 图片的编码字节
+            max_edge: 最长边上限（像素），默认按配置
+            quality: JPEG 质量，默认按配置
+            timeout: 等待超时（秒）
+            variants: 是否同时生成缩小版本
+
+        Returns:
+            process_image 的返回值
+
+        Raises:
+            ImageQueueFull: 队列已满
+            ImageProcessError: 图片处理失败
+            TimeoutError: 超时前未处理完
+            ValueError: 不支持的图片
+        """
+        return self.result(self.submit(data, max_edge, quality, variants), timeout)
+
+    def normalize_many(
+        self,
+        items: List[bytes],
+        max_edge: int = None,
+        quality: int = None,
+        timeout: float = None,
+        variants: bool = False
+    ) -> List[dict]:
+        """
+        规范化一批图片并等待全部结果
+
+        Args:
+            items: 图片的编码字节列表
+            max_edge: 最长边上限（像素），默认按配置
+            quality: JPEG 质量，默认按配置
+            timeout: 每张图片的等待超时（秒）
+            variants: 是否同时生成缩小版本
+
+        Returns:
+            与输入顺序一致的 process_image 返回值列表
+
+        Raises:
+            ImageQueueFull: 队列已满
+            ImageProcessError: 图片处理失败
+            ValueError: 不支持的图片
+        """
+        futures = self.submit_many(items, max_edge, quality, variants)
+        return [self.result(future, timeout) for future in futures]
+
+    def normalize_each(
+        self,
+        loaders: Iterable[Callable[[], bytes]],
+        max_edge: int = None,
+        quality: int = None,
+        timeout: float = None,
+        variants: bool = False
+    ) -> List[dict]:
+        """
+        逐张读取并规范化一批图片
+
+        每张图片提交时才调用 loader 读取字节（如从临时文件读取），
+        同时提交的图片不超过工作进程数的两倍，整批不会同时读入内存
+
+        Args:
+            loaders: 返回图片编码字节的函数列表
+            max_edge: 最长边上限（像素），默认按配置
+            quality: JPEG 质量，默认按配置
+            timeout: 整批的超时（秒），默认按配置
+            variants: 是否同时生成缩小版本
+
+        Returns:
+            与输入顺序一致的 process_image 返回值列表
+
+        Raises:
+            ImageQueueFull: 队列已满
+            TimeoutError: 整批未能在超时前处理完
+            ImageProcessError: 图片处理失败
+            ValueError: 不支持的图片
+        """
+        deadline = time.monotonic() + (timeout or get_config().get_image_process_timeout())
+        # 完成回调可能晚于结果返回才释放队列位置，留出一个位置的余量
+        window = max(1, min(self.max_queue - 1, self.max_workers * 2))
+        in_flight = deque()
+        results = []
+
+        def collect() -> None:
+            remaining = max(0.0, deadline - time.monotonic())
+            try:
+                results.append(self.result(in_flight[0], remaining))
+            except FutureTimeoutError:
+                raise TimeoutError("图片处理超时，请稍后重试")
+            in_flight.popleft()
+
+        try:
+            for load in loaders:
+                if len(in_flight) >= window:
+                    collect()
+                in_flight.append(self.submit(load(), max_edge, quality, variants))
+            while in_flight:
+                collect()
+        except BaseException:
+            # 出错或超时时取消尚未开始处理的图片
+            for future in in_flight:
+                future.cancel()
+            raise
+        return results
+
+    def shutdown(self) -> None:
+        """关闭进程池"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+_image_executor: Optional[ImageExecutor] = None
+_image_executor_lock = threading.Lock()
+
+
+def get_image_executor() -> ImageExecutor:
+    """
+    获取进程内共享的图片处理执行器
+
+    Returns:
+        图片处理执行器
+    """
+    global _image_executor
+    with _image_executor_lock:
+        if _image_executor is None:
+            _image_executor = ImageExecutor()
+        return _image_executor
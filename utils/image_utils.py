@@ -6,10 +6,38 @@
 """
 
 import io
+import math
 import base64
-from typing import Union, Optional
+from datetime import datetime
+from typing import BinaryIO, Dict, Tuple, Union, Optional
 from PIL import Image
 import streamlit as st
+from utils.config import get_config
+
+# 上传时生成的缩小版本：名称 -> 最长边像素（另有 original 为原图）
+IMAGE_VARIANTS = {"thumb": 320, "display": 1280}
+
+# 可以上传的图片格式
+SUPPORTED_FORMATS = ("JPEG", "PNG")
+
+# EXIF 标签
+EXIF_ORIENTATION = 0x0112
+EXIF_DATETIME = 0x0132
+EXIF_IFD = 0x8769
+EXIF_GPS_IFD = 0x8825
+EXIF_DATETIME_ORIGINAL = 0x9003
+EXIF_DATETIME_DIGITIZED = 0x9004
+
+# EXIF 方向 -> 转正所需的变换
+ORIENTATION_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90
+}
 
 
 def resize_image(image: Image.Image, max_size: tuple = (1920, 1080)) -> Image.Image:
@@ -74,6 +102,226 @@ def compress_image(image: Image.Image, quality: int = 85) -> bytes:
     return buffer.getvalue()
 
 
+def build_image_variants(image: Union[Image.Image, bytes], quality: int = 85) -> Dict[str, bytes]:
+    """
+    生成图片的缩小版本（IMAGE_VARIANTS）
+
+    只解码一次，从大到小依次缩放；原图不大于某个尺寸时不生成该版本
+
+    Args:
+        image: PIL Image 对象或图片字节
+        quality: JPEG 质量 (1-100)
+
+    Returns:
+        {版本名: JPEG 字节}
+    """
+    if isinstance(image, bytes):
+        image = Image.open(io.BytesIO(image))
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+
+    variants = {}
+    for name, size in sorted(IMAGE_VARIANTS.items(), key=lambda item: -item[1]):
+        if max(image.size) <= size:
+            continue
+        image = image.copy()
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+        variants[name] = compress_image(image, quality)
+    return variants
+
+
+def image_url(entry: Union[str, dict, None], width: int = None) -> str:
+    """
+    获取游记图片的 URL
+
+    images 中旧记录的元素是 URL 字符串，新记录是 {"original", "display", "thumb"} 字典
+
+    Args:
+        entry: images 中的元素
+        width: 需要的显示宽度（像素），返回不小于该宽度的最小版本；None 表示原图
+
+    Returns:
+        图片 URL，没有图片返回空字符串
+    """
+    if not entry:
+        return ""
+    if isinstance(entry, str):
+        return entry
+    if width is not None:
+        for name, size in sorted(IMAGE_VARIANTS.items(), key=lambda item: item[1]):
+            if size >= width and entry.get(name):
+                return entry[name]
+    return entry.get("original", "")
+
+
+def _gps_degrees(value, ref) -> Optional[float]:
+    """将 EXIF GPS 的 (度, 分, 秒) 转换为带符号的十进制度数"""
+    try:
+        degrees, minutes, seconds = (float(part) for part in value)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    result = degrees + minutes / 60 + seconds / 3600
+    # 分母为 0 的 IFDRational 转为 float 时是 NaN，不抛出 ZeroDivisionError
+    if math.isnan(result):
+        return None
+    if ref in ("S", "W", b"S", b"W"):
+        result = -result
+    return round(result, 6)
+
+
+def read_image_metadata(exif: Image.Exif) -> dict:
+    """
+    从 EXIF 中读取拍摄时间和 GPS 坐标
+
+    Args:
+        exif: 图片的 EXIF（Image.getexif() 只解析文件头，不解码像素）
+
+    Returns:
+        {"taken_at": 拍摄时间 datetime 或 None, "gps": {"latitude", "longitude"} 或 None}
+    """
+    metadata = {"taken_at": None, "gps": None}
+    if not exif:
+        return metadata
+
+    ifd = exif.get_ifd(EXIF_IFD)
+    taken_at = ifd.get(EXIF_DATETIME_ORIGINAL) or ifd.get(EXIF_DATETIME_DIGITIZED) or exif.get(EXIF_DATETIME)
+    if taken_at:
+        try:
+            metadata["taken_at"] = datetime.strptime(str(taken_at).strip("\x00 "), "%Y:%m:%d %H:%M:%S")
+        except ValueError:
+            pass
+
+    gps = exif.get_ifd(EXIF_GPS_IFD)
+    latitude = _gps_degrees(gps.get(2), gps.get(1))
+    longitude = _gps_degrees(gps.get(4), gps.get(3))
+    if latitude is not None and longitude is not None:
+        metadata["gps"] = {"latitude": latitude, "longitude": longitude}
+    return metadata
+
+
+def normalize_image_bytes(
+    image: Union[Image.Image, bytes, BinaryIO],
+    max_edge: int = None,
+    quality: int = None
+) -> bytes:
+    """
+    将图片规范化为待上传的 JPEG 字节（见 normalize_image）
+
+    Args:
+        image: PIL Image 对象、图片字节或文件对象
+        max_edge: 最长边上限（像素），默认按配置，0 表示不缩放
+        quality: JPEG 质量 (1-100)，默认按配置
+
+    Returns:
+        JPEG 字节
+    """
+    return normalize_image(image, max_edge, quality)[0]
+
+
+def prepare_image(
+    image: Union[Image.Image, bytes, BinaryIO],
+    max_edge: int = None,
+    lazy: bool = False
+) -> Tuple[Image.Image, dict]:
+    """
+    解码一次并规范化图片：缩放、按 EXIF 方向转正、转为 RGB，不编码
+
+    传入字节、文件对象或刚打开尚未解码的图片（lazy）时，JPEG 使用 draft 模式
+    直接按 1/2、1/4、1/8 比例解码，不必先解码全尺寸图片；已解码的 PIL 图片复制后缩放，
+    不修改调用方的图片
+
+    Args:
+        image: PIL Image 对象、图片字节或文件对象
+        max_edge: 最长边上限（像素），默认按配置，0 表示不缩放
+        lazy: image 是刚用 Image.open 打开、尚未解码的图片
+
+    Returns:
+        (RGB 图片, read_image_metadata 的返回值)；ICC 色彩配置保留在图片的 info 中
+    """
+    if max_edge is None:
+        max_edge = get_config().get_image_max_edge()
+
+    opened = lazy or not isinstance(image, Image.Image)
+    if isinstance(image, (bytes, bytearray)):
+        image = Image.open(io.BytesIO(image))
+    elif not isinstance(image, Image.Image):
+        image = Image.open(image)
+
+    exif = image.getexif()
+    metadata = read_image_metadata(exif)
+    icc_profile = image.info.get("icc_profile")
+
+    if max_edge and max(image.size) > max_edge:
+        if opened:
+            # 只对 JPEG 生效，解码尺寸不小于目标尺寸
+            ratio = max_edge / max(image.size)
+            image.draft("RGB", (int(image.width * ratio), int(image.height * ratio)))
+        else:
+            # 不修改调用方的图片
+            image = image.copy()
+        image = resize_image(image, (max_edge, max_edge))
+
+    # 缩放后再转正，变换的像素更少
+    transpose = ORIENTATION_TRANSPOSE.get(exif.get(EXIF_ORIENTATION))
+    if transpose is not None:
+        image = image.transpose(transpose)
+
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.split()[3])
+        image = background
+    elif image.mode != "RGB":
+        image = image.convert("RGB")
+
+    if icc_profile:
+        image.info["icc_profile"] = icc_profile
+    return image, metadata
+
+
+def encode_jpeg(image: Image.Image, quality: int) -> bytes:
+    """
+    将 prepare_image 返回的图片编码为 JPEG（只保留 ICC 色彩配置，不写入 EXIF）
+
+    Args:
+        image: RGB 图片
+        quality: JPEG 质量 (1-100)
+
+    Returns:
+        JPEG 字节
+    """
+    buffer = io.BytesIO()
+    icc_profile = image.info.get("icc_profile")
+    if icc_profile:
+        image.save(buffer, format="JPEG", quality=quality, icc_profile=icc_profile)
+    else:
+        image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def normalize_image(
+    image: Union[Image.Image, bytes, BinaryIO],
+    max_edge: int = None,
+    quality: int = None
+) -> Tuple[bytes, dict]:
+    """
+    将图片规范化为待上传的 JPEG：一次解码完成缩放、按 EXIF 方向转正，只编码一次
+
+    解码方式见 prepare_image。输出不包含 EXIF（GPS、内嵌缩略图等），只保留 ICC 色彩配置
+
+    Args:
+        image: PIL Image 对象、图片字节或文件对象
+        max_edge: 最长边上限（像素），默认按配置，0 表示不缩放
+        quality: JPEG 质量 (1-100)，默认按配置
+
+    Returns:
+        (JPEG 字节, read_image_metadata 的返回值)
+    """
+    quality = quality or get_config().get_image_jpeg_quality()
+    prepared, metadata = prepare_image(image, max_edge)
+    return encode_jpeg(prepared, quality), metadata
+
+
 def get_image_info(image: Union[Image.Image, bytes]) -> dict:
     """
     获取图片信息
@@ -0,0 +1,166 @@
+# photo_buffer.py
+# -*- coding: utf-8 -*-
+"""
+待上传照片缓冲区模块
+会话中只保存照片的原始编码字节和小尺寸预览图，不保存解码后的图片；
+超过内存预算的照片写入临时目录，上传时再读取
+"""
+
+import os
+import shutil
+import tempfile
+import uuid
+import weakref
+from typing import Iterator, List, Optional, Union, BinaryIO
+from utils.config import get_config
+from utils.image_executor import ImageExecutor, get_image_executor
+
+# 预览图最长边（像素）和 JPEG 质量
+PREVIEW_EDGE = 320
+PREVIEW_QUALITY = 70
+
+
+class PhotoBufferFull(Exception):
+    """缓冲区已满，无法再添加照片"""
+
+
+class PhotoBuffer:
+    """单个会话的待上传照片列表"""
+
+    def __init__(
+        self,
+        memory_budget: int = None,
+        spill: bool = None,
+        executor: ImageExecutor = None,
+        timeout: float = None
+    ):
+        """
+        初始化缓冲区
+
+        Args:
+            memory_budget: 内存中照片字节的上限，默认按配置
+            spill: 超过内存预算时是否写入临时目录，默认按配置；为 False 时拒绝添加
+            executor: 生成预览图的图片处理执行器，默认使用共享的进程池
+            timeout: 生成一张预览图的超时（秒），默认按配置
+        """
+        config = get_config()
+        self.executor = executor
+        self.memory_budget = memory_budget if memory_budget is not None else config.get_photo_buffer_memory_budget()
+        self.spill = spill if spill is not None else config.get_photo_buffer_spill()
+        self.timeout = timeout or config.get_image_process_timeout()
+        self._photos: List[dict] = []
+        self._spill_dir: Optional[str] = None
+        self._finalizer = None
+
+    def __len__(self) -> int:
+        return len(self._photos)
+
+    def __bool__(self) -> bool:
+        return bool(self._photos)
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(list(self._photos))
+
+    def __getitem__(self, index: int) -> dict:
+        return self._photos[index]
+
+    @property
+    def memory_bytes(self) -> int:
+        """内存中照片和预览图占用的字节数"""
+        return sum(len(photo["data"] or b"") + len(photo["thumbnail"]) for photo in self._photos)
+
+    def _spill_path(self) -> str:
+        """生成临时文件路径（首次调用时创建临时目录，缓冲区回收时删除）"""
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix="tripnotes_photos_")
+            self._finalizer = weakref.finalize(self, shutil.rmtree, self._spill_dir, True)
+        return os.path.join(self._spill_dir, uuid.uuid4().hex)
+
+    def add(self, source: Union[bytes, BinaryIO], filename: str) -> dict:
+        """
+        添加照片
+
+        Args:
+            source: 照片的编码字节或文件对象（如 Streamlit 的 UploadedFile）
+            filename: 文件名
+
+        Returns:
+            照片记录，包含 filename、thumbnail（预览图 JPEG 字节）、size
+
+        Raises:
+            ValueError: 不是支持的图片格式
+            PhotoBufferFull: 超过内存预算且不允许写入临时目录
+            ImageQueueFull: 图片处理队列已满
+            ImageProcessError: 图片处理失败（工作进程异常退出或图片像素过多）
+            TimeoutError: 预览图未能在超时前生成
+        """
+        if isinstance(source, bytes):
+            data = source
+        elif hasattr(source, "getvalue"):
+            data = source.getvalue()
+        else:
+            data = source.read()
+
+        # 同时校验图片格式
+        executor = self.executor or get_image_executor()
+        thumbnail = executor.normalize(
+            data, max_edge=PREVIEW_EDGE, quality=PREVIEW_QUALITY, timeout=self.timeout
+        )["data"]
+        photo = {"filename": filename, "thumbnail": thumbnail, "size": len(data), "data": data, "path": None}
+
+        if self.memory_bytes + len(data) + len(thumbnail) > self.memory_budget:
+            if not self.spill:
+                raise PhotoBufferFull("待上传照片过多，请先提交当前批次")
+            path = self._spill_path()
+            with open(path, "wb") as f:
+                f.write(data)
+            photo["data"] = None
+            photo["path"] = path
+            print(f"[DEBUG] 照片超过内存预算，写入临时文件: {filename}")
+
+        self._photos.append(photo)
+        return photo
+
+    def read(self, photo: dict) -> bytes:
+        """
+        读取照片的编码字节
+
+        Args:
+            photo: 照片记录
+
+        Returns:
+            编码字节
+        """
+        if photo["data"] is not None:
+            return photo["data"]
+        with open(photo["path"], "rb") as f:
+            return f.read()
+
+    @staticmethod
+    def _discard(photo: dict) -> None:
+        """删除照片的临时文件"""
+        if photo["path"]:
+            try:
+                os.remove(photo["path"])
+            except OSError:
+                pass
+
+    def pop(self, index: int) -> dict:
+        """
+        删除并返回照片
+
+        Args:
+            index: 位置
+
+        Returns:
+            照片记录
+        """
+        photo = self._photos.pop(index)
+        self._discard(photo)
+        return photo
+
+    def clear(self) -> None:
+        """清空缓冲区并删除临时文件"""
+        for photo in self._photos:
+            self._discard(photo)
+        self._photos = []